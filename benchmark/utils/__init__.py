@@ -11,4 +11,6 @@
 # that they have been altered from the originals.
 
 from .result import Result
+from .equivalence import KnownInputChecker, equivalent_on_input
 from .graphs import median_cell, legends
+from .tuning import tuned_pass_manager
@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Known-input equivalence checking.
+
+RPO output is only equivalent to its input when the circuit starts in |0...0>
+(annotations are promises about the state reached from that input). Instead of
+comparing full unitaries, both circuits are simulated from |0...0> and the
+states of the measured qubits (in classical bit order) are compared up to
+global phase. Clifford circuits are simulated with a stabilizer tableau, any
+other circuit with a statevector restricted to the qubits it actually uses.
+
+An annotation of the reference before any gate on its qubit states the input of
+that qubit, U3(theta, phi, lam)|0>, and both circuits start from it. The qubits of
+a transpiled circuit are placed with its layout (``circuit._layout``).
+"""
+
+import numpy as np
+
+from qiskit.exceptions import QiskitError
+from qiskit.extensions.standard import U3Gate
+from qiskit.quantum_info import Operator
+
+_HALF_PI = np.pi / 2
+_ANGLE_TOLERANCE = 1e-9
+_MAX_STATEVECTOR_QUBITS = 26
+_SKIPPED = ('barrier', 'annotation', 'id', 'snapshot')
+
+
+def _quarter_turns(angle):
+    """Returns k such that angle == k*pi/2 (mod 2pi), or None."""
+    angle = float(angle)
+    turns = int(round(angle / _HALF_PI))
+    if abs(angle - turns * _HALF_PI) > _ANGLE_TOLERANCE:
+        return None
+    return turns % 4
+
+
+def _clifford_sequence(name, params, qubits):
+    """Decomposes a gate into the tableau primitives (h, s, x, y, z, cx) in time order.
+    Returns None if the gate is not a Clifford."""
+    if name in ('h', 's', 'x', 'y', 'z'):
+        return [(name, qubits)]
+    if name == 'sdg':
+        return [('s', qubits)] * 3
+    if name == 'cx':
+        return [('cx', qubits)]
+    if name == 'cz':
+        return [('h', qubits[1:]), ('cx', qubits), ('h', qubits[1:])]
+    if name == 'cy':
+        return [('s', qubits[1:])] * 3 + [('cx', qubits), ('s', qubits[1:])]
+    if name == 'swap':
+        top, bot = qubits
+        return [('cx', [top, bot]), ('cx', [bot, top]), ('cx', [top, bot])]
+    if name == 'aswap':
+        top, bot = qubits
+        return [('cx', [bot, top]), ('cx', [top, bot])]
+    if name in ('u1', 'rz', 'u2', 'u3', 'ry', 'rx'):
+        turns = [_quarter_turns(param) for param in params]
+        if None in turns:
+            return None
+        if name in ('u1', 'rz'):
+            return [('s', qubits)] * turns[0]
+        if name == 'rx':
+            return [('h', qubits)] + [('s', qubits)] * turns[0] + [('h', qubits)]
+        if name == 'ry':
+            theta, phi, lam = turns[0], 0, 0
+        elif name == 'u2':
+            theta, phi, lam = 1, turns[0], turns[1]
+        else:
+            theta, phi, lam = turns
+        # U3(theta, phi, lam) = Rz(phi).Ry(theta).Rz(lam) and Ry(pi/2) = H.Z
+        return [('s', qubits)] * lam + [('z', qubits), ('h', qubits)] * theta + \
+               [('s', qubits)] * phi
+    return None
+
+
+def input_states(circuit):
+    """
+    Returns:
+        dict: the parameters (theta, phi, lam) of the annotations of ``circuit`` before
+        any gate on their qubit, by qubit index.
+    """
+    states = {}
+    touched = set()
+    for instruction, qargs, _ in circuit.data:
+        if instruction.name == 'annotation' and qargs[0] not in touched:
+            states[circuit.qubits.index(qargs[0])] = tuple(instruction.params)
+        if instruction.name not in _SKIPPED + ('reset',):
+            touched.update(qargs)
+    return states
+
+
+class _Program:
+    """A circuit reduced to its unitary part from |0...0>, on its active qubits."""
+
+    def __init__(self, circuit, reference_qubits=None, inputs=None):
+        """
+        Args:
+            circuit (QuantumCircuit): the circuit.
+            reference_qubits (list(Qubit)): the qubits of the reference circuit, the
+                virtual qubits of the layout of ``circuit`` (default: its own qubits).
+            inputs (dict): the input state parameters (theta, phi, lam) of some qubits of
+                the reference, by index.
+        """
+        self.operations = []  # (instruction, [active qubit index])
+        self.measured = []  # active qubit index, in classical bit order
+        self.clbits = []  # classical bit position, in classical bit order
+
+        layout = getattr(circuit, '_layout', None)
+        if reference_qubits is None or layout is None:
+            placed = circuit.qubits[:len(reference_qubits or circuit.qubits)]
+        else:
+            placed = [circuit.qubits[layout[qubit]] for qubit in reference_qubits]
+        # without measurements, the final place of the qubits of a routed circuit is
+        # not known: a mismatch is inconclusive
+        self.unknown_permutation = False
+
+        active = {}
+        for index, params in sorted((inputs or {}).items()):
+            qubit = placed[index]
+            active[qubit] = len(active)
+            self.operations.append((U3Gate(*params), [active[qubit]]))
+
+        final = {}  # clbit -> qubit
+        touched = set()
+        for instruction, qargs, cargs in circuit.data:
+            name = instruction.name
+            if name in _SKIPPED:
+                continue
+            if name == 'measure':
+                final[cargs[0]] = qargs[0]
+                continue
+            if name == 'reset':
+                if qargs[0] in touched:
+                    raise QiskitError('Reset after the first gate on a qubit is not supported.')
+                continue
+            if instruction.condition or set(qargs) & set(final.values()):
+                raise QiskitError('Only final measurements without conditionals are supported.')
+            if cargs:
+                raise QiskitError('Instruction %s is not supported.' % name)
+            touched.update(qargs)
+            for qubit in qargs:
+                active.setdefault(qubit, len(active))
+            self.operations.append((instruction, [active[qubit] for qubit in qargs]))
+
+        if not final:
+            # Without measurements, the qubits of the reference are compared in order
+            final = dict(enumerate(placed))
+            clbit_order = list(final)
+            self.unknown_permutation = layout is not None
+        else:
+            clbit_order = sorted(final, key=circuit.clbits.index)
+        for clbit in clbit_order:
+            qubit = final[clbit]
+            active.setdefault(qubit, len(active))
+            self.measured.append(active[qubit])
+            self.clbits.append(clbit if isinstance(clbit, int) else circuit.clbits.index(clbit))
+        self.n_qubits = len(active)
+
+    @property
+    def is_clifford(self):
+        return all(_clifford_sequence(inst.name, inst.params, qargs) is not None
+                   for inst, qargs in self.operations)
+
+
+class _Tableau:
+    """Stabilizer generators (no destabilizers) of a state, starting in |0...0>."""
+
+    def __init__(self, n_qubits):
+        self.x = np.zeros((n_qubits, n_qubits), dtype=bool)
+        self.z = np.eye(n_qubits, dtype=bool)
+        self.r = np.zeros(n_qubits, dtype=bool)
+
+    def apply(self, name, qubits):
+        x, z = self.x, self.z
+        if name == 'h':
+            a = qubits[0]
+            self.r ^= x[:, a] & z[:, a]
+            x[:, a], z[:, a] = z[:, a].copy(), x[:, a].copy()
+        elif name == 's':
+            a = qubits[0]
+            self.r ^= x[:, a] & z[:, a]
+            z[:, a] ^= x[:, a]
+        elif name == 'x':
+            self.r ^= z[:, qubits[0]]
+        elif name == 'z':
+            self.r ^= x[:, qubits[0]]
+        elif name == 'y':
+            self.r ^= x[:, qubits[0]] ^ z[:, qubits[0]]
+        elif name == 'cx':
+            ctrl, trgt = qubits
+            self.r ^= x[:, ctrl] & z[:, trgt] & ~(x[:, trgt] ^ z[:, ctrl])
+            x[:, trgt] ^= x[:, ctrl]
+            z[:, ctrl] ^= z[:, trgt]
+
+    @staticmethod
+    def _rowsum(x, z, r, target, source):
+        """Replaces generator ``target`` with the product of ``source`` and ``target``."""
+        x1, z1 = x[source].astype(int), z[source].astype(int)
+        x2, z2 = x[target].astype(int), z[target].astype(int)
+        exponent = np.where(x1 & z1, z2 - x2, 0) + \
+                   np.where(x1 & (1 - z1), z2 * (2 * x2 - 1), 0) + \
+                   np.where((1 - x1) & z1, x2 * (1 - 2 * z2), 0)
+        phase = (2 * int(r[target]) + 2 * int(r[source]) + int(exponent.sum())) % 4
+        r[target] = phase == 2
+        x[target] ^= x[source]
+        z[target] ^= z[source]
+
+    def reduced(self, kept):
+        """Canonical generators of the stabilizer group restricted to the ``kept`` qubits
+        (in that order), as a hashable tuple."""
+        others = [qubit for qubit in range(len(self.r)) if qubit not in kept]
+        x, z, r = self.x.copy(), self.z.copy(), self.r.copy()
+        columns = [(x, qubit) for qubit in others] + [(z, qubit) for qubit in others]
+        for qubit in kept:
+            columns += [(x, qubit), (z, qubit)]
+
+        pivot_row = 0
+        pivots = []
+        for matrix, qubit in columns:
+            candidates = [row for row in range(pivot_row, len(r)) if matrix[row, qubit]]
+            if not candidates:
+                continue
+            row = candidates[0]
+            for bits in (x, z):
+                bits[[pivot_row, row]] = bits[[row, pivot_row]]
+            r[[pivot_row, row]] = r[[row, pivot_row]]
+            for other in range(len(r)):
+                if other != pivot_row and matrix[other, qubit]:
+                    _Tableau._rowsum(x, z, r, other, pivot_row)
+            pivots.append(pivot_row)
+            pivot_row += 1
+
+        generators = []
+        for row in pivots:
+            if x[row, others].any() or z[row, others].any():
+                continue
+            generators.append((tuple(x[row, kept]), tuple(z[row, kept]), bool(r[row])))
+        return tuple(generators)
+
+
+class KnownInputChecker:
+    """Checks circuits against a reference circuit on the |0...0> input.
+
+    The reference is simulated once, so checking many transpiled versions of the
+    same circuit (e.g. one per seed) only pays for the simulation of each candidate.
+    """
+
+    def __init__(self, reference, method=None, atol=1e-6, probes=3, seed=0):
+        """
+        Args:
+            reference (QuantumCircuit): circuit to compare against.
+            method (str): 'stabilizer', 'statevector' or None to choose by gate set.
+            atol (float): absolute tolerance for the statevector comparison.
+            probes (int): random probes when comparing reduced density matrices.
+            seed (int): seed for the random probes.
+        """
+        self.inputs = input_states(reference)
+        self.reference = _Program(reference, inputs=self.inputs)
+        self.reference_qubits = reference.qubits
+        self.method = method
+        self.atol = atol
+        self.probes = probes
+        self.seed = seed
+        self._reference_states = {}
+
+    def _method(self, program):
+        if self.method is not None:
+            return self.method
+        if self.reference.is_clifford and program.is_clifford:
+            return 'stabilizer'
+        return 'statevector'
+
+    @staticmethod
+    def _stabilizer(program):
+        tableau = _Tableau(program.n_qubits)
+        for instruction, qargs in program.operations:
+            for name, qubits in _clifford_sequence(instruction.name, instruction.params, qargs):
+                tableau.apply(name, qubits)
+        return tableau.reduced(program.measured)
+
+    @staticmethod
+    def _statevector(program):
+        n_qubits = program.n_qubits
+        if n_qubits > _MAX_STATEVECTOR_QUBITS:
+            raise QiskitError('Too many active qubits (%s) for statevector simulation.'
+                              % n_qubits)
+        state = np.zeros((2,) * n_qubits, dtype=complex)
+        state[(0,) * n_qubits] = 1
+        matrices = {}
+        for instruction, qargs in program.operations:
+            key = (instruction.name, tuple(instruction.params))
+            if key not in matrices:
+                matrices[key] = Operator(instruction).data
+            size = len(qargs)
+            gate = matrices[key].reshape((2,) * 2 * size)
+            # qiskit matrices are little-endian: qarg j is the axis size-1-j of each half
+            state = np.tensordot(gate, state,
+                                 axes=([2 * size - 1 - j for j in range(size)], qargs))
+            state = np.moveaxis(state, list(range(size)),
+                                [qargs[size - 1 - j] for j in range(size)])
+        kept = program.measured
+        others = [qubit for qubit in range(n_qubits) if qubit not in kept]
+        return state.transpose(kept + others).reshape(2 ** len(kept), 2 ** len(others))
+
+    def _reference_state(self, method):
+        if method not in self._reference_states:
+            simulate = self._stabilizer if method == 'stabilizer' else self._statevector
+            self._reference_states[method] = simulate(self.reference)
+        return self._reference_states[method]
+
+    def _same_density_matrix(self, state1, state2):
+        """Compares rho1 = M1 M1^dagger and rho2 = M2 M2^dagger with random probes."""
+        rng = np.random.RandomState(self.seed)
+        for _ in range(self.probes):
+            probe = rng.normal(size=state1.shape[0]) + 1j * rng.normal(size=state1.shape[0])
+            probe /= np.linalg.norm(probe)
+            image1 = state1 @ (state1.conj().T @ probe)
+            image2 = state2 @ (state2.conj().T @ probe)
+            if not np.allclose(image1, image2, atol=self.atol):
+                return False
+        return True
+
+    def __call__(self, circuit):
+        """
+        Args:
+            circuit (QuantumCircuit): circuit to check.
+        Returns:
+            bool: if both circuits leave the measured qubits in the same state,
+                  up to global phase.
+        Raises:
+            QiskitError: if the circuit cannot be simulated from a known input, or if it
+                is routed, has no measurements and its qubits end in another state (the
+                routing may have permuted them).
+        """
+        program = _Program(circuit, self.reference_qubits, self.inputs)
+        if program.clbits != self.reference.clbits:
+            return False
+        method = self._method(program)
+        if method == 'stabilizer':
+            same = self._stabilizer(program) == self._reference_state(method)
+        else:
+            same = self._same_density_matrix(self._statevector(program),
+                                             self._reference_state(method))
+        if not same and program.unknown_permutation:
+            raise QiskitError('The final permutation of an unmeasured routed circuit is '
+                              'unknown.')
+        return same
+
+    def check_all(self, circuits):
+        """Checks a batch of circuits (e.g. one per seed).
+
+        Returns:
+            list(bool or None): one result per circuit, None if it could not be checked.
+        """
+        results = []
+        for circuit in circuits:
+            try:
+                results.append(self(circuit))
+            except QiskitError:
+                results.append(None)
+        return results
+
+
+def equivalent_on_input(reference, circuit, method=None):
+    """Checks if two circuits produce the same measured state on the |0...0> input.
+
+    Args:
+        reference (QuantumCircuit): input circuit.
+        circuit (QuantumCircuit): transpiled circuit.
+        method (str): 'stabilizer', 'statevector' or None to choose by gate set.
+    Returns:
+        bool: if the circuits are equivalent on the |0...0> input.
+    Raises:
+        QiskitError: if the circuit cannot be checked (see KnownInputChecker).
+    """
+    return KnownInputChecker(reference, method=method)(circuit)
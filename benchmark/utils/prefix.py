@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Seed-independent prefix of pass managers.
+
+The pass managers built for different seeds usually start with the same pass sets
+(unrolling) and only differ from the first seeded pass on (CSPLayout, StochasticSwap).
+Passes compare equal when they are built with the same arguments, so the shared
+prefix is found by comparing the pass sets. The prefix runs once, and the rest of
+each pass manager runs from a copy of its output circuit and property set.
+
+Only seeded passes give each seed its own output. An unseeded random pass in the
+prefix (e.g. the CSPLayout of Qiskit's level_3_pass_manager) draws once for all the
+seeds, instead of once per seed. Terra 0.13 has no public access to the flow
+controllers of a pass manager, so the pass sets are read from ``_pass_sets``.
+"""
+
+from copy import deepcopy
+
+from qiskit.transpiler.runningpassmanager import RunningPassManager
+
+
+def _same_pass_set(pass_set1, pass_set2):
+    """Same passes and same flow controllers (functions built from the same code)."""
+    controllers1 = pass_set1['flow_controllers']
+    controllers2 = pass_set2['flow_controllers']
+    return (pass_set1['passes'] == pass_set2['passes'] and
+            controllers1.keys() == controllers2.keys() and
+            all(controllers1[name].__code__ is controllers2[name].__code__
+                for name in controllers1))
+
+
+def shared_prefix_length(passmanagers):
+    """
+    Args:
+        passmanagers (list(PassManager)): pass managers to compare.
+    Returns:
+        int: number of leading pass sets that are the same in all the pass managers.
+    """
+    first = passmanagers[0]._pass_sets
+    length = 0
+    for index, pass_set in enumerate(first):
+        if not all(len(pm._pass_sets) > index and _same_pass_set(pass_set, pm._pass_sets[index])
+                   for pm in passmanagers[1:]):
+            break
+        length += 1
+    return length
+
+
+class Snapshot:
+    """Circuit and property set after some pass sets, to run further pass sets from."""
+
+    def __init__(self, circuit, property_set, valid_passes):
+        self.circuit = circuit
+        self.property_set = property_set
+        self.valid_passes = valid_passes
+
+    def run(self, passmanager, start=0, stop=None, callback=None):
+        """Run the pass sets ``start:stop`` of ``passmanager`` on a copy of the snapshot.
+
+        Args:
+            passmanager (PassManager): pass manager with the pass sets to run.
+            start (int): first pass set to run.
+            stop (int): pass set to stop at (None runs until the end).
+            callback (callable): called after each pass, as in PassManager.run.
+        Returns:
+            Snapshot: circuit and property set after the pass sets. The property set
+                      of ``passmanager`` is set as in PassManager.run.
+        """
+        circuit, property_set = deepcopy((self.circuit, dict(self.property_set)))
+        running = RunningPassManager(passmanager.max_iteration)
+        # in place, the fenced property set of the transformation passes wraps it
+        running.property_set.update(property_set)
+        running.valid_passes = set(self.valid_passes)
+        for pass_set in passmanager._pass_sets[start:stop]:
+            running.append(pass_set['passes'], **pass_set['flow_controllers'])
+        circuit = running.run(circuit, callback=callback)
+        passmanager.property_set = running.property_set
+        return Snapshot(circuit, running.property_set, running.valid_passes)
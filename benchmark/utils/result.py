@@ -10,8 +10,32 @@
 # copyright notice, and modified files need to carry a notice indicating
 # that they have been altered from the originals.
 
+from copy import copy
+from statistics import median
+
 from qiskit.transpiler import PassManagerConfig
 from qiskit.transpiler.coupling import CouplingMap
+from qiskit.transpiler.propertyset import PropertySet
+
+from passmanager.calibration import estimated_duration, estimated_success_probability
+from .equivalence import KnownInputChecker
+from .prefix import Snapshot, shared_prefix_length
+
+
+def _time_collector(times, repetition):
+    """Callback of PassManager.run that accumulates the time of each pass."""
+
+    def collect_time(**kwargs):
+        times['total'] += kwargs['time']
+        passname = type(kwargs['pass_']).__name__
+        if passname in times:
+            times[passname] += kwargs['time']
+            repetition[passname] += 1
+        else:
+            times[passname] = kwargs['time']
+            repetition[passname] = 0
+
+    return collect_time
 
 
 class Result:
@@ -31,37 +55,103 @@ class Result:
             backend_properties=backend().properties(),
             seed_transpiler=seed)
 
-    def run_pm_with_time(self, passmanager, seed):
+    def _cached_run(self, cache, passmanager, config):
+        """Key and cached run (transpiled, times, repetition, hoare_stats) of a seed."""
+        if cache is None:
+            return None, None
+        key = cache.key(self.input_circuit, passmanager, config, kind='benchmark run')
+        run = cache.get(key)
+        if run is not None:
+            run[0].name = self.input_circuit.name
+        return key, run
+
+    def run_pm_with_time(self, passmanager, seed, cache=None):
+        config = Result.pm_config(seed, self.backend)
+        key, run = self._cached_run(cache, passmanager, config)
+        if run is not None:
+            return run
         times = {'total': 0}
         repetition = {}
 
-        def collect_time(**kwargs):
-            times['total'] += kwargs['time']
-            passname = type(kwargs['pass_']).__name__
-            if passname in times:
-                times[passname] += kwargs['time']
-                repetition[passname] += 1
-            else:
-                times[passname] = kwargs['time']
-                repetition[passname] = 0
-
-        pm = passmanager(Result.pm_config(seed, self.backend))
+        pm = passmanager(config)
         transpiled = None
         try:
-            transpiled = pm.run(self.input_circuit, callback=collect_time)
+            transpiled = pm.run(self.input_circuit, callback=_time_collector(times, repetition))
         except:
             pass
             #print("Seed No.",seed)
 
-        return transpiled, times, repetition
+        run = transpiled, times, repetition, pm.property_set['hoare_stats']
+        if cache is not None and transpiled is not None:
+            cache.put(key, run)
+        return run
+
+    def run_pm_shared_prefix(self, passmanager, seeds, cache=None):
+        """Like run_pm_with_time for each seed, but the leading pass sets that are the same
+        for all the seeds (see benchmark.utils.prefix) run once. The times of the prefix
+        are included in the times of every seed."""
+        # the passes of the prefix compare equal only if built from the same coupling
+        # map and backend properties, so all the configurations share them
+        config = Result.pm_config(None, self.backend)
+        results = {}
+        keys = {}
+        pms = {}
+        for seed in seeds:
+            config = copy(config)
+            config.seed_transpiler = seed
+            keys[seed], results[seed] = self._cached_run(cache, passmanager, config)
+            if results[seed] is None:
+                pms[seed] = passmanager(config)
+        if pms:
+            results.update(self._run_shared_prefix(pms))
+        if cache is not None:
+            for seed in pms:
+                if results[seed][0] is not None:
+                    cache.put(keys[seed], results[seed])
+        return [results[seed] for seed in seeds]
+
+    def _run_shared_prefix(self, pms):
+        """Runs of the pass managers ``pms`` (by seed), sharing their prefix."""
+        seeds = list(pms)
+        pms = list(pms.values())
+        n_prefix = shared_prefix_length(pms)
+        prefix_times = {'total': 0}
+        prefix_repetition = {}
+        try:
+            prefix = Snapshot(self.input_circuit, PropertySet(), set()).run(
+                pms[0], stop=n_prefix, callback=_time_collector(prefix_times, prefix_repetition))
+        except:
+            return {seed: (None, {'total': 0}, {}, None) for seed in seeds}
 
-    def run_pms(self, passmanagers, times=10):
+        results = {}
+        for seed, pm in zip(seeds, pms):
+            times = dict(prefix_times)
+            repetition = dict(prefix_repetition)
+            transpiled = None
+            try:
+                suffix = prefix.run(pm, start=n_prefix,
+                                    callback=_time_collector(times, repetition))
+                transpiled = suffix.circuit
+            except:
+                pass
+            results[seed] = (transpiled, times, repetition, pm.property_set['hoare_stats'])
+        return results
+
+    def run_pms(self, passmanagers, times=10, share_prefix=False, cache=None):
+        """Runs each pass manager with the seeds 0 to times-1. With a CompilationCache,
+        the runs (transpiled circuit, times and statistics) compiled before are taken
+        from it."""
         for pm in passmanagers:
-            result = {'transpiled': [], 'times': {}, 'repetitions': {}}
-            for seed in range(times):
-                transpiled, calls, repetitions = self.run_pm_with_time(pm, seed)
+            result = {'transpiled': [], 'times': {}, 'repetitions': {}, 'hoare_stats': []}
+            if share_prefix:
+                runs = self.run_pm_shared_prefix(pm, range(times), cache)
+            else:
+                runs = (self.run_pm_with_time(pm, seed, cache) for seed in range(times))
+            for transpiled, calls, repetitions, hoare_stats in runs:
                 if transpiled is not None:
                     result['transpiled'].append(transpiled)
+                    if hoare_stats is not None:
+                        result['hoare_stats'].append(hoare_stats)
                     for passname, time in calls.items():
                         if passname in result['times']:
                             result['times'][passname].append(time)
@@ -78,6 +168,14 @@ class Result:
     def row(self, fields):
         return {field: getattr(self, field) for field in fields}
 
+    @property
+    def verify(self):
+        """For each pass manager, whether each transpiled circuit (one per seed) is
+        equivalent to the input circuit on the |0...0> input (None if not checkable)."""
+        checker = KnownInputChecker(self.input_circuit)
+        return {name: checker.check_all(result['transpiled'])
+                for name, result in self.pms_results.items()}
+
     @property
     def level3_loop_iterations(self):
         return self.pms_results['level_3_pass_manager']['repetitions']['ConsolidateBlocks']
@@ -116,6 +214,27 @@ class Result:
             cx_results.append(cx_count)
         return cx_results[0] if len(cx_results) == 1 else cx_results
 
+    def _cxs(self, pm_name):
+        cx_results = [sample.count_ops().get('cx', 0)
+                      for sample in self.pms_results[pm_name]['transpiled']]
+        return cx_results[0] if len(cx_results) == 1 else cx_results
+
+    @property
+    def level1_cxs(self):
+        return self._cxs('level_1_pass_manager')
+
+    @property
+    def we_level1_cxs(self):
+        return self._cxs('level_1_with_contant_pure')
+
+    @property
+    def we_level2_cxs(self):
+        return self._cxs('level_2_with_contant_pure')
+
+    @property
+    def tuned_cxs(self):
+        return self._cxs('level_3_tuned')
+
     @property
     def hoare_cxs(self):
         cx_results = []
@@ -141,6 +260,22 @@ class Result:
             depth_results.append(sample.depth())
         return depth_results[0] if len(depth_results) == 1 else depth_results
 
+    def _depths(self, pm_name):
+        depth_results = [sample.depth() for sample in self.pms_results[pm_name]['transpiled']]
+        return depth_results[0] if len(depth_results) == 1 else depth_results
+
+    @property
+    def we_level1_depth(self):
+        return self._depths('level_1_with_contant_pure')
+
+    @property
+    def we_level2_depth(self):
+        return self._depths('level_2_with_contant_pure')
+
+    @property
+    def tuned_depth(self):
+        return self._depths('level_3_tuned')
+
     @property
     def we_depth(self):
         depth_results = []
@@ -159,6 +294,87 @@ class Result:
             depth_results.append(count)
         return depth_results[0] if len(depth_results) == 1 else depth_results
 
+    def _durations(self, pm_name, part):
+        """The duration (``part`` 0) or the idle times (``part`` 1) of each transpiled
+        circuit, None if the backend has no gate lengths (see estimated_duration)."""
+        properties = self.backend().properties()
+        results = []
+        for sample in self.pms_results[pm_name]['transpiled']:
+            estimate = estimated_duration(sample, properties)
+            results.append(None if estimate is None else estimate[part])
+        return results[0] if len(results) == 1 else results
+
+    @property
+    def level3_duration(self):
+        return self._durations('level_3_pass_manager', 0)
+
+    @property
+    def level2_duration(self):
+        return self._durations('level_2_pass_manager', 0)
+
+    @property
+    def we_duration(self):
+        return self._durations('level_3_with_contant_pure', 0)
+
+    @property
+    def hoare_duration(self):
+        return self._durations('level_3_hoare_pass_manager', 0)
+
+    @property
+    def level3_idle(self):
+        return self._durations('level_3_pass_manager', 1)
+
+    @property
+    def level2_idle(self):
+        return self._durations('level_2_pass_manager', 1)
+
+    @property
+    def we_idle(self):
+        return self._durations('level_3_with_contant_pure', 1)
+
+    @property
+    def hoare_idle(self):
+        return self._durations('level_3_hoare_pass_manager', 1)
+
+    def _esps(self, pm_name):
+        properties = self.backend().properties()
+        return [estimated_success_probability(sample, properties)
+                for sample in self.pms_results[pm_name]['transpiled']]
+
+    @property
+    def level3_esp(self):
+        esp_results = self._esps('level_3_pass_manager')
+        return esp_results[0] if len(esp_results) == 1 else esp_results
+
+    @property
+    def level2_esp(self):
+        esp_results = self._esps('level_2_pass_manager')
+        return esp_results[0] if len(esp_results) == 1 else esp_results
+
+    @property
+    def we_esp(self):
+        esp_results = self._esps('level_3_with_contant_pure')
+        return esp_results[0] if len(esp_results) == 1 else esp_results
+
+    @property
+    def hoare_esp(self):
+        esp_results = self._esps('level_3_hoare_pass_manager')
+        return esp_results[0] if len(esp_results) == 1 else esp_results
+
+    @property
+    def esp_comparison(self):
+        """Median estimated success probability of the level 3, Hoare and RPO pass
+        managers that were run, and which one is the best."""
+        medians = {}
+        for label, pm_name in [('level3', 'level_3_pass_manager'),
+                               ('hoare', 'level_3_hoare_pass_manager'),
+                               ('we', 'level_3_with_contant_pure')]:
+            if self.pms_results.get(pm_name, {}).get('transpiled'):
+                medians[label] = median(self._esps(pm_name))
+        if medians:
+            medians['best'] = max(medians, key=medians.get)
+        return medians
+
     @property
     def level3_single_gate(self):
         size_results = []
@@ -239,6 +455,18 @@ class Result:
             size_results.append(count)
         return size_results[0] if len(size_results) == 1 else size_results
 
+    @property
+    def level1_time(self):
+        return self.pms_results['level_1_pass_manager']['times'].get('total', None)
+
+    @property
+    def we_level1_time(self):
+        return self.pms_results['level_1_with_contant_pure']['times'].get('total', None)
+
+    @property
+    def we_level2_time(self):
+        return self.pms_results['level_2_with_contant_pure']['times'].get('total', None)
+
     @property
     def level2_time(self):
         return self.pms_results['level_2_pass_manager']['times'].get('total', None)
@@ -251,10 +479,53 @@ class Result:
     def we_time(self):
         return self.pms_results['level_3_with_contant_pure']['times'].get('total', None)
 
+    @property
+    def tuned_time(self):
+        return self.pms_results['level_3_tuned']['times'].get('total', None)
+
     @property
     def hoare_time(self):
         return self.pms_results['level_3_hoare_pass_manager']['times'].get('total', None)
 
+    def _hoare_stats(self, key, pm_name='level_3_hoare_pass_manager'):
+        stats = self.pms_results[pm_name]['hoare_stats']
+        values = [seed_stats[key] for seed_stats in stats]
+        return values[0] if len(values) == 1 else values
+
+    @property
+    def hoare_queries(self):
+        return self._hoare_stats('queries')
+
+    @property
+    def hoare_unknown(self):
+        return self._hoare_stats('unknown')
+
+    @property
+    def hoare_solver_time(self):
+        return self._hoare_stats('solver_time')
+
+    @property
+    def hoare_slowest(self):
+        return self._hoare_stats('slowest')
+
+    @property
+    def hoare_assumptions_solver_time(self):
+        return self._hoare_stats('solver_time', 'level_3_hoare_assumptions_pass_manager')
+
+    @property
+    def hoare_pushpop_solver_time(self):
+        return self._hoare_stats('solver_time', 'level_3_hoare_pushpop_pass_manager')
+
+    @property
+    def hoare_assumptions_time(self):
+        times = self.pms_results['level_3_hoare_assumptions_pass_manager']['times']
+        return times.get('total', None)
+
+    @property
+    def hoare_pushpop_time(self):
+        times = self.pms_results['level_3_hoare_pushpop_pass_manager']['times']
+        return times.get('total', None)
+
     @property
     def l3_swapper_time(self):
         return self.pms_results['level_3_pass_manager']['times'].get('StochasticSwap', None)
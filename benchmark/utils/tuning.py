@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Points of the configuration space of level_3_with_contant_pure, and the Pareto front
+of compile time versus CX count (see run_tuner.py).
+"""
+
+from copy import copy
+from itertools import product
+from math import isfinite
+
+from passmanager import level_3_with_contant_pure
+
+# knob: values to try. layout_method and routing_method are PassManagerConfig fields,
+# the others are arguments of level_3_with_contant_pure. The lookahead routing is left
+# out: it takes minutes on 8 qubits of FakeMelbourne, where the stochastic one takes
+# seconds.
+SEARCH_SPACE = {'layout_method': ['dense', 'noise_adaptive'],
+                'routing_method': ['stochastic', 'basic'],
+                'swap_trials': [20, 50, 200],
+                'constants_in_loop': [False, True]}
+
+
+def points(search_space):
+    """
+    Returns:
+        list(dict): the combinations of the values of ``search_space``. swap_trials only
+        varies with the stochastic routing.
+    """
+    result = []
+    for values in product(*search_space.values()):
+        point = dict(zip(search_space, values))
+        if point.get('routing_method', 'stochastic') != 'stochastic':
+            point['swap_trials'] = None
+        if point not in result:
+            result.append(point)
+    return result
+
+
+def point_name(point):
+    """ Returns: a short name of ``point``, e.g. 'dense-stochastic-20-cil' """
+    name = [str(point[knob]) for knob in ('layout_method', 'routing_method', 'swap_trials')
+            if point.get(knob) is not None]
+    name += [''.join(word[0] for word in knob.split('_'))
+             for knob in ('constants_in_loop',) if point.get(knob)]
+    return '-'.join(name)
+
+
+def tuned_pass_manager(point, name='level_3_tuned'):
+    """
+    Args:
+        point (dict): the knobs (see SEARCH_SPACE). The missing ones keep their default.
+        name (str): ``__name__`` of the factory, the key of its runs in Result.
+    Returns:
+        callable: a pass manager factory, like level_3_with_contant_pure, for ``point``.
+    """
+    options = dict(point)
+    layout_method = options.pop('layout_method', None)
+    routing_method = options.pop('routing_method', None)
+
+    def pass_manager(pass_manager_config):
+        config = copy(pass_manager_config)
+        config.layout_method = layout_method or config.layout_method
+        config.routing_method = routing_method or config.routing_method
+        return level_3_with_contant_pure(config, **options)
+
+    pass_manager.__name__ = name
+    pass_manager.point = point
+    return pass_manager
+
+
+def pareto_front(rows, time='time', cxs='cxs'):
+    """
+    Args:
+        rows (list(dict)): measured points, with their ``time`` and ``cxs`` (infinite for
+            the points that failed).
+    Returns:
+        list(dict): the rows that no other row beats in both, by increasing time. The
+        failed rows are left out.
+    """
+    rows = [row for row in rows if isfinite(row[time]) and isfinite(row[cxs])]
+    front = []
+    for row in sorted(rows, key=lambda row: (row[time], row[cxs])):
+        if not front or row[cxs] < front[-1][cxs]:
+            front.append(row)
+    return front
+
+
+def choose(front, cx_tolerance=0.01, cxs='cxs'):
+    """
+    Returns:
+        dict: the fastest row of ``front`` (sorted by time) with at most ``cx_tolerance``
+        (a fraction) more CX gates than the best one, None if ``front`` is empty.
+    """
+    if not front:
+        return None
+    best = min(row[cxs] for row in front)
+    return next(row for row in front if row[cxs] <= best * (1 + cx_tolerance))
@@ -1,3 +1,50 @@
-from .cons_pure_pm import level_3_with_contant_pure
-from .hoare_opt import HoareOptimizer
-from .hoare_pm import level_3_hoare_pass_manager
\ No newline at end of file
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Pass managers. Names are imported from their module on first access (PEP 562)."""
+
+import sys
+from importlib import import_module
+
+_LAZY = {'level_3_with_contant_pure': '.cons_pure_pm',
+         'level_1_with_contant_pure': '.cons_pure_light_pm',
+         'level_2_with_contant_pure': '.cons_pure_light_pm',
+         'best_of_seeds': '.best_of_seeds',
+         'CompilationCache': '.compilation_cache',
+         'LayoutCache': '.layout_cache',
+         'HoareOptimizer': '.hoare_opt',
+         'HoareStatistics': '.hoare_opt',
+         'TrivialityCache': '.hoare_opt',
+         'level_3_hoare_pass_manager': '.hoare_pm',
+         'TRIVIALITY_CACHE': '.hoare_pm',
+         'level_3_hoare_assumptions_pass_manager': '.hoare_pm',
+         'level_3_hoare_pushpop_pass_manager': '.hoare_pm'}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    value = getattr(import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if sys.version_info < (3, 7):
+    # no module __getattr__ before Python 3.7
+    for _name in __all__:
+        __getattr__(_name)
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Bit-parallel classical propagation, a fast path for the Hoare optimizer.
+
+Each z3 variable of the Hoare optimizer is mirrored by a ClassicalValue: its value
+in LANES random classical executions of the circuit (one bit per execution, packed
+in an int) and, if it is known to be the same in every execution, that constant.
+Gates with unknown post-conditions take a random value in each lane. A query that
+holds in some lane is satisfiable, a query that is constant false is not. Otherwise,
+the solver has to decide.
+"""
+
+from functools import reduce
+import random
+
+LANES = 64
+_ALL = (1 << LANES) - 1
+
+
+class ClassicalValue:
+    """Value of a boolean formula in each lane, and its constant value (if known)."""
+    __slots__ = ('lanes', 'const')
+
+    def __init__(self, lanes, const=None):
+        self.lanes = lanes
+        self.const = const
+
+    @classmethod
+    def constant(cls, value):
+        """The value ``value`` in every lane."""
+        return cls(_ALL if value else 0, bool(value))
+
+    def __invert__(self):
+        const = None if self.const is None else not self.const
+        return ClassicalValue(~self.lanes & _ALL, const)
+
+    def __and__(self, other):
+        if self.const is False or other.const is False:
+            return ClassicalValue.constant(False)
+        const = True if self.const and other.const else None
+        return ClassicalValue(self.lanes & other.lanes, const)
+
+    def __eq__(self, other):
+        if self.const is None or other.const is None:
+            const = True if self is other else None
+        else:
+            const = self.const == other.const
+        return ClassicalValue(~(self.lanes ^ other.lanes) & _ALL, const)
+
+    def __ne__(self, other):
+        return ~(self == other)
+
+    __hash__ = None
+
+    def select(self, if_true, if_false):
+        """The value ``if_true`` where this value is 1, ``if_false`` where it is 0."""
+        if self.const is not None:
+            return if_true if self.const else if_false
+        lanes = (self.lanes & if_true.lanes) | (~self.lanes & if_false.lanes)
+        const = if_true.const if if_true.const == if_false.const else None
+        return ClassicalValue(lanes, const)
+
+    def is_unsat(self):
+        """
+        Returns:
+            bool: if the formula is unsatisfiable, None if it cannot tell.
+        """
+        if self.const is False:
+            return True
+        if self.lanes:
+            return False
+        return None
+
+
+class ClassicalPropagation:
+    """Keeps the ClassicalValue of each variable of the Hoare optimizer."""
+
+    def __init__(self, seed=0):
+        self.values = dict()
+        self._rng = random.Random(seed)
+
+    def initialize(self, var):
+        """The variable ``var`` starts in |0>."""
+        self.values[var.get_id()] = ClassicalValue.constant(False)
+
+    def value(self, var):
+        """ClassicalValue of the z3 variable ``var``."""
+        return self.values[var.get_id()]
+
+    def all_ones(self, variables):
+        """ClassicalValue of the conjunction of ``variables``."""
+        return reduce(lambda acc, var: acc & self.value(var), variables,
+                      ClassicalValue.constant(True))
+
+    def apply(self, gate, ctrl_ones, trgtvar, new_vars):
+        """ Set the values of ``new_vars`` after ``gate`` acts on the targets
+        Args:
+            gate (Gate): gate applied
+            ctrl_ones (ClassicalValue): value of the conjunction of the controls
+            trgtvar (list(BoolRef)): variables of the target qubits before the gate
+            new_vars (list(BoolRef)): variables of the target qubits after the gate
+        """
+        before = [self.value(var) for var in trgtvar]
+        try:
+            after = gate._classical(*before)
+        except AttributeError:
+            after = [ClassicalValue(self._rng.getrandbits(LANES)) for _ in before]
+        for var, new, old in zip(new_vars, after, before):
+            self.values[var.get_id()] = ctrl_ones.select(new, old)
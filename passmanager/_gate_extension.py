@@ -13,12 +13,15 @@
 
 """
 Dynamically extend Gate classes with functions required for the Hoare
-optimizer, namely triviality- and post-conditionsto.
+optimizer, namely triviality- and post-conditionsto, as well as their
+classical semantics.
 A return value of 'true' for triviality conditions indicates the gate is
 always trivial, provided the qubit is in a classical state.
 Functions/gates that are omitted here are assumed to always be
 non-trivial and/or have unknown post-conditions.
+Resets and annotations of |0> or |1> states import known classical states.
 """
+import numpy as np
 try:
     from z3 import Not, And
     HAS_Z3 = True
@@ -28,6 +31,20 @@ from qiskit.extensions.standard import IGate, XGate, YGate, ZGate
 from qiskit.extensions.standard import CXGate, CCXGate, CYGate, CZGate
 from qiskit.extensions.standard import TGate, TdgGate, SGate, SdgGate, RZGate, U1Gate
 from qiskit.extensions.standard import SwapGate, CSwapGate, CRZGate, CU1Gate
+from qiskit.circuit import Reset
+from purestate.state_annotation import StateAnnotation
+from ._classical_propagation import ClassicalValue
+
+
+def _annotated_state(annotation):
+    """ True for an annotation of |1>, False for |0>, None for other states """
+    theta = float(annotation.params[0])
+    if np.isclose(theta, 0):
+        return False
+    if np.isclose(theta, np.pi):
+        return True
+    return None
+
 
 if HAS_Z3:
     # FLIP GATES #
@@ -77,4 +94,35 @@ if HAS_Z3:
     SwapGate._trivial_if = lambda self, x1, x2: x1 == x2
     SwapGate._postconditions = lambda self, x1, x2, y1, y2: And(x1 == y2, x2 == y1)
     CSwapGate._trivial_if = lambda self, x1, x2: x1 == x2
-    CSwapGate._postconditions = lambda self, x1, x2, y1, y2: And(x1 == y2, x2 == y1)
\ No newline at end of file
+    CSwapGate._postconditions = lambda self, x1, x2, y1, y2: And(x1 == y2, x2 == y1)
+
+    # KNOWN STATES #
+    # Reset
+    Reset._postconditions = lambda self, x1, y1: Not(y1)
+
+    # StateAnnotation, the identity asserting the state of the qubit
+    def _annotation_postconditions(self, x1, y1):
+        state = _annotated_state(self)
+        if state is None:
+            return y1 == x1
+        return y1 if state else Not(y1)
+    StateAnnotation._postconditions = _annotation_postconditions
+# CLASSICAL SEMANTICS #
+# new values of the target qubits as a function of their old values, for the
+# classical propagation fast path (see _classical_propagation.py)
+for gate_class in [XGate, CXGate, CCXGate, YGate, CYGate]:
+    gate_class._classical = lambda self, x1: (~x1,)
+for gate_class in [IGate, ZGate, CZGate, SGate, SdgGate, TGate, TdgGate,
+                   RZGate, CRZGate, U1Gate, CU1Gate]:
+    gate_class._classical = lambda self, x1: (x1,)
+for gate_class in [SwapGate, CSwapGate]:
+    gate_class._classical = lambda self, x1, x2: (x2, x1)
+Reset._classical = lambda self, x1: (ClassicalValue.constant(False),)
+
+
+def _annotation_classical(self, x1):
+    state = _annotated_state(self)
+    return (x1,) if state is None else (ClassicalValue.constant(state),)
+
+
+StateAnnotation._classical = _annotation_classical
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Unroller whose result stays valid until a pass changes the gates of the DAG."""
+
+from qiskit.transpiler.passes import Unroller
+
+
+class BasisUnroller(Unroller):
+    """ Unroller that preserves itself: once it runs, the DAG is in its basis, and the
+        running pass manager skips an equal BasisUnroller (same basis) without walking
+        the DAG. A transformation pass invalidates that fact, unless it lists the
+        BasisUnroller in its ``preserves`` (e.g. passes that only relabel qubits).
+    """
+
+    def __init__(self, basis):
+        """
+        Args:
+            basis (list[str]): Target basis names to unroll to, e.g. `['u3', 'cx']`.
+        """
+        super().__init__(basis)
+        self.preserves = [self]
+
+
+def preserve_basis(passes, unroller):
+    """ Declare that ``passes`` keep the DAG in the basis of ``unroller``.
+
+    Args:
+        passes (list(BasePass)): transformation passes that do not add gates.
+        unroller (BasisUnroller): unroller whose result they preserve.
+    Returns:
+        list(BasePass): ``passes``.
+    """
+    for pass_ in passes:
+        pass_.preserves = pass_.preserves + [unroller]
+    return passes
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Transpile with several seeds in parallel and keep the best result."""
+
+from copy import copy
+from multiprocessing import Pool
+from queue import Empty, Queue
+import time
+
+from qiskit.transpiler import TranspilerError
+
+from .calibration import estimated_duration, has_gate_lengths
+from .cons_pure_pm import level_3_with_contant_pure
+
+METRICS = ('cx', 'depth', 'duration')
+
+
+def _transpile_seed(circuit, pass_manager_config, pass_manager):
+    """Worker process: transpile ``circuit`` with ``pass_manager``."""
+    return pass_manager(pass_manager_config).run(circuit)
+
+
+def _metrics(circuit, backend_properties):
+    """CX count, depth and (if calibration data is available) estimated duration."""
+    metrics = {'cx': circuit.count_ops().get('cx', 0), 'depth': circuit.depth(),
+               'duration': None}
+    estimate = estimated_duration(circuit, backend_properties)
+    if estimate is not None:
+        metrics['duration'] = estimate[0]
+    return metrics
+
+
+def best_of_seeds(circuit, pass_manager_config, seeds=10, metric='cx', deadline=None,
+                  workers=None, pass_manager=level_3_with_contant_pure, cache=None):
+    """Transpile ``circuit`` with several ``seed_transpiler`` in a process pool, and
+    return the best result by ``metric``. Ties go to the lowest seed.
+
+    Args:
+        circuit (QuantumCircuit): circuit to transpile.
+        pass_manager_config (PassManagerConfig): configuration of the pass manager.
+            Its ``seed_transpiler`` is replaced by each of the seeds.
+        seeds (int or list(int)): number of seeds (0 to seeds-1) or seeds to try.
+        metric (str): 'cx' (CX count), 'depth' or 'duration' (estimated with the
+            ``backend_properties`` of the configuration, see passmanager.calibration).
+        deadline (float): wall-clock seconds to wait for the transpilations. When it
+            passes, the best result so far is returned (None waits for all the seeds).
+        workers (int): number of worker processes (None uses the number of CPUs).
+        pass_manager (callable): pass manager builder, taking a PassManagerConfig.
+        cache (CompilationCache): if given, the seeds compiled before are taken from it,
+            and the others are added to it.
+    Returns:
+        tuple(QuantumCircuit, list(dict)): the best transpiled circuit (None if no
+            seed finished in time or, with 'duration', if no finished seed could be
+            estimated) and, for each seed that finished, a dict with its 'seed' and
+            metrics ('cx', 'depth' and 'duration', None if a gate of the circuit has no
+            calibrated length).
+    Raises:
+        TranspilerError: if the metric is unknown, or 'duration' is asked without
+            gate lengths in the backend properties.
+    """
+    if metric not in METRICS:
+        raise TranspilerError('Invalid metric %s. Use one of %s.' % (metric, ', '.join(METRICS)))
+    backend_properties = pass_manager_config.backend_properties
+    if metric == 'duration' and not has_gate_lengths(backend_properties):
+        raise TranspilerError('The duration metric needs backend_properties with gate '
+                              'lengths.')
+    if isinstance(seeds, int):
+        seeds = range(seeds)
+    seeds = list(dict.fromkeys(seeds))
+
+    best, best_key = None, None
+    candidates = []
+
+    def consider(transpiled, seed):
+        nonlocal best, best_key
+        candidate = _metrics(transpiled, backend_properties)
+        candidate['seed'] = seed
+        candidates.append(candidate)
+        if candidate[metric] is None:
+            # not comparable to the others
+            return
+        key = (candidate[metric], seed)
+        if best_key is None or key < best_key:
+            best, best_key = transpiled, key
+
+    start = time.time()
+    pool = Pool(processes=workers)
+    finished = Queue()  # (seed, transpiled circuit or None if it failed)
+    pending = {}
+    for seed in seeds:
+        config = copy(pass_manager_config)
+        config.seed_transpiler = seed
+        cache_key = None
+        if cache is not None:
+            cache_key = cache.key(circuit, pass_manager, config)
+            transpiled = cache.get(cache_key)
+            if transpiled is not None:
+                transpiled.name = circuit.name
+                consider(transpiled, seed)
+                continue
+        pending[seed] = cache_key
+        pool.apply_async(_transpile_seed, (circuit, config, pass_manager),
+                         callback=lambda transpiled, seed=seed: finished.put((seed, transpiled)),
+                         # a seed that fails does not stop the others
+                         error_callback=lambda _, seed=seed: finished.put((seed, None)))
+
+    try:
+        while pending:
+            timeout = None if deadline is None else deadline - (time.time() - start)
+            if timeout is not None and timeout <= 0:
+                break
+            try:
+                seed, transpiled = finished.get(timeout=timeout)
+            except Empty:
+                break
+            cache_key = pending.pop(seed)
+            if transpiled is None:
+                continue
+            if cache is not None:
+                cache.put(cache_key, transpiled)
+            consider(transpiled, seed)
+    finally:
+        if pending:
+            # stops the transpilations that are still running
+            pool.terminate()
+        else:
+            pool.close()
+        pool.join()
+    return best, sorted(candidates, key=lambda candidate: candidate['seed'])
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Estimates of the cost of a transpiled circuit, based on backend calibration data."""
+
+from qiskit.providers.exceptions import BackendPropertyError
+
+
+def has_gate_lengths(properties):
+    """
+    Returns:
+        bool: if ``properties`` calibrate the length of any gate (FakeMelbourne does not).
+    """
+    return properties is not None and any(parameter.name == 'gate_length'
+                                          for gate in properties.gates
+                                          for parameter in gate.parameters)
+
+
+def _gate_length(properties, name, qubits, readout_length):
+    """Length of a gate in seconds, None if it is not calibrated."""
+    if name == 'measure':
+        try:
+            return properties.qubit_property(qubits[0], 'readout_length')[0]
+        except BackendPropertyError:
+            return readout_length
+    try:
+        return properties.gate_length(name, qubits)
+    except BackendPropertyError:
+        return None
+
+
+def estimated_duration(circuit, properties, readout_length=0.0):
+    """As-soon-as-possible schedule of a circuit using the gate lengths in ``properties``.
+
+    An instruction starts when its qubits, its classical bits and the bits of its
+    condition are free. Barriers take no time.
+
+    Args:
+        circuit (QuantumCircuit): transpiled circuit, on physical qubits.
+        properties (BackendProperties): calibration data of the target backend.
+        readout_length (float): length of the measurements of the qubits without a
+            calibrated ``readout_length`` (none of the fake backends has it). With the
+            default 0.0, the duration ends when the last readouts start.
+    Returns:
+        tuple(float, dict): total duration of the circuit (in seconds) and, for each
+                            used qubit, the time it spends idle within it (the total
+                            duration minus the lengths of its gates). None if a gate
+                            of the circuit has no calibrated length.
+    """
+    if not has_gate_lengths(properties):
+        return None
+    qubit_index = {qubit: index for index, qubit in enumerate(circuit.qubits)}
+    finish = {}  # qubit index or clbit -> time it is free
+    busy = {}
+    for instruction, qargs, cargs in circuit.data:
+        qubits = [qubit_index[qubit] for qubit in qargs]
+        bits = qubits + list(cargs)
+        if instruction.condition is not None:
+            bits += list(instruction.condition[0])
+        start = max(finish.get(bit, 0.0) for bit in bits)
+        if instruction.name == 'barrier':
+            for qubit in qubits:
+                finish[qubit] = start
+            continue
+        length = _gate_length(properties, instruction.name, qubits, readout_length)
+        if length is None:
+            return None
+        for bit in qubits + list(cargs):
+            finish[bit] = start + length
+        for qubit in qubits:
+            busy[qubit] = busy.get(qubit, 0.0) + length
+    duration = max(finish.values(), default=0.0)
+    idle = {qubit: duration - busy[qubit] for qubit in sorted(busy)}
+    return duration, idle
+
+
+def _gate_error(properties, name, qubits):
+    """Error rate of a gate, 0 if it is not calibrated."""
+    try:
+        if name == 'measure':
+            return properties.readout_error(qubits[0])
+        return properties.gate_error(name, qubits)
+    except BackendPropertyError:
+        return 0.0
+
+
+def estimated_success_probability(circuit, properties):
+    """Probability that no gate or readout fails, assuming independent errors with
+    the rates in ``properties``.
+
+    Args:
+        circuit (QuantumCircuit): transpiled circuit, on physical qubits.
+        properties (BackendProperties): calibration data of the target backend.
+    Returns:
+        float: estimated success probability of the circuit.
+    """
+    qubit_index = {qubit: index for index, qubit in enumerate(circuit.qubits)}
+    probability = 1.0
+    for instruction, qargs, _ in circuit.data:
+        if instruction.name == 'barrier':
+            continue
+        qubits = [qubit_index[qubit] for qubit in qargs]
+        probability *= 1 - _gate_error(properties, instruction.name, qubits)
+    return probability
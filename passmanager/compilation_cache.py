@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+On-disk cache of compilation results.
+
+Entries are keyed by a canonical hash of the input circuit, the passes of the pass
+manager (with their attributes and flow controllers), its PassManagerConfig and the
+code version (the sources of passmanager, purestate and benchmark/utils, and the
+Qiskit version), so a change in any of them is a miss. Each entry is a
+pickle file, written to a temporary file and renamed, so several processes can
+share the directory: a reader sees a whole entry or none. When the directory grows
+over ``maxsize`` bytes, the least recently used entries are removed.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+import numpy
+import qiskit
+from qiskit.circuit import Gate, Instruction
+from qiskit.providers.models import BackendProperties
+from qiskit.transpiler import CouplingMap, Layout, PassManager
+from qiskit.transpiler.basepasses import BasePass
+
+_SUFFIX = '.pickle'
+_PACKAGES = ('passmanager', 'purestate', os.path.join('benchmark', 'utils'))
+_CODE_VERSION = None
+# attributes of a pass that the pass manager sets, not its arguments
+_RUNNING_STATE = ('property_set', 'requires', 'preserves', '_hash')
+
+
+def code_version():
+    """
+    Returns:
+        str: hash of the sources of the packages and of the Qiskit version.
+    """
+    global _CODE_VERSION  # pylint: disable=global-statement
+    if _CODE_VERSION is None:
+        digest = hashlib.sha256(qiskit.__version__.encode())
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        for package in _PACKAGES:
+            directory = os.path.join(root, package)
+            for filename in sorted(os.listdir(directory)):
+                if filename.endswith('.py'):
+                    digest.update(filename.encode())
+                    with open(os.path.join(directory, filename), 'rb') as file:
+                        digest.update(file.read())
+        _CODE_VERSION = digest.hexdigest()
+    return _CODE_VERSION
+
+
+def _bit(bit):
+    return [bit.register.name, bit.index]
+
+
+def _type_name(class_):
+    return '%s.%s' % (class_.__module__, class_.__qualname__)
+
+
+def _array(array):
+    """ all the entries of a numpy array, hashed (str() elides the large ones) """
+    return [str(array.dtype), list(array.shape),
+            hashlib.sha256(numpy.ascontiguousarray(array).tobytes()).hexdigest()]
+
+
+def _param(param):
+    if isinstance(param, numpy.ndarray):
+        return _array(param)
+    if isinstance(param, numpy.generic):
+        param = param.item()
+    if isinstance(param, complex):
+        return [param.real, param.imag]
+    if isinstance(param, (int, float)):
+        return param
+    return str(param)  # e.g. a ParameterExpression
+
+
+def _instructions(data):
+    instructions = []
+    for instruction, qargs, cargs in data:
+        condition = None
+        if instruction.condition is not None:
+            condition = [instruction.condition[0].name, instruction.condition[1]]
+        definition = None
+        if type(instruction) in (Gate, Instruction) and instruction.definition:
+            # made from a circuit (e.g. with to_gate), so only its gates tell what it does
+            definition = _instructions(instruction.definition)
+        instructions.append([instruction.name, _type_name(type(instruction)),
+                             [_param(param) for param in instruction.params],
+                             [_bit(qubit) for qubit in qargs], [_bit(clbit) for clbit in cargs],
+                             condition, definition])
+    return instructions
+
+
+def circuit_fingerprint(circuit):
+    """
+    Returns:
+        list: registers and instructions of ``circuit``, in a JSON-serializable form.
+              The name of the circuit is not part of it.
+    """
+    return [[[register.name, register.size] for register in circuit.qregs],
+            [[register.name, register.size] for register in circuit.cregs],
+            _instructions(circuit.data)]
+
+
+def properties_fingerprint(backend_properties):
+    """
+    Returns:
+        str: hash of ``backend_properties`` (None if there are none).
+    """
+    if backend_properties is None:
+        return None
+    return hashlib.sha256(json.dumps(backend_properties.to_dict(),
+                                     sort_keys=True, default=str).encode()).hexdigest()
+
+
+def config_fingerprint(pass_manager_config):
+    """
+    Returns:
+        list: the fields of ``pass_manager_config``, in a JSON-serializable form.
+    """
+    config = pass_manager_config
+    return [config.basis_gates, _canonical(config.coupling_map),
+            _canonical(config.initial_layout), config.layout_method, config.routing_method,
+            properties_fingerprint(config.backend_properties), config.seed_transpiler]
+
+
+def _canonical(value):
+    """ value in a JSON-serializable form. The objects without one (e.g. solvers and
+        caches) are reduced to their type. """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (numpy.ndarray, numpy.generic, complex)):
+        return _param(value)
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((_canonical(item) for item in value), key=json.dumps)
+    if isinstance(value, dict):
+        return sorted(([_canonical(key), _canonical(item)] for key, item in value.items()),
+                      key=json.dumps)
+    if isinstance(value, BasePass):
+        state = {name: item for name, item in vars(value).items()
+                 if name not in _RUNNING_STATE}
+        return [_type_name(type(value)), _canonical(state)]
+    if isinstance(value, CouplingMap):
+        return sorted(_canonical(value.get_edges()))
+    if isinstance(value, Layout):
+        return sorted([physical, _bit(virtual)]
+                      for physical, virtual in value.get_physical_bits().items())
+    if isinstance(value, BackendProperties):
+        return properties_fingerprint(value)
+    if hasattr(value, '__code__'):
+        # e.g. a flow controller, with the values it closes over
+        cells = [cell.cell_contents for cell in value.__closure__ or ()]
+        return [value.__module__, value.__qualname__, _canonical(cells)]
+    return _type_name(type(value))
+
+
+def pass_manager_fingerprint(pass_manager):
+    """
+    Returns:
+        list: the passes of each pass set of ``pass_manager``, with their attributes,
+              and its flow controllers, in a JSON-serializable form.
+    """
+    # terra 0.13 has no public access to the flow controllers of a pass manager
+    return [pass_manager.max_iteration,
+            [[_canonical(pass_set['passes']), _canonical(pass_set['flow_controllers'])]
+             for pass_set in pass_manager._pass_sets]]
+
+
+class CompilationCache:
+    """ Size-bounded on-disk cache of compilation results, that several processes
+        can share.
+    """
+
+    def __init__(self, directory, maxsize=2 ** 30):
+        """
+        Args:
+            directory (str): directory of the entries. It is created if needed.
+            maxsize (int): maximum size of the entries, in bytes
+        """
+        self.directory = directory
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(circuit, pass_manager, pass_manager_config, kind='circuit'):
+        """
+        Args:
+            circuit (QuantumCircuit): input circuit.
+            pass_manager (callable, PassManager or str): pass manager builder, taking
+                ``pass_manager_config``, the pass manager it builds, or a name for it.
+                The key covers the passes of the pass manager (see
+                pass_manager_fingerprint), so builders that wrap another one with other
+                arguments (e.g. lambdas or partials) do not collide.
+            pass_manager_config (PassManagerConfig): configuration of the pass manager.
+            kind (str): what is cached, so different kinds of results do not collide.
+        Returns:
+            str: key of the compilation result.
+        """
+        if isinstance(pass_manager, str):
+            passes = pass_manager
+        else:
+            if not isinstance(pass_manager, PassManager):
+                pass_manager = pass_manager(pass_manager_config)
+            passes = pass_manager_fingerprint(pass_manager)
+        content = [kind, passes, config_fingerprint(pass_manager_config),
+                   circuit_fingerprint(circuit), code_version()]
+        return hashlib.sha256(json.dumps(content).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def get(self, key):
+        """ Returns: the cached result for key, None if there is none """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                value = pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            # missing, or evicted by another process meanwhile
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)  # recently used
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """ cache the result for key, evicting the least recently used ones if full """
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                pickle.dump(value, file)
+            os.replace(temporary, self._path(key))
+        except BaseException:
+            os.remove(temporary)
+            raise
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(_SUFFIX):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.maxsize:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # another process evicted it
+            size -= entry_size
+
+    def clear(self):
+        """ remove all the entries """
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(_SUFFIX):
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+    def run(self, pass_manager, pass_manager_config, circuit):
+        """ Like ``pass_manager(pass_manager_config).run(circuit)``, from the cache if
+            it was compiled before.
+
+        Args:
+            pass_manager (callable): pass manager builder, taking a PassManagerConfig.
+            pass_manager_config (PassManagerConfig): configuration of the pass manager.
+            circuit (QuantumCircuit): circuit to transpile.
+        Returns:
+            QuantumCircuit: the transpiled circuit.
+        """
+        pass_manager = pass_manager(pass_manager_config)
+        key = self.key(circuit, pass_manager, pass_manager_config)
+        transpiled = self.get(key)
+        if transpiled is None:
+            transpiled = pass_manager.run(circuit)
+            self.put(key, transpiled)
+        transpiled.name = circuit.name
+        return transpiled
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+# This code is based on Qiskit. qiskit/transpiler/preset_passmanagers/level1.py and level2.py
+# (C) Copyright IBM 2017, 2018.
+#
+# Modified by Luciano Bello
+# (C) Copyright Ji Liu and Luciano Bello, 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Based on qiskit/transpiler/preset_passmanagers/level1.py and level2.py
+Pass managers for optimization levels 1 and 2 with relaxed peephole optimization. They
+have the cheap layout and routing of their level (no CSPLayout, 20 swap trials).
+"""
+
+from qiskit.transpiler.passmanager_config import PassManagerConfig
+from qiskit.transpiler.passmanager import PassManager
+
+from qiskit.transpiler.passes import Unroll3qOrMore
+from qiskit.transpiler.passes import CheckMap
+from qiskit.transpiler.passes import CXDirection
+from qiskit.transpiler.passes import SetLayout
+from qiskit.transpiler.passes import TrivialLayout
+from qiskit.transpiler.passes import DenseLayout
+from qiskit.transpiler.passes import NoiseAdaptiveLayout
+from qiskit.transpiler.passes import Layout2qDistance
+from qiskit.transpiler.passes import BarrierBeforeFinalMeasurements
+from qiskit.transpiler.passes import BasicSwap
+from qiskit.transpiler.passes import LookaheadSwap
+from qiskit.transpiler.passes import StochasticSwap
+from qiskit.transpiler.passes import FullAncillaAllocation
+from qiskit.transpiler.passes import EnlargeWithAncilla
+from qiskit.transpiler.passes import FixedPoint
+from qiskit.transpiler.passes import Depth
+from qiskit.transpiler.passes import RemoveResetInZeroState
+from qiskit.transpiler.passes import Optimize1qGates
+from qiskit.transpiler.passes import CXCancellation
+from qiskit.transpiler.passes import CommutativeCancellation
+from qiskit.transpiler.passes import ApplyLayout
+from qiskit.transpiler.passes import CheckCXDirection
+from qiskit.transpiler import TranspilerError
+
+from purestate import ConstantsStateOptimization, PureStateOnU
+from .basis_unroller import BasisUnroller, preserve_basis
+
+
+def _improve_layout(layout_method, coupling_map, backend_properties):
+    if layout_method == 'trivial':
+        return TrivialLayout(coupling_map)
+    if layout_method == 'dense':
+        return DenseLayout(coupling_map, backend_properties)
+    if layout_method == 'noise_adaptive':
+        return NoiseAdaptiveLayout(backend_properties)
+    raise TranspilerError("Invalid layout method %s." % layout_method)
+
+
+def _swap(routing_method, coupling_map, seed_transpiler, lookahead):
+    swap = [BarrierBeforeFinalMeasurements(), Unroll3qOrMore()]
+    if routing_method == 'basic':
+        swap += [BasicSwap(coupling_map)]
+    elif routing_method == 'stochastic':
+        swap += [StochasticSwap(coupling_map, trials=20, seed=seed_transpiler)]
+    elif routing_method == 'lookahead':
+        swap += [LookaheadSwap(coupling_map, search_depth=lookahead, search_width=lookahead)]
+    else:
+        raise TranspilerError("Invalid routing method %s." % routing_method)
+    return swap
+
+
+def _with_contant_pure(pass_manager_config, layout, lookahead, optimizations):
+    """Pass manager of levels 1 and 2, with the ``(passes, condition)`` pairs of their
+    layout and the optimizations of their loop."""
+    basis_gates = pass_manager_config.basis_gates
+    coupling_map = pass_manager_config.coupling_map
+    routing_method = pass_manager_config.routing_method or 'stochastic'
+    seed_transpiler = pass_manager_config.seed_transpiler
+
+    # 1. Unroll to the basis first, keeping the annotations of the constant states
+    _unroll = BasisUnroller(basis_gates + ['annotation'])
+
+    # 3. Extend dag/layout with ancillas using the full coupling map
+    _embed = [FullAncillaAllocation(coupling_map)] + \
+        preserve_basis([EnlargeWithAncilla(), ApplyLayout()], _unroll)
+
+    # 4. Unroll to 1q or 2q gates, swap to fit the coupling map
+    _swap_check = CheckMap(coupling_map)
+
+    def _swap_condition(property_set):
+        return not property_set['is_swap_mapped']
+
+    # 5. Fix any bad CX directions
+    _direction_check = [CheckCXDirection(coupling_map)]
+
+    def _direction_condition(property_set):
+        return not property_set['is_direction_mapped']
+
+    _direction = [CXDirection(coupling_map)]
+
+    # 6. Optimizations of the level iteratively until no more change in depth
+    _depth_check = [Depth(), FixedPoint('depth')]
+
+    def _opt_control(property_set):
+        return not property_set['depth_fixed_point']
+
+    pm = PassManager()
+    pm.append(ConstantsStateOptimization())
+    pm.append(_unroll)
+    if coupling_map:
+        pm.append(SetLayout(pass_manager_config.initial_layout))
+        for passes, condition in layout:
+            pm.append(passes, condition=condition)
+        pm.append(_embed)
+        pm.append(_swap_check)
+        pm.append(_swap(routing_method, coupling_map, seed_transpiler, lookahead),
+                  condition=_swap_condition)
+    pm.append(ConstantsStateOptimization())
+    pm.append([BasisUnroller(basis_gates+['swap', 'aswap', 'annotation']),
+               Optimize1qGates(), PureStateOnU()])
+    pm.append(BasisUnroller(basis_gates))
+    if coupling_map and not coupling_map.is_symmetric:
+        pm.append(_direction_check)
+        pm.append(_direction, condition=_direction_condition)
+    pm.append(RemoveResetInZeroState())
+    pm.append(_depth_check + optimizations, do_while=_opt_control)
+    return pm
+
+
+def level_1_with_contant_pure(pass_manager_config: PassManagerConfig) -> PassManager:
+    """
+    Args:
+        pass_manager_config: configuration of the pass manager.
+
+    Returns:
+        a level 1 pass manager: trivial layout (dense if the trivial one needs swaps),
+        adjacent gate collapsing and relaxed peephole optimization.
+    """
+    coupling_map = pass_manager_config.coupling_map
+    layout_method = pass_manager_config.layout_method or 'dense'
+
+    # 2. Use trivial layout if no layout given, a better one if the circuit needs swaps
+    def _choose_layout_condition(property_set):
+        return not property_set['layout']
+
+    def _not_perfect_yet(property_set):
+        return property_set['trivial_layout_score'] is not None and \
+               property_set['trivial_layout_score'] != 0
+
+    _layout = [([TrivialLayout(coupling_map),
+                 Layout2qDistance(coupling_map, property_name='trivial_layout_score')],
+                _choose_layout_condition),
+               (_improve_layout(layout_method, coupling_map,
+                                pass_manager_config.backend_properties),
+                _not_perfect_yet)]
+
+    return _with_contant_pure(pass_manager_config, _layout, lookahead=4,
+                              optimizations=[Optimize1qGates(pass_manager_config.basis_gates),
+                                             CXCancellation()])
+
+
+def level_2_with_contant_pure(pass_manager_config: PassManagerConfig) -> PassManager:
+    """
+    Args:
+        pass_manager_config: configuration of the pass manager.
+
+    Returns:
+        a level 2 pass manager: dense layout (without the perfect layout search of
+        CSPLayout), commutative cancellation and relaxed peephole optimization.
+    """
+    coupling_map = pass_manager_config.coupling_map
+    layout_method = pass_manager_config.layout_method or 'dense'
+
+    # 2. Choose a dense layout, if no layout given
+    def _choose_layout_condition(property_set):
+        return not property_set['layout']
+
+    _layout = [(_improve_layout(layout_method, coupling_map,
+                                pass_manager_config.backend_properties),
+                _choose_layout_condition)]
+
+    return _with_contant_pure(pass_manager_config, _layout, lookahead=5,
+                              optimizations=[Optimize1qGates(pass_manager_config.basis_gates),
+                                             CommutativeCancellation()])
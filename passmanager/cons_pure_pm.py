@@ -22,7 +22,6 @@ Pass manager for optimization level 3, providing heavy optimization.
 from qiskit.transpiler.passmanager_config import PassManagerConfig
 from qiskit.transpiler.passmanager import PassManager
 
-from qiskit.transpiler.passes import Unroller
 from qiskit.transpiler.passes import Unroll3qOrMore
 from qiskit.transpiler.passes import CheckMap
 from qiskit.transpiler.passes import CXDirection
@@ -51,12 +50,31 @@ from qiskit.transpiler.passes import CheckCXDirection
 from qiskit.transpiler import TranspilerError
 
 from purestate import ConstantsStateOptimization, PureStateOnU
-
-
-def level_3_with_contant_pure(pass_manager_config: PassManagerConfig) -> PassManager:
+from .basis_unroller import BasisUnroller, preserve_basis
+from .deadline import SetDeadline, before_deadline, stage_budgets
+from .dirty_loop import WireSignature, has_dirty_qubits
+from .layout_cache import LayoutCache, CachedLayout, StoreLayout
+
+
+def level_3_with_contant_pure(pass_manager_config: PassManagerConfig,
+                              deadline: float = None,
+                              incremental_loop: bool = False,
+                              layout_cache: LayoutCache = None,
+                              swap_trials: int = None,
+                              constants_in_loop: bool = False) -> PassManager:
     """
     Args:
         pass_manager_config: configuration of the pass manager.
+        deadline: seconds for the whole run, split across the stages (see
+            passmanager.deadline). None keeps the full budgets.
+        incremental_loop: end the optimization loop after the first iteration that
+            changes no qubit, instead of one iteration later (same result).
+        layout_cache: layouts to reuse for circuits with the same interaction graph
+            (see passmanager.layout_cache). The layouts chosen here are added to it.
+        swap_trials: trials of StochasticSwap. None is the budget of the deadline (see
+            passmanager.deadline); with a deadline, the smaller of both.
+        constants_in_loop: also run ConstantsStateOptimization in each iteration of the
+            optimization loop.
 
     Returns:
         a level 3 pass manager.
@@ -70,7 +88,7 @@ def level_3_with_contant_pure(pass_manager_config: PassManagerConfig) -> PassMan
     backend_properties = pass_manager_config.backend_properties
 
     # 1. Unroll to the basis first, to prepare for noise-adaptive layout
-    _unroll = Unroller(basis_gates + ['annotation'])
+    _unroll = BasisUnroller(basis_gates + ['annotation'])
 
     # 2. Layout on good qubits if calibration info available, otherwise on dense links
     _given_layout = SetLayout(initial_layout)
@@ -78,7 +96,13 @@ def level_3_with_contant_pure(pass_manager_config: PassManagerConfig) -> PassMan
     def _choose_layout_condition(property_set):
         return not property_set['layout']
 
-    _choose_layout_1 = CSPLayout(coupling_map, call_limit=10000, time_limit=60)
+    budgets = stage_budgets(deadline)
+    if swap_trials is not None:
+        budgets['swap_trials'] = swap_trials if deadline is None else \
+            min(swap_trials, budgets['swap_trials'])
+    _choose_layout_1 = CSPLayout(coupling_map, seed=seed_transpiler,
+                                 call_limit=budgets['csp_call_limit'],
+                                 time_limit=budgets['csp_time_limit'])
     if layout_method == 'trivial':
         _choose_layout_2 = TrivialLayout(coupling_map)
     elif layout_method == 'dense':
@@ -88,8 +112,17 @@ def level_3_with_contant_pure(pass_manager_config: PassManagerConfig) -> PassMan
     else:
         raise TranspilerError("Invalid layout method %s." % layout_method)
 
-    # 3. Extend dag/layout with ancillas using the full coupling map
-    _embed = [FullAncillaAllocation(coupling_map), EnlargeWithAncilla(), ApplyLayout()]
+    if layout_cache is not None:
+        # the cached layout of the interaction graph, if any, instead of the search
+        _cached_layout = CachedLayout(layout_cache, coupling_map, backend_properties,
+                                      layout_method)
+        _store_layout = StoreLayout(layout_cache, coupling_map, backend_properties,
+                                    layout_method)
+
+    # 3. Extend dag/layout with ancillas using the full coupling map (this only relabels
+    #    qubits, so an unrolled DAG stays unrolled)
+    _embed = [FullAncillaAllocation(coupling_map)] + \
+        preserve_basis([EnlargeWithAncilla(), ApplyLayout()], _unroll)
 
     # 4. Unroll to 1q or 2q gates, swap to fit the coupling map
     _swap_check = CheckMap(coupling_map)
@@ -101,7 +134,8 @@ def level_3_with_contant_pure(pass_manager_config: PassManagerConfig) -> PassMan
     if routing_method == 'basic':
         _swap += [BasicSwap(coupling_map)]
     elif routing_method == 'stochastic':
-        _swap += [StochasticSwap(coupling_map, trials=200, seed=seed_transpiler)]
+        _swap += [StochasticSwap(coupling_map, trials=budgets['swap_trials'],
+                                 seed=seed_transpiler)]
     elif routing_method == 'lookahead':
         _swap += [LookaheadSwap(coupling_map, search_depth=5, search_width=6)]
     else:
@@ -111,13 +145,21 @@ def level_3_with_contant_pure(pass_manager_config: PassManagerConfig) -> PassMan
     _depth_check = [Depth(), FixedPoint('depth')]
 
     def _opt_control(property_set):
-        return not property_set['depth_fixed_point']
-
-    _opt = [RemoveResetInZeroState(),
-            Collect2qBlocks(), ConsolidateBlocks(),
-            Unroller(basis_gates),  # unroll unitaries
-            Optimize1qGates(basis_gates), CommutativeCancellation(),
-            OptimizeSwapBeforeMeasure(), RemoveDiagonalGatesBeforeMeasure()]
+        return (not property_set['depth_fixed_point'] and before_deadline(property_set) and
+                (not incremental_loop or has_dirty_qubits(property_set)))
+
+    _opt = [RemoveResetInZeroState()]
+    if constants_in_loop:
+        _opt += [ConstantsStateOptimization()]
+    # Collect2qBlocks leaves SWAP and ASWAP out of the blocks until they are unrolled.
+    # Consolidating them too gave more CX and depth on the random suite.
+    _opt += [Collect2qBlocks(), ConsolidateBlocks(),
+             BasisUnroller(basis_gates),  # unroll unitaries
+             Optimize1qGates(basis_gates), CommutativeCancellation(),
+             OptimizeSwapBeforeMeasure(), RemoveDiagonalGatesBeforeMeasure()]
+    if incremental_loop:
+        # stop as soon as an iteration changes nothing (see passmanager.dirty_loop)
+        _opt += [WireSignature()]
 
     # 6. Fix any CX direction mismatch
     _direction_check = [CheckCXDirection(coupling_map)]
@@ -129,17 +171,23 @@ def level_3_with_contant_pure(pass_manager_config: PassManagerConfig) -> PassMan
 
     # Build pass manager
     pm = PassManager()
+    if deadline is not None:
+        pm.append(SetDeadline(deadline))
     pm.append(ConstantsStateOptimization())
     pm.append(_unroll)
     if coupling_map:
         pm.append(_given_layout)
+        if layout_cache is not None:
+            pm.append(_cached_layout, condition=_choose_layout_condition)
         pm.append(_choose_layout_1, condition=_choose_layout_condition)
         pm.append(_choose_layout_2, condition=_choose_layout_condition)
+        if layout_cache is not None:
+            pm.append(_store_layout)
         pm.append(_embed)
         pm.append(_swap_check)
         pm.append(_swap, condition=_swap_condition)
     pm.append(ConstantsStateOptimization())
-    pm.append([Unroller(basis_gates+['swap', 'aswap', 'annotation']),
+    pm.append([BasisUnroller(basis_gates+['swap', 'aswap', 'annotation']),
                Optimize1qGates(), PureStateOnU()])
     pm.append(_depth_check + _opt, do_while=_opt_control)
     if coupling_map and not coupling_map.is_symmetric:
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Compile deadline of the pass managers.
+
+A deadline (in seconds, from the start of the run) is split across the stages: a
+share for the layout search (the time limit of CSPLayout) and for routing (the trials
+of StochasticSwap). The Hoare optimizer takes its share of the time actually left when
+it starts, so it makes up for the earlier stages running early or late. The
+optimization loop takes what is left: it stops iterating once the deadline passes. A
+stage that started is not interrupted, so the first iteration of the loop always runs
+and the run can end after the deadline. Without a deadline, the pass managers keep
+their full budgets.
+"""
+
+import time
+
+from qiskit.transpiler.basepasses import AnalysisPass
+
+# fraction of the deadline for each stage, the optimization loop gets the rest
+SHARES = {'layout': 0.25, 'routing': 0.25, 'hoare': 0.2}
+
+# full budgets, and the seconds from which routing runs all of its trials
+CSP_TIME_LIMIT = 60
+CSP_CALL_LIMIT = 10000
+SWAP_TRIALS = 200
+SWAP_MIN_TRIALS = 20
+SWAP_SECONDS = 10
+
+
+def stage_budgets(deadline):
+    """
+    Args:
+        deadline (float): seconds for the whole run, or None for no deadline.
+    Returns:
+        dict: the budgets of the stages: 'csp_time_limit' and 'csp_call_limit' of
+              CSPLayout, 'swap_trials' of StochasticSwap and 'hoare_deadline_share' (the
+              deadline_share of HoareOptimizer, None is unbounded).
+    """
+    if deadline is None:
+        return {'csp_time_limit': CSP_TIME_LIMIT, 'csp_call_limit': CSP_CALL_LIMIT,
+                'swap_trials': SWAP_TRIALS, 'hoare_deadline_share': None}
+    layout = min(1, deadline * SHARES['layout'] / CSP_TIME_LIMIT)
+    routing = min(1, deadline * SHARES['routing'] / SWAP_SECONDS)
+    return {'csp_time_limit': CSP_TIME_LIMIT * layout,
+            'csp_call_limit': max(1, int(CSP_CALL_LIMIT * layout)),
+            'swap_trials': max(SWAP_MIN_TRIALS, int(SWAP_TRIALS * routing)),
+            # on schedule, the time left after routing is the share of the Hoare
+            # optimizer and of the optimization loop
+            'hoare_deadline_share': SHARES['hoare'] / (1 - SHARES['layout'] -
+                                                       SHARES['routing'])}
+
+
+class SetDeadline(AnalysisPass):
+    """Sets the property ``deadline``: the time (as in time.time()) the run should end."""
+
+    def __init__(self, seconds):
+        """
+        Args:
+            seconds (float): seconds from now (the start of the run) to the deadline.
+        """
+        super().__init__()
+        self.seconds = seconds
+
+    def run(self, dag):
+        self.property_set['deadline'] = time.time() + self.seconds
+
+
+def before_deadline(property_set):
+    """Flow controller condition: there is no deadline, or it did not pass yet."""
+    return property_set['deadline'] is None or time.time() < property_set['deadline']
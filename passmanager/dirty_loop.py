@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Changed regions of the optimization loop.
+
+The optimization loop of the pass managers runs until the depth stops changing. It
+compares the depth at the start of two iterations, so it always ends with an extra
+iteration on a DAG that the previous one did not change. WireSignature hashes the
+gates on each qubit after an iteration: the qubits whose hash changed are the dirty
+region of the iteration. When no qubit is dirty, the next iteration would do the
+same as the previous one (the passes of the loop are deterministic), and the loop
+can stop with the same result.
+"""
+
+from qiskit.transpiler.basepasses import AnalysisPass
+
+
+def _param_key(param):
+    try:
+        hash(param)
+        return param
+    except TypeError:  # e.g. the matrix of a unitary
+        return param.tobytes()
+
+
+class WireSignature(AnalysisPass):
+    """ Sets the property ``wire_signature`` (a hash of the gates on each qubit) and
+        ``dirty_qubits`` (the qubits whose hash changed since the previous run).
+    """
+
+    def run(self, dag):
+        signature = {qubit: 0 for qubit in dag.qubits()}
+        for node in dag.topological_op_nodes():
+            condition = None
+            if node.condition is not None:
+                condition = (node.condition[0].name, node.condition[1])
+            key = (node.name, tuple(_param_key(param) for param in node.op.params),
+                   tuple(qubit.index for qubit in node.qargs),
+                   tuple(clbit.index for clbit in node.cargs), condition)
+            for qubit in node.qargs:
+                signature[qubit] = hash((signature[qubit], key))
+        previous = self.property_set['wire_signature'] or {}
+        self.property_set['dirty_qubits'] = {qubit for qubit, value in signature.items()
+                                             if previous.get(qubit) != value}
+        self.property_set['wire_signature'] = signature
+
+
+def has_dirty_qubits(property_set):
+    """Flow controller condition: the last WireSignature found changed qubits."""
+    return bool(property_set['dirty_qubits'])
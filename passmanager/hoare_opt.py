@@ -12,19 +12,149 @@
 # that they have been altered from the originals.
 
 """ Pass for hoare logic circuit optimization. """
-from qiskit.transpiler.basepasses import TransformationPass
-from qiskit.circuit import ControlledGate, Gate
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import heapq
+from importlib import import_module
+import pickle
+import re
+import time
+
+import numpy as np
+from qiskit.transpiler.basepasses import AnalysisPass, TransformationPass
+from qiskit.circuit import ControlledGate, Gate, QuantumCircuit
+from qiskit.circuit.exceptions import CircuitError
+from qiskit.converters import circuit_to_dag
 from qiskit.extensions.unitary import UnitaryGate
 from qiskit.quantum_info.operators.predicates import matrix_equal
 from qiskit.transpiler.exceptions import TranspilerError
-from . import _gate_extension  # pylint: disable=W0611
+from ._classical_propagation import ClassicalPropagation
 
-try:
-    from z3 import And, Or, Not, Implies, Solver, Bool, unsat
+# z3, imported when the first HoareOptimizer is built (see _import_z3)
+z3 = None  # pylint: disable=invalid-name
 
-    HAS_Z3 = True
-except ImportError:
-    HAS_Z3 = False
+
+_VARNAME = re.compile(r'q\d+_\d+')
+_SLOWEST = 5
+_DECIMALS = 8
+
+
+class TrivialityCache:
+    """ LRU cache of solver answers, keyed by a canonical hash of the query and of
+        the constraints it depends on. It can be shared between runs of the pass
+        and saved to a file.
+    """
+
+    def __init__(self, maxsize=100000):
+        """
+        Args:
+            maxsize (int): maximum number of answers kept
+        """
+        self.maxsize = maxsize
+        self.answers = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """ Returns: the cached answer for key, None if there is none """
+        answer = self.answers.get(key)
+        if answer is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.answers.move_to_end(key)
+        return answer
+
+    def put(self, key, answer):
+        """ cache the answer for key, evicting the least recently used one if full """
+        self.answers[key] = answer
+        self.answers.move_to_end(key)
+        if len(self.answers) > self.maxsize:
+            self.answers.popitem(last=False)
+
+    def save(self, path):
+        """ save the answers to the file path """
+        with open(path, 'wb') as file:
+            pickle.dump(self.answers, file)
+
+    @classmethod
+    def load(cls, path, maxsize=100000):
+        """ Returns: a cache with the answers saved in the file path """
+        cache = cls(maxsize)
+        with open(path, 'rb') as file:
+            cache.answers = pickle.load(file)
+        return cache
+
+
+class _GateCache:
+    """ gates on one qubit, in circuit order, as a doubly linked list, so appending,
+        removing, finding the successor of a gate and dropping the oldest gates
+        take constant time per gate
+    """
+
+    def __init__(self):
+        self.next = dict()
+        self.prev = dict()
+        self.head = None
+        self.tail = None
+
+    def __len__(self):
+        return len(self.next)
+
+    def __contains__(self, node):
+        return node in self.next
+
+    def __iter__(self):
+        node = self.head
+        while node is not None:
+            yield node
+            node = self.next[node]
+
+    def append(self, node):
+        """ add node after the last gate """
+        self.prev[node] = self.tail
+        self.next[node] = None
+        if self.tail is None:
+            self.head = node
+        else:
+            self.next[self.tail] = node
+        self.tail = node
+
+    def remove(self, node):
+        """ remove node, if it is in the cache """
+        if node not in self.next:
+            return
+        prev, nxt = self.prev.pop(node), self.next.pop(node)
+        if prev is None:
+            self.head = nxt
+        else:
+            self.next[prev] = nxt
+        if nxt is None:
+            self.tail = prev
+        else:
+            self.prev[nxt] = prev
+
+    def successor(self, node):
+        """ Returns: the gate after node, None if node is the last one or not cached """
+        return self.next.get(node)
+
+
+class _NodeInfo:
+    """ control/target split of a gate, with the z3 variables of its qubits before
+        the gate and the condition that all its controls are 1
+    """
+    __slots__ = ('ctrlqb', 'trgtqb', 'trgt_ids', 'ctrlvar', 'trgtvar', 'ctrl_ones',
+                 'c_ctrl_ones')
+
+    def __init__(self, ctrlqb, trgtqb, ctrlvar, trgtvar, c_ctrl_ones):
+        self.ctrlqb = ctrlqb
+        self.trgtqb = trgtqb
+        self.trgt_ids = tuple(qbt.index for qbt in trgtqb)
+        self.ctrlvar = ctrlvar
+        self.trgtvar = trgtvar
+        self.ctrl_ones = z3.And(*ctrlvar)
+        self.c_ctrl_ones = c_ctrl_ones
 
 
 class HoareOptimizer(TransformationPass):
@@ -33,23 +163,91 @@ class HoareOptimizer(TransformationPass):
         https://arxiv.org/abs/1810.00375
     """
 
-    def __init__(self, size=10):
+    def __init__(self, size=10, window=None, propagation=True, cache=None, cache_cone=64,
+                 query_timeout=None, query_conflicts=None, time_budget=None,
+                 conflict_budget=None, workers=None, incremental='assumptions', seq_len=2,
+                 time_limit=None, deadline_share=None):
         """
         Args:
             size (int): size of gate cache, in number of gates
+            window (int): number of most recent gates whose constraints are kept
+                          in the solver (None keeps all). Older constraints are
+                          replaced by the classical value of each qubit, if known.
+            propagation (bool): decide the queries that classical propagation can
+                                decide without calling the solver
+            cache (TrivialityCache): solver answers, to share between runs of the
+                                     pass. None (the default) caches nothing: every
+                                     query goes to the incremental solver of the pass
+            cache_cone (int): with a cache, queries depending on more constraints than
+                              this are not cached, as hashing them would cost more
+                              than solving
+            query_timeout (int): milliseconds the solver can spend on each query
+            query_conflicts (int): conflicts the solver can run into on each query
+            time_budget (float): seconds the solver can spend in the whole pass
+            conflict_budget (int): conflicts the solver can run into in the whole pass
+                When a query runs out of budget, its answer is unknown and the gate
+                is kept (treated as non-trivial).
+            workers (int): number of processes to optimize the independent qubit
+                           components of the circuit in. Each component gets its own
+                           solver, window and budgets (None optimizes in this process)
+            incremental (str): how queries are added to the solver of the pass.
+                'assumptions' guards each query with a fresh indicator literal and
+                checks under that assumption, so the solver keeps what it learnt.
+                The solver restarts without the retired guards when they outnumber
+                the constraints.
+                'pushpop' adds each query in a push()/pop() scope.
+            seq_len (int): longest sequence of target successive gates that is
+                           checked to combine to the identity
+            time_limit (float): wall-clock seconds for the whole pass. When they are
+                                used up, the remaining gates are kept as they are.
+            deadline_share (float): fraction of the time left to the property
+                                    ``deadline`` (see passmanager.deadline) when the pass
+                                    starts, that the pass can use, as with time_limit.
+                                    Each query is also limited to what is left of it.
         Raises:
-            TranspilerError: if unable to import z3 solver
+            TranspilerError: if unable to import z3 solver, or incremental is unknown
         """
-        if not HAS_Z3:
+        if not _import_z3():
             raise TranspilerError('z3-solver is required to use HoareOptimizer. '
                                   'To install, run "pip install z3-solver".')
+        if incremental not in ('assumptions', 'pushpop'):
+            raise TranspilerError('Invalid incremental strategy %s.' % incremental)
         super().__init__()
-        self.solver = Solver()
+        self.incremental = incremental
+        self.seq_len = seq_len
+        self.fingerprints = dict()
+        self.indicators = 0
+        self.retired = 0
+        self.query_timeout = query_timeout
+        self.query_conflicts = query_conflicts
+        self.time_budget = time_budget
+        self.conflict_budget = conflict_budget
+        self.workers = workers
+        self.time_limit = time_limit
+        self.deadline_share = deadline_share
+        self.stop_at = None
+        self.stats = {'queries': 0, 'sat': 0, 'unsat': 0, 'unknown': 0, 'classical': 0,
+                      'cache_hits': 0, 'solver_time': 0.0, 'conflicts': 0, 'skipped': 0,
+                      'slowest': []}
+        self.current = None
+        self.solver = self._new_solver()
         self.variables = dict()
         self.gatenum = dict()
         self.gatecache = dict()
-        self.varnum = dict()
+        self.nodeinfo = dict()
+        self.position = dict()
+        self.not_identities = set()
         self.size = size
+        self.window = window
+        self.constraints = []
+        self.gatestep = 0
+        self.window_start = 0
+        self.propagation = propagation
+        self.classical = ClassicalPropagation()
+        self.cache = cache
+        self.cache_cone = cache_cone
+        self.definitions = dict()
+        self.sexprs = dict()
 
     def _gen_variable(self, qb_id):
         """ After each gate generate a new unique variable name for each of the
@@ -61,7 +259,7 @@ class HoareOptimizer(TransformationPass):
             BoolRef: z3 variable of qubit state
         """
         varname = "q" + str(qb_id) + "_" + str(self.gatenum[qb_id])
-        var = Bool(varname)
+        var = z3.Bool(varname)
         self.gatenum[qb_id] += 1
         self.variables[qb_id].append(var)
         return var
@@ -74,72 +272,248 @@ class HoareOptimizer(TransformationPass):
         for qbt in dag.qubits():
             self.gatenum[qbt.index] = 0
             self.variables[qbt.index] = []
-            self.gatecache[qbt.index] = []
-            self.varnum[qbt.index] = dict()
+            self.gatecache[qbt.index] = _GateCache()
             x = self._gen_variable(qbt.index)
-            self.solver.add(Not(x))
+            self._add_constraint(z3.Not(x), [x])
+            self.classical.initialize(x)
 
-    def _add_postconditions(self, gate, ctrl_ones, trgtqb, trgtvar):
+    def _add_constraint(self, constraint, defines):
+        """ add a constraint to the solver, remembering when it was added
+        Args:
+            constraint (BoolRef): z3 formula to add
+            defines (list(BoolRef)): new variables the constraint is about
+        """
+        self.solver.add(constraint)
+        names = [var.decl().name() for var in defines]
+        for name in names:
+            self.definitions.setdefault(name, []).append(constraint)
+        self.constraints.append((self.gatestep, constraint, names))
+
+    def _slide_window(self):
+        """ restart the solver with the constraints of the last self.window gates,
+            plus the classical value of the latest variable of each qubit
+        """
+        facts = []
+        for variables in self.variables.values():
+            var = variables[-1]
+            value = self.classical.value(var)
+            if self._is_unsat(var, value):
+                facts.append((z3.Not(var), [var.decl().name()]))
+            elif self._is_unsat(z3.Not(var), ~value):
+                facts.append((var, [var.decl().name()]))
+        start = self.gatestep - self.window
+        self.constraints = [record for record in self.constraints if record[0] >= start]
+        self.constraints.extend((self.gatestep, fact, names) for fact, names in facts)
+        self._restart_solver()
+        self.window_start = self.gatestep
+
+    def _restart_solver(self):
+        """ a new solver with self.constraints, without the retired query guards """
+        self.solver = self._new_solver()
+        self.definitions = dict()
+        for _, constraint, names in self.constraints:
+            self.solver.add(constraint)
+            for name in names:
+                self.definitions.setdefault(name, []).append(constraint)
+        self.retired = 0
+
+    def _sexpr(self, formula):
+        """ Returns: the (memoized) s-expression of a z3 formula """
+        key = formula.get_id()
+        if key not in self.sexprs:
+            self.sexprs[key] = formula.sexpr()
+        return self.sexprs[key]
+
+    def _query_cone(self, query):
+        """ the constraints in the backward light cone of the query, and a canonical
+            hash of them and the query, with the variables renamed in order of
+            appearance
+        Args:
+            query (BoolRef): z3 formula to check
+        Returns:
+            tuple(str, list(BoolRef)): key of the query and its light cone, or
+                                       (None, None) if the cone is larger than cache_cone
+        """
+        texts = [query.sexpr()]
+        cone = []
+        seen = set()
+        visited = set()
+        pending = deque(_VARNAME.findall(texts[0]))
+        while pending:
+            name = pending.popleft()
+            if name in visited:
+                continue
+            visited.add(name)
+            for constraint in self.definitions.get(name, []):
+                if constraint.get_id() in seen:
+                    continue
+                seen.add(constraint.get_id())
+                if len(seen) > self.cache_cone:
+                    return None, None
+                cone.append(constraint)
+                text = self._sexpr(constraint)
+                texts.append(text)
+                pending.extend(_VARNAME.findall(text))
+
+        names = dict()
+        canonical = _VARNAME.sub(lambda match: names.setdefault(match.group(0),
+                                                                'v%d' % len(names)),
+                                 '\n'.join(texts))
+        return hashlib.sha1(canonical.encode()).hexdigest(), cone
+
+    def _is_unsat(self, query, classical=None):
+        """ check if the query is unsatisfiable under the current constraints
+        Args:
+            query (BoolRef): z3 formula to check
+            classical (ClassicalValue): the query under classical propagation. With
+                                        propagation, the solver is called only
+                                        if it cannot tell
+        Returns:
+            bool: if the query is unsatisfiable
+        """
+        if self.propagation:
+            res = classical.is_unsat()
+            if res is not None:
+                self.stats['classical'] += 1
+                return res
+        if self.cache is not None and self.cache_cone:
+            key, cone = self._query_cone(query)
+        else:
+            key, cone = None, None
+        if key is not None:
+            # the answer is cached for any query with the same light cone, so it
+            # must not depend on constraints outside of it
+            res = self.cache.get(key)
+            if res is not None:
+                self.stats['cache_hits'] += 1
+                return res
+            solver = self._new_solver()
+            solver.add(*cone)
+            solver.add(query)
+            answer = self._check(solver)
+            if answer != z3.unknown:
+                self.cache.put(key, answer == z3.unsat)
+            return answer == z3.unsat
+        if self.incremental == 'pushpop':
+            self.solver.push()
+            self.solver.add(query)
+            answer = self._check(self.solver)
+            self.solver.pop()
+            return answer == z3.unsat
+        indicator = z3.Bool('hoare_query_%d' % self.indicators)
+        self.indicators += 1
+        self.solver.add(z3.Implies(indicator, query))
+        answer = self._check(self.solver, indicator)
+        # retire the indicator, so the guarded query is trivially satisfied from now on
+        self.solver.add(z3.Not(indicator))
+        self.retired += 1
+        if self.retired > len(self.constraints):
+            # the retired guards are dead weight: drop them once they outnumber the
+            # constraints, so restarting costs O(1) per query
+            self._restart_solver()
+        return answer == z3.unsat
+
+    def _new_solver(self):
+        """ Returns: an empty solver, with the per-query limits """
+        solver = z3.Solver()
+        if self.query_timeout is not None:
+            solver.set('timeout', self.query_timeout)
+        if self.query_conflicts is not None:
+            solver.set('max_conflicts', self.query_conflicts)
+        return solver
+
+    def _check(self, solver, *assumptions):
+        """ run the solver within the budgets of the pass, keeping statistics
+        Args:
+            solver (Solver): solver with the query asserted
+            assumptions (BoolRef): literals to check under
+        Returns:
+            CheckSatResult: sat, unsat or unknown (also if the pass is out of budget)
+        """
+        stats = self.stats
+        if (self.time_budget is not None and stats['solver_time'] >= self.time_budget) or \
+                (self.conflict_budget is not None and
+                 stats['conflicts'] >= self.conflict_budget):
+            stats['unknown'] += 1
+            return z3.unknown
+        conflicts = _conflicts(solver)
+        start = time.time()
+        if self.stop_at is not None:
+            # a single query should not run past the time limit of the pass either
+            timeout = max(1, int((self.stop_at - start) * 1000))
+            if self.query_timeout is not None:
+                timeout = min(timeout, self.query_timeout)
+            solver.set('timeout', timeout)
+        answer = solver.check(*assumptions)
+        elapsed = time.time() - start
+        stats['queries'] += 1
+        stats['solver_time'] += elapsed
+        stats['conflicts'] += _conflicts(solver) - conflicts
+        stats['sat' if answer == z3.sat else 'unsat' if answer == z3.unsat else 'unknown'] += 1
+        if len(stats['slowest']) < _SLOWEST or elapsed > stats['slowest'][0][0]:
+            entry = (elapsed, _describe(self.current))
+            if len(stats['slowest']) < _SLOWEST:
+                heapq.heappush(stats['slowest'], entry)
+            else:
+                heapq.heapreplace(stats['slowest'], entry)
+        return answer
+
+    def _add_postconditions(self, gate, info):
         """ create boolean variables for each qubit the gate is applied to
             and apply the relevant post conditions.
             a gate rotating out of the z-basis will not have any valid
             post-conditions, in which case the qubit state is unknown
         Args:
             gate (Gate): gate to inspect
-            ctrl_ones (BoolRef): z3 condition asserting all control qubits to 1
-            trgtqb (list((QuantumRegister, int))): list of target qubits
-            trgtvar (list(BoolRef)): z3 variables corresponding to latest state
-                                     of target qubits
+            info (_NodeInfo): control/target split of the gate
         """
+        ctrl_ones, trgtvar = info.ctrl_ones, info.trgtvar
         new_vars = []
-        for qbt in trgtqb:
+        for qbt in info.trgtqb:
             new_vars.append(self._gen_variable(qbt.index))
+        self.classical.apply(gate, info.c_ctrl_ones, trgtvar, new_vars)
 
         try:
-            self.solver.add(
-                Implies(ctrl_ones, gate._postconditions(*(trgtvar + new_vars)))
+            self._add_constraint(
+                z3.Implies(ctrl_ones, gate._postconditions(*(trgtvar + new_vars))),
+                new_vars
             )
         except AttributeError:
             pass
 
         for i, tvar in enumerate(trgtvar):
-            self.solver.add(
-                Implies(Not(ctrl_ones), new_vars[i] == tvar)
+            self._add_constraint(
+                z3.Implies(z3.Not(ctrl_ones), new_vars[i] == tvar),
+                [new_vars[i]]
             )
 
-    def _test_gate(self, gate, ctrl_ones, trgtvar):
+    def _test_gate(self, gate, info):
         """ use z3 sat solver to determine triviality of gate
         Args:
             gate (Gate): gate to inspect
-            ctrl_ones (BoolRef): z3 condition asserting all control qubits to 1
-            trgtvar (list(BoolRef)): z3 variables corresponding to latest state
-                                     of target qubits
+            info (_NodeInfo): control/target split of the gate
         Returns:
             bool: if gate is trivial
         """
         trivial = False
-        self.solver.push()
+        ctrl_ones, trgtvar, c_ctrl_ones = info.ctrl_ones, info.trgtvar, info.c_ctrl_ones
+        c_trgt = [self.classical.value(var) for var in trgtvar]
 
         try:
             triv_cond = gate._trivial_if(*trgtvar)
         except AttributeError:
-            self.solver.add(ctrl_ones)
-            trivial = self.solver.check() == unsat
+            trivial = self._is_unsat(ctrl_ones, c_ctrl_ones)
         else:
             if isinstance(triv_cond, bool):
                 if triv_cond and len(trgtvar) == 1:
-                    self.solver.add(And(ctrl_ones, Not(trgtvar[0])))
-                    sol1 = self.solver.check() == unsat
-                    self.solver.pop()
-                    self.solver.push()
-                    self.solver.add(And(ctrl_ones, trgtvar[0]))
-                    sol2 = self.solver.check() == unsat
-                    trivial = sol1 or sol2
+                    trivial = (self._is_unsat(z3.And(ctrl_ones, z3.Not(trgtvar[0])),
+                                              c_ctrl_ones & ~c_trgt[0])
+                               or self._is_unsat(z3.And(ctrl_ones, trgtvar[0]),
+                                                 c_ctrl_ones & c_trgt[0]))
             else:
-                self.solver.add(And(ctrl_ones, Not(triv_cond)))
-                trivial = self.solver.check() == unsat
+                trivial = self._is_unsat(z3.And(ctrl_ones, z3.Not(triv_cond)),
+                                         c_ctrl_ones & ~gate._trivial_if(*c_trgt))
 
-        self.solver.pop()
         return trivial
 
     def _traverse_dag(self, dag):
@@ -151,29 +525,41 @@ class HoareOptimizer(TransformationPass):
         Args:
             dag (DAGCircuit): input DAG to optimize in place
         """
-        for node in dag.topological_op_nodes():
+        nodes = list(dag.topological_op_nodes())
+        for step, node in enumerate(nodes):
+            if self._timed_out():
+                self.stats['skipped'] = len(nodes) - step
+                break
             gate = node.op
-            _, ctrlvar, trgtqb, trgtvar = self._seperate_ctrl_trgt(node)
-
-            ctrl_ones = And(*ctrlvar)
+            info = self._seperate_ctrl_trgt(node)
+            self.current = [node]
 
-            trivial = self._test_gate(gate, ctrl_ones, trgtvar)
+            trivial = self._test_gate(gate, info)
             if trivial:
                 dag.remove_op_node(node)
             elif self.size > 1:
+                self.position[node] = self.gatestep
+                self.nodeinfo[node] = info
                 for qbt in node.qargs:
                     self.gatecache[qbt.index].append(node)
-                    self.varnum[qbt.index][node] = self.gatenum[qbt.index] - 1
                 for qbt in node.qargs:
                     if len(self.gatecache[qbt.index]) >= self.size:
                         self._multigate_opt(dag, qbt.index)
 
-            self._add_postconditions(gate, ctrl_ones, trgtqb, trgtvar)
+            self._add_postconditions(gate, info)
+
+            self.gatestep += 1
+            if self.window is not None and self.gatestep - self.window_start >= self.window:
+                self._slide_window()
+
+    def _timed_out(self):
+        """ Returns: if the time limit of the pass is used up """
+        return self.stop_at is not None and time.time() >= self.stop_at
 
     def _target_successive_seq(self, qb_id):
         """ gates are target successive if they have the same set of target
             qubits and follow each other immediately on these target qubits
-            (consider sequences of length 2 for now)
+            (sequences of length 2 to self.seq_len, shortest first)
         Args:
             qb_id (int): index of qubit cache to inspect
         Returns:
@@ -181,39 +567,81 @@ class HoareOptimizer(TransformationPass):
                                  this qubit's cache
         """
         seqs = []
-        for i in range(len(self.gatecache[qb_id]) - 1):
-            append = True
-            node1 = self.gatecache[qb_id][i]
-            node2 = self.gatecache[qb_id][i + 1]
-            trgtqb1 = self._seperate_ctrl_trgt(node1)[2]
-            trgtqb2 = self._seperate_ctrl_trgt(node2)[2]
-
-            if trgtqb1 != trgtqb2:
-                continue
-            try:
-                for qbt in trgtqb1:
-                    idx = self.gatecache[qbt.index].index(node1)
-                    if self.gatecache[qbt.index][idx + 1] is not node2:
-                        append = False
-            except (IndexError, ValueError):
-                continue
-
-            if append:
-                seqs.append([node1, node2])
-
-        return seqs
+        cache = self.gatecache[qb_id]
+        for node1 in cache:
+            trgt_ids = self.nodeinfo[node1].trgt_ids
+            seq = [node1]
+            while len(seq) < self.seq_len:
+                node2 = cache.successor(seq[-1])
+                if node2 is None or trgt_ids != self.nodeinfo[node2].trgt_ids:
+                    break
+                if not all(self.gatecache[qbt].successor(seq[-1]) is node2
+                           for qbt in trgt_ids):
+                    break
+                seq.append(node2)
+                seqs.append(list(seq))
+
+        return sorted(seqs, key=len)
 
     def _is_identity(self, sequence):
         """ determine whether the sequence of gates combines to the idendity
-            (consider sequences of length 2 for now)
         Args:
             sequence (list(DAGNode)): gate sequence to inspect
         Returns:
             bool: if gate sequence combines to identity
         """
-        assert len(sequence) == 2
+        if len(sequence) == 2 and self._is_inverse_pair(sequence):
+            return True
+        return self._fingerprint_is_identity(sequence)
+
+    def _fingerprint_is_identity(self, sequence):
+        """ determine whether the product of the (target) unitaries of the sequence
+            is the identity, by a fingerprint of the product rounded to _DECIMALS
+            decimals. Fingerprints are cached by the gates of the sequence.
+            Controlled gates must combine to the identity exactly, the others up
+            to global phase.
+        Args:
+            sequence (list(DAGNode)): gate sequence to inspect
+        Returns:
+            bool: if gate sequence combines to identity
+        """
+        gates = [node.op for node in sequence]
+        key = tuple(_gate_key(gate) for gate in gates)
+        if None in key:
+            key = None
+        elif key in self.fingerprints:
+            return self.fingerprints[key]
+
+        product = None
+        for gate in gates:
+            base = gate.base_gate if isinstance(gate, ControlledGate) else gate
+            try:
+                matrix = base.to_matrix()
+            except (AttributeError, CircuitError, TypeError):
+                if key is not None:
+                    self.fingerprints[key] = False
+                return False
+            product = matrix if product is None else matrix.dot(product)
+        ignore_phase = not any(isinstance(gate, ControlledGate) for gate in gates)
+        identity = np.identity(len(product), dtype=complex)
+        res = _fingerprint(product, ignore_phase) == _fingerprint(identity, False)
+        if key is not None:
+            self.fingerprints[key] = res
+        return res
 
-        gate1, gate2 = sequence[0].op, sequence[1].op.inverse()
+    def _is_inverse_pair(self, sequence):
+        """ determine whether the second gate of a pair is the inverse of the first
+            by type and parameters
+        Args:
+            sequence (list(DAGNode)): gate pair to inspect
+        Returns:
+            bool: if the gates are inverse of each other
+        """
+        try:
+            gate1, gate2 = sequence[0].op, sequence[1].op.inverse()
+        except CircuitError:
+            # e.g. resets and measurements
+            return False
         par1, par2 = gate1.params, gate2.params
         def1, def2 = gate1.definition, gate2.definition
 
@@ -237,81 +665,111 @@ class HoareOptimizer(TransformationPass):
     def _seq_as_one(self, sequence):
         """ use z3 solver to determine if the gates in the sequence are either
             all executed or none of them are executed, based on control qubits
-            (consider sequences of length 2 for now)
         Args:
             sequence (list(DAGNode)): gate sequence to inspect
         Returns:
             bool: if gate sequence is only executed completely or not at all
         """
-        assert len(sequence) == 2
-        ctrlvar1 = self._seperate_ctrl_trgt(sequence[0])[1]
-        ctrlvar2 = self._seperate_ctrl_trgt(sequence[1])[1]
-
-        self.solver.push()
-        self.solver.add(
-            Or(
-                And(And(*ctrlvar1), Not(And(*ctrlvar2))),
-                And(Not(And(*ctrlvar1)), And(*ctrlvar2))
-            )
+        infos = [self.nodeinfo[node] for node in sequence]
+        pairs = list(zip(infos, infos[1:]))
+
+        # the gates are executed alike if each pair of consecutive gates is
+        classical = pairs[0][0].c_ctrl_ones != pairs[0][1].c_ctrl_ones
+        for info1, info2 in pairs[1:]:
+            classical = ~(~classical & (info1.c_ctrl_ones == info2.c_ctrl_ones))
+        return self._is_unsat(
+            z3.Or(*[z3.Or(
+                z3.And(info1.ctrl_ones, z3.Not(info2.ctrl_ones)),
+                z3.And(z3.Not(info1.ctrl_ones), info2.ctrl_ones)
+            ) for info1, info2 in pairs]),
+            classical
         )
-        res = self.solver.check() == unsat
-        self.solver.pop()
-
-        return res
 
-    def _multigate_opt(self, dag, qb_id, max_idx=None, dnt_rec=None):
+    def _remove_from_caches(self, node):
+        """ forget a gate in the caches of all its qubits """
+        for qbt in node.qargs:
+            self.gatecache[qbt.index].remove(node)
+        del self.position[node]
+        del self.nodeinfo[node]
+
+    def _remove_identities(self, dag, qb_id):
+        """ remove the target successive sequences that combine to the identity from
+            the cache of a qubit. Removing a sequence can make new ones in the caches
+            of the qubits it acted on, so those are inspected again.
+        Args:
+            dag (DAGCircuit): the directed acyclic graph to run on.
+            qb_id (int): qubit id whose gate cache is to be optimized
+        """
+        pending = [qb_id]
+        while pending:
+            qbt = pending.pop()
+            for seq in self._target_successive_seq(qbt):
+                self.current = seq
+                # an earlier sequence may have removed a gate of this one
+                if tuple(seq) in self.not_identities or \
+                        not all(node in self.gatecache[qbt] for node in seq):
+                    continue
+                if self._is_identity(seq) and self._seq_as_one(seq):
+                    for node in seq:
+                        dag.remove_op_node(node)
+                        self._remove_from_caches(node)
+                        pending.extend(x.index for x in node.qargs if x.index not in pending)
+                else:
+                    self.not_identities.add(tuple(seq))
+
+    def _multigate_opt(self, dag, qb_id, max_pos=None, dnt_rec=None):
         """
         Args:
             dag (DAGCircuit): the directed acyclic graph to run on.
             qb_id (int): qubit id whose gate cache is to be optimized
-            max_idx (int): a value indicates a recursive call, optimize
-                           and remove gates up to this point in the cache
-            dnt_rec (list(int)): don't recurse on these qubit caches (again)
+            max_pos (int): a value indicates a recursive call, optimize
+                           and remove gates up to this position in the circuit
+            dnt_rec (set(int)): don't recurse on these qubit caches (again)
         """
-        if not self.gatecache[qb_id]:
+        cache = self.gatecache[qb_id]
+        if not cache:
             return
 
         # try to optimize this qubit's pipeline
-        for seq in self._target_successive_seq(qb_id):
-            if self._is_identity(seq) and self._seq_as_one(seq):
-                for node in seq:
-                    dag.remove_op_node(node)
-                    # if recursive call, gate will be removed further down
-                    if max_idx is None:
-                        for qbt in node.qargs:
-                            self.gatecache[qbt.index].remove(node)
-                    else:
-                        if self.gatecache[qb_id].index(node) > max_idx:
-                            for qbt in node.qargs:
-                                self.gatecache[qbt.index].remove(node)
-
-        if len(self.gatecache[qb_id]) < self.size and max_idx is None:
+        self._remove_identities(dag, qb_id)
+
+        if len(cache) < self.size and max_pos is None:
             # unless in a rec call, we are done if the cache isn't full
             return
-        elif max_idx is None:
+        elif max_pos is None:
             # need to remove at least one gate from cache, so remove oldest
-            max_idx = 0
+            max_pos = self.position[cache.head]
             dnt_rec = set()
             dnt_rec.add(qb_id)
-            gates_tbr = [self.gatecache[qb_id][0]]
-        else:
-            # need to remove all gates up to max_idx (in reverse order)
-            gates_tbr = self.gatecache[qb_id][max_idx::-1]
 
-        for node in gates_tbr:
+        # need to remove all gates up to max_pos (in reverse order)
+        gates_tbr = []
+        for node in cache:
+            if self.position[node] > max_pos:
+                break
+            gates_tbr.append(node)
+
+        for node in reversed(gates_tbr):
+            if node not in cache:
+                continue
             # for rec call, only look at qubits that haven't been optimized yet
             new_qb = [x.index for x in node.qargs if x.index not in dnt_rec]
             dnt_rec.update(new_qb)
             for qbt in new_qb:
-                idx = self.gatecache[qbt].index(node)
                 # recursive chain to optimize all gates in this qubit's cache
-                self._multigate_opt(dag, qbt, max_idx=idx, dnt_rec=dnt_rec)
+                self._multigate_opt(dag, qbt, max_pos=self.position[node], dnt_rec=dnt_rec)
         # truncate gatecache for this qubit to after above gate
-        self.gatecache[qb_id] = self.gatecache[qb_id][max_idx + 1:]
+        while cache and self.position[cache.head] <= max_pos:
+            node = cache.head
+            cache.remove(node)
+            if not any(node in self.gatecache[qbt.index] for qbt in node.qargs):
+                del self.position[node]
+                del self.nodeinfo[node]
 
     def _seperate_ctrl_trgt(self, node):
         """ Get the target qubits and control qubits if available,
-            as well as their respective z3 variables.
+            as well as their respective (latest) z3 variables.
+            Computed once per gate, as a _NodeInfo kept while the gate is cached.
         """
         gate = node.op
         if isinstance(gate, ControlledGate):
@@ -320,15 +778,9 @@ class HoareOptimizer(TransformationPass):
             numctrl = 0
         ctrlqb = node.qargs[:numctrl]
         trgtqb = node.qargs[numctrl:]
-        try:
-            ctrlvar = [self.variables[qb.index][self.varnum[qb.index][node]]
-                       for qb in ctrlqb]
-            trgtvar = [self.variables[qb.index][self.varnum[qb.index][node]]
-                       for qb in trgtqb]
-        except KeyError:
-            ctrlvar = [self.variables[qb.index][-1] for qb in ctrlqb]
-            trgtvar = [self.variables[qb.index][-1] for qb in trgtqb]
-        return (ctrlqb, ctrlvar, trgtqb, trgtvar)
+        ctrlvar = [self.variables[qb.index][-1] for qb in ctrlqb]
+        trgtvar = [self.variables[qb.index][-1] for qb in trgtqb]
+        return _NodeInfo(ctrlqb, trgtqb, ctrlvar, trgtvar, self.classical.all_ones(ctrlvar))
 
     def run(self, dag):
         """
@@ -337,10 +789,186 @@ class HoareOptimizer(TransformationPass):
         Returns:
             DAGCircuit: Transformed DAG.
         """
-        self._initialize(dag)
-        self._traverse_dag(dag)
-        if self.size > 1:
-            for qbt in dag.qubits():
-                self._multigate_opt(dag, qbt.index)
+        now = time.time()
+        if self.time_limit is not None:
+            self.stop_at = now + self.time_limit
+        deadline = self.property_set['deadline']
+        if self.deadline_share is not None and deadline is not None:
+            stop_at = now + max(0, deadline - now) * self.deadline_share
+            self.stop_at = stop_at if self.stop_at is None else min(self.stop_at, stop_at)
+        components = _components(dag) if self.workers and self.workers > 1 else []
+        if len(components) > 1:
+            self._run_components(dag, components)
+        else:
+            self._initialize(dag)
+            self._traverse_dag(dag)
+            if self.size > 1 and not self._timed_out():
+                for qbt in dag.qubits():
+                    self._multigate_opt(dag, qbt.index)
         return dag
 
+    def statistics(self):
+        """
+        Returns:
+            dict: the solver statistics of the runs of the pass, the slowest gates first.
+        """
+        stats = dict(self.stats)
+        stats['slowest'] = sorted(stats['slowest'], reverse=True)
+        return stats
+
+    def _run_components(self, dag, components):
+        """ optimize each component in a worker process and remove from the DAG the
+            gates that the workers removed. The components share no qubits, so
+            they share no constraints either.
+        Args:
+            dag (DAGCircuit): the directed acyclic graph to optimize in place
+            components (list(list(DAGNode))): gates of each component, in
+                                              topological order
+        """
+        options = {'size': self.size, 'window': self.window,
+                   'propagation': self.propagation, 'cache_cone': self.cache_cone,
+                   'cache': None if self.cache is None else TrivialityCache(),
+                   'query_timeout': self.query_timeout,
+                   'query_conflicts': self.query_conflicts,
+                   'time_budget': self.time_budget, 'conflict_budget': self.conflict_budget,
+                   'incremental': self.incremental, 'seq_len': self.seq_len}
+        circuits = []
+        for nodes in components:
+            circuit = QuantumCircuit(*dag.qregs.values(), *dag.cregs.values())
+            for node in nodes:
+                circuit.append(node.op, node.qargs, node.cargs)
+            circuits.append(circuit)
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            # the workers stop at the deadline of this pass, not time_limit after they start
+            results = executor.map(_optimize_component, circuits, [options] * len(circuits),
+                                   [self.stop_at] * len(circuits))
+            for nodes, (removed, stats, answers) in zip(components, results):
+                for index in removed:
+                    dag.remove_op_node(nodes[index])
+                for key, value in stats.items():
+                    if key != 'slowest':
+                        self.stats[key] += value
+                self.stats['slowest'] = heapq.nlargest(
+                    _SLOWEST, self.stats['slowest'] + stats['slowest'])
+                for key, answer in answers.items():
+                    self.cache.put(key, answer)
+
+
+class HoareStatistics(AnalysisPass):
+    """ Sets the property ``hoare_stats`` to the solver statistics of a HoareOptimizer
+        (see HoareOptimizer.statistics). Append it after the optimizer.
+    """
+
+    def __init__(self, optimizer):
+        """
+        Args:
+            optimizer (HoareOptimizer): the pass whose statistics are published
+        """
+        super().__init__()
+        self.optimizer = optimizer
+
+    def run(self, dag):
+        self.property_set['hoare_stats'] = self.optimizer.statistics()
+
+
+def _components(dag):
+    """ split the gates of a DAG by connected component of the qubits they act on
+    Args:
+        dag (DAGCircuit): DAG to split
+    Returns:
+        list(list(DAGNode)): gates of each component, in topological order
+    """
+    parent = {}
+
+    def find(qbt):
+        while parent.setdefault(qbt, qbt) != qbt:
+            parent[qbt] = parent[parent[qbt]]
+            qbt = parent[qbt]
+        return qbt
+
+    nodes = list(dag.topological_op_nodes())
+    for node in nodes:
+        for qbt in node.qargs[1:]:
+            parent[find(qbt)] = find(node.qargs[0])
+    components = OrderedDict()
+    for node in nodes:
+        if node.qargs:
+            components.setdefault(find(node.qargs[0]), []).append(node)
+    return list(components.values())
+
+
+def _optimize_component(circuit, options, stop_at=None):
+    """ run HoareOptimizer on the circuit of a component, in a worker process
+    Args:
+        circuit (QuantumCircuit): gates of the component
+        options (dict): keyword arguments of HoareOptimizer
+        stop_at (float): time.time() after which the remaining gates are kept
+    Returns:
+        tuple(list(int), dict, dict): indices in circuit.data of the removed gates,
+                                      solver statistics and solver answers
+    """
+    dag = circuit_to_dag(circuit)
+    nodes = sorted(dag.op_nodes(), key=lambda node: node._node_id)
+    pass_ = HoareOptimizer(**options)
+    pass_.stop_at = stop_at
+    pass_.run(dag)
+    remaining = set(dag.op_nodes())
+    removed = [index for index, node in enumerate(nodes) if node not in remaining]
+    answers = {} if pass_.cache is None else dict(pass_.cache.answers)
+    return removed, pass_.stats, answers
+
+
+def _import_z3():
+    """ import z3 and extend the gate classes with their Hoare semantics, on first use
+    Returns:
+        bool: if z3 is available
+    """
+    global z3  # pylint: disable=global-statement,invalid-name
+    if z3 is None:
+        try:
+            z3 = import_module('z3')
+        except ImportError:
+            return False
+        from . import _gate_extension  # pylint: disable=W0611
+    return True
+
+
+def _gate_key(gate):
+    """ hashable key of a gate and its parameters, None if there is none """
+    if isinstance(gate, UnitaryGate):
+        return gate.name, gate.params[0].tobytes()
+    try:
+        return type(gate), gate.name, tuple(float(param) for param in gate.params)
+    except (TypeError, ValueError):
+        return None
+
+
+def _fingerprint(matrix, ignore_phase):
+    """ hash of a matrix, rounded to _DECIMALS decimals
+    Args:
+        matrix (numpy.ndarray): matrix to fingerprint
+        ignore_phase (bool): normalize the global phase of the matrix first
+    Returns:
+        str: fingerprint of the matrix
+    """
+    if ignore_phase:
+        pivot = matrix.flat[np.argmax(np.abs(matrix) > 10 ** -_DECIMALS)]
+        matrix = matrix * (abs(pivot) / pivot)
+    rounded = np.round(matrix, _DECIMALS) + (0.0 + 0.0j)
+    return hashlib.sha1(rounded.tobytes()).hexdigest()
+
+
+def _conflicts(solver):
+    """ number of conflicts the solver ran into so far """
+    statistics = solver.statistics()
+    return statistics.get_key_value('conflicts') if 'conflicts' in statistics.keys() else 0
+
+
+def _describe(sequence):
+    """ short description of a gate sequence, e.g. 'cx q1,q2; cx q1,q2' """
+    if not sequence:
+        return ''
+    return '; '.join('%s %s' % (node.name, ','.join('q%d' % qbt.index for qbt in node.qargs))
+                     for node in sequence)
+
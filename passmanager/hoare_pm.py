@@ -42,7 +42,6 @@ gate cancellation using commutativity rules and unitary synthesis.
 from qiskit.transpiler.passmanager_config import PassManagerConfig
 from qiskit.transpiler.passmanager import PassManager
 
-from qiskit.transpiler.passes import Unroller
 from qiskit.transpiler.passes import Unroll3qOrMore
 from qiskit.transpiler.passes import CheckMap
 from qiskit.transpiler.passes import CXDirection
@@ -68,12 +67,24 @@ from qiskit.transpiler.passes import Collect2qBlocks
 from qiskit.transpiler.passes import ConsolidateBlocks
 from qiskit.transpiler.passes import ApplyLayout
 from qiskit.transpiler.passes import CheckCXDirection
-from .hoare_opt import HoareOptimizer
+from .basis_unroller import BasisUnroller, preserve_basis
+from .hoare_opt import HoareOptimizer, HoareStatistics, TrivialityCache
+from .deadline import SetDeadline, before_deadline, stage_budgets
+from .dirty_loop import WireSignature, has_dirty_qubits
+from .layout_cache import LayoutCache, CachedLayout, StoreLayout
 
 from qiskit.transpiler import TranspilerError
 
+# Solver answers to share between the pass managers built here (e.g. the seeds of a
+# benchmark), with hoare_options={'size': 10, 'cache': TRIVIALITY_CACHE}
+TRIVIALITY_CACHE = TrivialityCache()
 
-def level_3_hoare_pass_manager(pass_manager_config: PassManagerConfig) -> PassManager:
+
+def level_3_hoare_pass_manager(pass_manager_config: PassManagerConfig,
+                               hoare_options: dict = None,
+                               deadline: float = None,
+                               incremental_loop: bool = False,
+                               layout_cache: LayoutCache = None) -> PassManager:
     """Level 3 pass manager: heavy optimization by noise adaptive qubit mapping and
     gate cancellation using commutativity rules and unitary synthesis.
 
@@ -93,6 +104,16 @@ def level_3_hoare_pass_manager(pass_manager_config: PassManagerConfig) -> PassMa
 
     Args:
         pass_manager_config: configuration of the pass manager.
+        hoare_options: keyword arguments of HoareOptimizer. By default, a gate
+            cache of size 10 and no solver answer cache (see TRIVIALITY_CACHE).
+        deadline: seconds for the whole run, split across the stages (see
+            passmanager.deadline). The Hoare optimizer takes a share of the time left
+            when it starts (its deadline_share), unless hoare_options sets it. None
+            keeps the full budgets.
+        incremental_loop: end the optimization loop after the first iteration that
+            changes no qubit, instead of one iteration later (same result).
+        layout_cache: layouts to reuse for circuits with the same interaction graph
+            (see passmanager.layout_cache). The layouts chosen here are added to it.
 
     Returns:
         a level 3 pass manager.
@@ -109,7 +130,7 @@ def level_3_hoare_pass_manager(pass_manager_config: PassManagerConfig) -> PassMa
     backend_properties = pass_manager_config.backend_properties
 
     # 1. Unroll to the basis first, to prepare for noise-adaptive layout
-    _unroll = Unroller(basis_gates)
+    _unroll = BasisUnroller(basis_gates + ['annotation'])
 
     # 2. Layout on good qubits if calibration info available, otherwise on dense links
     _given_layout = SetLayout(initial_layout)
@@ -117,7 +138,10 @@ def level_3_hoare_pass_manager(pass_manager_config: PassManagerConfig) -> PassMa
     def _choose_layout_condition(property_set):
         return not property_set['layout']
 
-    _choose_layout_1 = CSPLayout(coupling_map, call_limit=10000, time_limit=60)
+    budgets = stage_budgets(deadline)
+    _choose_layout_1 = CSPLayout(coupling_map, seed=seed_transpiler,
+                                 call_limit=budgets['csp_call_limit'],
+                                 time_limit=budgets['csp_time_limit'])
     if layout_method == 'trivial':
         _choose_layout_2 = TrivialLayout(coupling_map)
     elif layout_method == 'dense':
@@ -127,8 +151,17 @@ def level_3_hoare_pass_manager(pass_manager_config: PassManagerConfig) -> PassMa
     else:
         raise TranspilerError("Invalid layout method %s." % layout_method)
 
-    # 3. Extend dag/layout with ancillas using the full coupling map
-    _embed = [FullAncillaAllocation(coupling_map), EnlargeWithAncilla(), ApplyLayout()]
+    if layout_cache is not None:
+        # the cached layout of the interaction graph, if any, instead of the search
+        _cached_layout = CachedLayout(layout_cache, coupling_map, backend_properties,
+                                      layout_method)
+        _store_layout = StoreLayout(layout_cache, coupling_map, backend_properties,
+                                    layout_method)
+
+    # 3. Extend dag/layout with ancillas using the full coupling map (this only relabels
+    #    qubits, so an unrolled DAG stays unrolled)
+    _embed = [FullAncillaAllocation(coupling_map)] + \
+        preserve_basis([EnlargeWithAncilla(), ApplyLayout()], _unroll)
 
     # 4. Unroll to 1q or 2q gates, swap to fit the coupling map
     _swap_check = CheckMap(coupling_map)
@@ -140,7 +173,8 @@ def level_3_hoare_pass_manager(pass_manager_config: PassManagerConfig) -> PassMa
     if routing_method == 'basic':
         _swap += [BasicSwap(coupling_map)]
     elif routing_method == 'stochastic':
-        _swap += [StochasticSwap(coupling_map, trials=200, seed=seed_transpiler)]
+        _swap += [StochasticSwap(coupling_map, trials=budgets['swap_trials'],
+                                 seed=seed_transpiler)]
     elif routing_method == 'lookahead':
         _swap += [LookaheadSwap(coupling_map, search_depth=5, search_width=6)]
     else:
@@ -150,13 +184,17 @@ def level_3_hoare_pass_manager(pass_manager_config: PassManagerConfig) -> PassMa
     _depth_check = [Depth(), FixedPoint('depth')]
 
     def _opt_control(property_set):
-        return not property_set['depth_fixed_point']
+        return (not property_set['depth_fixed_point'] and before_deadline(property_set) and
+                (not incremental_loop or has_dirty_qubits(property_set)))
 
     _opt = [RemoveResetInZeroState(),
             Collect2qBlocks(), ConsolidateBlocks(),
-            Unroller(basis_gates),  # unroll unitaries
+            BasisUnroller(basis_gates),  # unroll unitaries
             Optimize1qGates(basis_gates), CommutativeCancellation(),
             OptimizeSwapBeforeMeasure(), RemoveDiagonalGatesBeforeMeasure()]
+    if incremental_loop:
+        # stop as soon as an iteration changes nothing (see passmanager.dirty_loop)
+        _opt += [WireSignature()]
 
     # 6. Fix any CX direction mismatch
     _direction_check = [CheckCXDirection(coupling_map)]
@@ -168,16 +206,28 @@ def level_3_hoare_pass_manager(pass_manager_config: PassManagerConfig) -> PassMa
 
     # Build pass manager
     pm3 = PassManager()
+    if deadline is not None:
+        pm3.append(SetDeadline(deadline))
     pm3.append(_unroll)
     if coupling_map:
         pm3.append(_given_layout)
+        if layout_cache is not None:
+            pm3.append(_cached_layout, condition=_choose_layout_condition)
         pm3.append(_choose_layout_1, condition=_choose_layout_condition)
         pm3.append(_choose_layout_2, condition=_choose_layout_condition)
+        if layout_cache is not None:
+            pm3.append(_store_layout)
         pm3.append(_embed)
         pm3.append(_swap_check)
         pm3.append(_swap, condition=_swap_condition)
     pm3.append(_unroll)
-    pm3.append(HoareOptimizer(size=10))
+    if hoare_options is None:
+        hoare_options = {'size': 10}
+    if budgets['hoare_deadline_share'] is not None:
+        hoare_options = dict({'deadline_share': budgets['hoare_deadline_share']},
+                             **hoare_options)
+    hoare = HoareOptimizer(**hoare_options)
+    pm3.append([hoare, HoareStatistics(hoare)])
     pm3.append(_depth_check + _opt, do_while=_opt_control)
     if coupling_map and not coupling_map.is_symmetric:
         pm3.append(_direction_check)
@@ -185,3 +235,19 @@ def level_3_hoare_pass_manager(pass_manager_config: PassManagerConfig) -> PassMa
 
     return pm3
 
+
+def level_3_hoare_assumptions_pass_manager(
+        pass_manager_config: PassManagerConfig) -> PassManager:
+    """Hoare level 3 pass manager, checking every query on the incremental solver of
+    the pass under an assumption literal (no triviality cache)."""
+    return level_3_hoare_pass_manager(pass_manager_config,
+                                      {'size': 10, 'cache_cone': 0,
+                                       'incremental': 'assumptions'})
+
+
+def level_3_hoare_pushpop_pass_manager(
+        pass_manager_config: PassManagerConfig) -> PassManager:
+    """Hoare level 3 pass manager, checking every query on the incremental solver of
+    the pass in a push()/pop() scope (no triviality cache)."""
+    return level_3_hoare_pass_manager(pass_manager_config,
+                                      {'size': 10, 'cache_cone': 0, 'incremental': 'pushpop'})
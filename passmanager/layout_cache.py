@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Cache of layouts, keyed by the two-qubit interaction graph of the circuit.
+
+CSPLayout and DenseLayout only look at which qubits interact, so circuits with
+isomorphic interaction graphs (repeated compiles of an ansatz, the seeds of a
+benchmark) have the same layout problem. The cache stores the layout chosen for a
+graph under an invariant of the graph (refined degrees) and the target (coupling map,
+layout method and backend properties). On a repeat, an isomorphism between the
+stored graph and the new one maps the stored layout to the new circuit. As a warm
+start, a perfect layout (found by CSPLayout) of a graph that contains the new one is
+also perfect for it.
+"""
+
+import pickle
+from collections import OrderedDict
+
+import networkx as nx
+from networkx.algorithms.isomorphism import GraphMatcher
+
+from qiskit.transpiler.basepasses import AnalysisPass
+from qiskit.transpiler.layout import Layout
+from qiskit.transpiler.passes import SetLayout
+
+from .compilation_cache import properties_fingerprint
+
+
+def interaction_graph(dag):
+    """
+    Returns:
+        networkx.Graph: the qubits of ``dag`` (by index) and the pairs of qubits with a
+        two-qubit gate between them.
+    """
+    qubits = {qubit: index for index, qubit in enumerate(dag.qubits())}
+    graph = nx.Graph()
+    graph.add_nodes_from(range(len(qubits)))
+    graph.add_edges_from((qubits[node.qargs[0]], qubits[node.qargs[1]])
+                         for node in dag.two_qubit_ops())
+    return graph
+
+
+def graph_invariant(graph, rounds=3):
+    """
+    Returns:
+        tuple: the same for isomorphic graphs (degrees refined with the ones of the
+        neighbours ``rounds`` times, as in Weisfeiler-Lehman).
+    """
+    labels = {node: graph.degree(node) for node in graph}
+    for _ in range(rounds):
+        labels = {node: hash((labels[node], tuple(sorted(labels[neighbor]
+                                                         for neighbor in graph[node]))))
+                  for node in graph}
+    return len(graph), graph.number_of_edges(), tuple(sorted(labels.values()))
+
+
+def layout_target(coupling_map, backend_properties=None, layout_method=None):
+    """
+    Returns:
+        tuple: what the layout depends on, besides the circuit.
+    """
+    coupling = None
+    if coupling_map is not None:
+        coupling = tuple(sorted(map(tuple, coupling_map.get_edges())))
+    return coupling, layout_method, properties_fingerprint(backend_properties)
+
+
+class LayoutCache:
+    """ LRU cache of layouts, keyed by the interaction graph of the circuit and the
+        target. It can be shared between runs and saved to a file.
+    """
+
+    def __init__(self, maxsize=1000, warm_start=False):
+        """
+        Args:
+            maxsize (int): maximum number of layouts kept
+            warm_start (bool): when no cached graph is isomorphic to the one of a circuit,
+                look for a perfect layout of a cached graph that contains it.
+        """
+        self.maxsize = maxsize
+        self.warm_start = warm_start
+        # (target, graph invariant, serial number) -> (graph, physical, perfect), least
+        # recently used first
+        self.entries = OrderedDict()
+        # (target, graph invariant) -> serial numbers of its entries
+        self.buckets = {}
+        self.serial = 0
+        self.hits = 0
+        self.warm_hits = 0
+        self.misses = 0
+
+    def get(self, target, graph):
+        """ Returns: the cached physical qubit of each node of graph (a list) and whether
+            the layout is perfect, or None if no cached graph is isomorphic to graph """
+        key = (target, graph_invariant(graph))
+        for serial in self.buckets.get(key, []):
+            stored, physical, perfect = self.entries[key + (serial,)]
+            matcher = GraphMatcher(stored, graph)
+            if matcher.is_isomorphic():
+                self.hits += 1
+                self.entries.move_to_end(key + (serial,))
+                return self._map(physical, matcher.mapping, len(graph)), perfect
+        self.misses += 1
+        return None
+
+    def get_containing(self, target, graph):
+        """ Returns: the physical qubit of each node of graph (a list) from a cached
+            perfect layout of a graph that contains graph, or None if there is none """
+        for (entry_target, _, _), (stored, physical, perfect) in reversed(self.entries.items()):
+            if entry_target != target or not perfect or len(stored) < len(graph) or \
+                    stored.number_of_edges() < graph.number_of_edges():
+                continue
+            matcher = GraphMatcher(stored, graph)
+            if matcher.subgraph_is_monomorphic():
+                self.warm_hits += 1
+                return self._map(physical, matcher.mapping, len(graph))
+        return None
+
+    @staticmethod
+    def _map(physical, mapping, size):
+        layout = [None] * size
+        for stored_node, node in mapping.items():
+            layout[node] = physical[stored_node]
+        return layout
+
+    def put(self, target, graph, physical, perfect):
+        """ cache the physical qubit of each node of graph (a list), evicting the least
+            recently used layouts if full (but not this one) """
+        key = (target, graph_invariant(graph))
+        self.entries[key + (self.serial,)] = (graph, physical, perfect)
+        self.buckets.setdefault(key, []).append(self.serial)
+        self.serial += 1
+        while len(self.entries) > max(1, self.maxsize):
+            (evicted_target, invariant, serial), _ = self.entries.popitem(last=False)
+            evicted = (evicted_target, invariant)
+            self.buckets[evicted].remove(serial)
+            if not self.buckets[evicted]:
+                del self.buckets[evicted]
+
+    def save(self, path):
+        """ save the layouts to the file path """
+        with open(path, 'wb') as file:
+            pickle.dump(self.entries, file)
+
+    @classmethod
+    def load(cls, path, maxsize=1000, warm_start=False):
+        """ Returns: a cache with the layouts saved in the file path """
+        cache = cls(maxsize, warm_start)
+        with open(path, 'rb') as file:
+            entries = pickle.load(file)
+        for (target, _, _), (graph, physical, perfect) in entries.items():
+            cache.put(target, graph, physical, perfect)
+        return cache
+
+
+class CachedLayout(SetLayout):
+    """ Sets the property ``layout`` to the cached layout of the interaction graph of the
+        DAG, if there is one (or, if the cache warm starts, a perfect layout of a cached
+        graph that contains it). Sets ``layout_cache`` to 'hit', 'warm' or 'miss'.
+    """
+
+    def __init__(self, cache, coupling_map, backend_properties=None, layout_method=None):
+        """
+        Args:
+            cache (LayoutCache): the cached layouts.
+            coupling_map (CouplingMap): the target.
+            backend_properties (BackendProperties): the calibration of the target, if the
+                layout passes use it.
+            layout_method (str): the layout pass run on a miss.
+        """
+        super().__init__(None)
+        self.cache = cache
+        self.target = layout_target(coupling_map, backend_properties, layout_method)
+
+    def run(self, dag):
+        graph = interaction_graph(dag)
+        self.property_set['interaction_graph'] = graph
+        self.property_set['layout_cache'] = 'miss'
+        self.layout = None
+        found = self.cache.get(self.target, graph)
+        if found is not None:
+            physical, perfect = found
+            self.property_set['layout_cache'] = 'hit'
+            if perfect:
+                self.property_set['CSPLayout_stop_reason'] = 'solution found'
+        elif self.cache.warm_start:
+            physical = self.cache.get_containing(self.target, graph)
+            if physical is not None:
+                self.property_set['layout_cache'] = 'warm'
+                self.property_set['CSPLayout_stop_reason'] = 'solution found'
+        if self.property_set['layout_cache'] != 'miss':
+            qubits = dag.qubits()
+            self.layout = Layout({qubits[index]: physical_qubit
+                                  for index, physical_qubit in enumerate(physical)})
+        return super().run(dag)
+
+
+class StoreLayout(AnalysisPass):
+    """ Caches the property ``layout`` for the interaction graph that CachedLayout missed. """
+
+    def __init__(self, cache, coupling_map, backend_properties=None, layout_method=None):
+        """
+        Args:
+            cache (LayoutCache): the cached layouts.
+            coupling_map (CouplingMap): the target.
+            backend_properties (BackendProperties): the calibration of the target, if the
+                layout passes use it.
+            layout_method (str): the layout pass run on a miss.
+        """
+        super().__init__()
+        self.cache = cache
+        self.target = layout_target(coupling_map, backend_properties, layout_method)
+
+    def run(self, dag):
+        layout = self.property_set['layout']
+        if self.property_set['layout_cache'] != 'miss' or layout is None:
+            return
+        physical = [layout[qubit] for qubit in dag.qubits()]
+        perfect = self.property_set['CSPLayout_stop_reason'] == 'solution found'
+        self.cache.put(self.target, self.property_set['interaction_graph'], physical, perfect)
@@ -10,9 +10,35 @@
 # copyright notice, and modified files need to carry a notice indicating
 # that they have been altered from the originals.
 
-"""Main Module"""
+"""Main Module. Names are imported from their module on first access (PEP 562)."""
 
-from purestate.constant_state_optimization import ConstantsStateOptimization
-from purestate.aswap_gate import ASwapGate
-from purestate.state_annotation import StateAnnotation
-from purestate.pure_state_on_U import PureStateOnU
\ No newline at end of file
+import sys
+from importlib import import_module
+
+_LAZY = {'ConstantsStateOptimization': 'purestate.constant_state_optimization',
+         'ASwapGate': 'purestate.aswap_gate',
+         'ASwapDgGate': 'purestate.aswap_gate',
+         'StateAnnotation': 'purestate.state_annotation',
+         'PureStateOnU': 'purestate.pure_state_on_U',
+         'ConstantStateTimeline': 'purestate.state_timeline',
+         'PureStateTimeline': 'purestate.state_timeline'}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    value = getattr(import_module(_LAZY[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if sys.version_info < (3, 7):
+    # no module __getattr__ before Python 3.7
+    for _name in __all__:
+        __getattr__(_name)
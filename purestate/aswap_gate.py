@@ -47,8 +47,11 @@ class ASwapGate(Gate):
         self.definition = definition
 
     def inverse(self):
-        """Invert this gate."""
-        raise NotImplemented('TODO: self-inverse?')
+        """Invert this gate.
+
+        ASWAP is not self-inverse: its inverse is ASWAP with the qubits exchanged.
+        """
+        return ASwapDgGate()
 
     def control(self, num_ctrl_qubits=1, label=None, ctrl_state=None):
         """Controlled version of this gate.
@@ -71,3 +74,29 @@ class ASwapGate(Gate):
                             [0, 0, 0, 1],
                             [0, 1, 0, 0]], dtype=complex)
 
+
+class ASwapDgGate(Gate):
+    """Inverse of the asymmetric 2-CNOT-SWAP."""
+
+    def __init__(self):
+        """Create new ASWAP^dagger gate."""
+        super().__init__("aswap_dg", 2, [])
+
+    def _define(self):
+        """
+        gate aswap_dg a,b { cx a,b; cx b,a; }
+        """
+        from qiskit.extensions.standard.x import CXGate
+        q = QuantumRegister(2, "q")
+        self.definition = [
+            (CXGate(), [q[0], q[1]], []),
+            (CXGate(), [q[1], q[0]], [])
+        ]
+
+    def inverse(self):
+        """Invert this gate."""
+        return ASwapGate()
+
+    def to_matrix(self):
+        """Return a Numpy.array for the ASWAP^dagger gate."""
+        return ASwapGate().to_matrix().T
@@ -34,8 +34,14 @@ class StateAnnotation(Gate):
         self.definition = definition
 
     def inverse(self):
-        """Invert this gate."""
-        raise NotImplemented('TODO: self-inverse?')
+        """Invert this gate.
+
+        The annotation acts as the identity, but the state it asserts does not hold
+        in the inverted circuit. The inverse is an empty marker that asserts nothing.
+        """
+        inverse_gate = Gate("annotation_dg", 1, [])
+        inverse_gate.definition = []
+        return inverse_gate
 
     def control(self, num_ctrl_qubits=1, label=None, ctrl_state=None):
         """Controlled version of this gate.
@@ -52,6 +58,6 @@ class StateAnnotation(Gate):
         raise NotImplemented('TODO')
 
     def to_matrix(self):
-        """Return a Numpy.array for the SwapL gate."""
-        raise NotImplemented('TODO')
+        """Return a Numpy.array for the annotation, a zero-cost identity marker."""
+        return numpy.identity(2, dtype=complex)
 
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello, 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""
+Per-wire state timeline, as a NumPy structured array of shape (layers, qubits).
+
+Each entry has a state code and the [theta, phi, lambda] angles of the state (NaN
+when unknown). The array can be dumped with ``numpy.save``.
+
+codes:  0: unknown, 1: |0>, 2: |1>, 3: |+>, 4: |->, 5: other pure state
+
+The analysis passes ConstantStateTimeline and PureStateTimeline track the states of
+the DAG they run on with the rules of ConstantsStateOptimization and PureStateOnU.
+Run after those passes, the layers are the ones of their output.
+"""
+
+import numpy as np
+
+from qiskit.circuit import Reset
+from qiskit.extensions.standard import SwapGate
+from qiskit.transpiler.basepasses import AnalysisPass
+
+from .aswap_gate import ASwapGate
+from .constant_state_optimization import ConstantsStateOptimization, \
+    WireStatus as ConstantWireStatus
+from .pure_state_on_U import PureStateOnU, WireStatus as PureWireStatus
+from .state_annotation import StateAnnotation
+
+UNKNOWN, ZERO, ONE, PLUS, MINUS, PURE = range(6)
+
+TIMELINE_DTYPE = np.dtype([('code', np.uint8),
+                           ('theta', np.float32),
+                           ('phi', np.float32),
+                           ('lam', np.float32)])
+
+_UNKNOWN_ENTRY = (UNKNOWN, np.nan, np.nan, np.nan)
+
+_CONSTANT_ENTRIES = {'0': (ZERO, 0, 0, 0),
+                     '1': (ONE, np.pi, 0, 0),
+                     '+': (PLUS, np.pi / 2, 0, 0),
+                     '-': (MINUS, np.pi / 2, np.pi, 0)}
+
+
+def constant_entry(state):
+    """Timeline entry for a state in {"0", "1", "+", "-", None}."""
+    return _CONSTANT_ENTRIES.get(state, _UNKNOWN_ENTRY)
+
+
+def pure_entry(state):
+    """Timeline entry for a state [theta, phi, lambda] or None."""
+    if state is None:
+        return _UNKNOWN_ENTRY
+    theta, phi, lam = (float(angle) for angle in state)
+    if np.isclose(theta, 0):
+        code = ZERO
+    elif np.isclose(theta, np.pi):
+        code = ONE
+    elif np.isclose(theta, np.pi / 2) and np.isclose(phi, 0):
+        code = PLUS
+    elif np.isclose(theta, np.pi / 2) and np.isclose(phi, np.pi):
+        code = MINUS
+    else:
+        code = PURE
+    return code, theta, phi, lam
+
+
+class StateTimeline:
+    """Collects the state of the wires after each node, layer by layer."""
+
+    def __init__(self, qubits, entry):
+        """
+        Args:
+            qubits (list(Qubit)): wires of the DAG.
+            entry (callable): maps a wire state to its timeline entry.
+        """
+        self._index = {qubit: index for index, qubit in enumerate(qubits)}
+        self._entry = entry
+        self._events = []
+        self._layers = 0
+
+    def record(self, layer, qargs, wire_state):
+        """Records the state of ``qargs`` after a node of the layer ``layer``."""
+        for qarg in qargs:
+            self._events.append((layer, self._index[qarg], self._entry(wire_state[qarg])))
+        self._layers = max(self._layers, layer + 1)
+
+    def to_array(self):
+        """
+        Returns:
+            numpy.ndarray: timeline of shape (layers, qubits) and dtype TIMELINE_DTYPE.
+        """
+        timeline = np.empty((self._layers, len(self._index)), dtype=TIMELINE_DTYPE)
+        current = np.array([constant_entry('0')] * len(self._index), dtype=TIMELINE_DTYPE)
+        events = sorted(self._events, key=lambda event: event[0])
+        position = 0
+        for layer in range(self._layers):
+            while position < len(events) and events[position][0] == layer:
+                _, index, entry = events[position]
+                current[index] = entry
+                position += 1
+            timeline[layer] = current
+        return timeline
+
+
+class _TimelinePass(AnalysisPass):
+    """Stores the state timeline of the DAG in the property set."""
+    property_name = None
+
+    def run(self, dag):
+        wire_state = self.wire_status(dag.qubits())
+        timeline = StateTimeline(dag.qubits(), self.entry)
+        layers = {}
+        for node in dag.topological_op_nodes():
+            layers[node] = max((layers[predecessor] + 1
+                                for predecessor in dag.predecessors(node)
+                                if predecessor.type == 'op'), default=0)
+            self.transition(wire_state, node)
+            timeline.record(layers[node], node.qargs, wire_state)
+        self.property_set[self.property_name] = timeline.to_array()
+
+    @staticmethod
+    def wire_status(qubits):
+        """The state of ``qubits`` at the start of the circuit."""
+        raise NotImplementedError
+
+    @staticmethod
+    def entry(state):
+        """The timeline entry of a wire state."""
+        raise NotImplementedError
+
+    @staticmethod
+    def transition(wire_state, node):
+        """Updates ``wire_state`` with the effect of ``node``."""
+        raise NotImplementedError
+
+
+class ConstantStateTimeline(_TimelinePass):
+    """Sets ``constant_state_timeline`` to the states in {|0>, |1>, |+>, |->} of the wires
+    after each layer, as ConstantsStateOptimization tracks them. An ASWAP swaps the states
+    when its first qubit is in |0>."""
+    property_name = 'constant_state_timeline'
+    wire_status = ConstantWireStatus
+    entry = staticmethod(constant_entry)
+
+    @staticmethod
+    def transition(wire_state, node):
+        if isinstance(node.op, SwapGate) or \
+                isinstance(node.op, ASwapGate) and wire_state[node.qargs[0]] == '0':
+            wire_state.swap(*node.qargs)
+        elif isinstance(node.op, wire_state.available_rules):
+            wire_state[node.qargs[0]] = type(node.op)
+        elif isinstance(node.op, Reset):
+            wire_state[node.qargs[0]] = '0'
+        elif not isinstance(node.op, ConstantsStateOptimization.nothing_gates):
+            for qarg in node.qargs:
+                wire_state[qarg] = None
+
+
+class PureStateTimeline(_TimelinePass):
+    """Sets ``pure_state_timeline`` to the pure states [theta, phi, lambda] of the wires
+    after each layer, as PureStateOnU tracks them. PureStateOnU removes the annotations,
+    so the states they assert only show before it."""
+    property_name = 'pure_state_timeline'
+    wire_status = PureWireStatus
+    entry = staticmethod(pure_entry)
+
+    @staticmethod
+    def transition(wire_state, node):
+        if isinstance(node.op, SwapGate) or isinstance(node.op, ASwapGate) and \
+                pure_entry(wire_state[node.qargs[0]])[0] == ZERO:
+            wire_state.swap(*node.qargs)
+        elif isinstance(node.op, StateAnnotation):
+            wire_state[node.qargs[0]] = list(node.op.params)
+        elif isinstance(node.op, PureStateOnU.single_gates):
+            PureStateOnU.single_gates_wire_status(wire_state, node)
+        else:
+            for qarg in node.qargs:
+                wire_state[qarg] = None
@@ -17,7 +17,8 @@ import yaml
 from importlib import import_module
 from os import path
 
-from benchmark.utils import Result
+from benchmark.utils import Result, tuned_pass_manager
+from passmanager import CompilationCache
 
 parser = argparse.ArgumentParser(description='Runs a benchmark.')
 parser.add_argument('yamlfile', metavar='file.yaml', nargs=1, help='YAML configuration file')
@@ -30,6 +31,10 @@ with open(yamlfile) as file:
 suite = import_module(configuration['suite'])
 passmanagers = []
 for pm_line in configuration['pass managers']:
+    if isinstance(pm_line, dict):
+        # a point chosen by run_tuner.py, for the fields tuned_*
+        passmanagers.append(tuned_pass_manager(pm_line['tuned']))
+        continue
     pm_module, pm_func = pm_line.split(':')
     passmanagers.append(getattr(import_module(pm_module), pm_func))
 
@@ -37,13 +42,18 @@ be_module, be_func = configuration.get('backend', 'qiskit.test.mock:FakeMelbourn
 backend = getattr(import_module(be_module), be_func)
 fields = configuration['fields']
 times = configuration.get('times', 1)
+share_prefix = configuration.get('share prefix', False)
+cache_directory = configuration.get('cache')
+cache = None if cache_directory is None else CompilationCache(cache_directory)
 resultfile = path.join('results', '%s.csv' % path.basename(yamlfile).split('.')[0])
 
 print('suite:', configuration['suite'])
 print('backend:', backend)
-print('pass managers:', ''.join(['\n\t' + pm for pm in configuration['pass managers']]))
+print('pass managers:', ''.join(['\n\t' + str(pm) for pm in configuration['pass managers']]))
 print('fields:', ', '.join(fields))
 print('times:', str(times))
+print('share prefix:', str(share_prefix))
+print('cache:', str(cache_directory))
 print('result file:', resultfile)
 
 with open(resultfile, 'w') as csvfile:
@@ -51,6 +61,6 @@ with open(resultfile, 'w') as csvfile:
     writer.writeheader()
     for circuit in suite.circuits():
         result = Result(circuit, backend)
-        result.run_pms(passmanagers, times=times)
+        result.run_pms(passmanagers, times=times, share_prefix=share_prefix, cache=cache)
         # print(result.row(fields))
         writer.writerow(result.row(fields))
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Cold start cost of the packages: each statement runs in a fresh interpreter."""
+
+import argparse
+import csv
+import subprocess
+import sys
+from statistics import median
+
+from tabulate import tabulate
+
+STATEMENTS = ['import qiskit',
+              'import purestate',
+              'import passmanager',
+              'from passmanager import level_3_with_contant_pure',
+              'from passmanager import level_3_hoare_pass_manager',
+              'from passmanager import HoareOptimizer; HoareOptimizer()']
+
+PROGRAM = '''import sys, time
+start = time.perf_counter()
+%s
+print(time.perf_counter() - start, 'z3' in sys.modules)
+'''
+
+parser = argparse.ArgumentParser(description='Measures the import time of the packages.')
+parser.add_argument('--times', type=int, default=5, help='runs per statement')
+args = parser.parse_args()
+resultfile = 'results/import_time.csv'
+
+rows = []
+for statement in STATEMENTS:
+    seconds = []
+    for _ in range(args.times):
+        output = subprocess.run([sys.executable, '-c', PROGRAM % statement],
+                                stdout=subprocess.PIPE, check=True).stdout.split()
+        seconds.append(float(output[-2]))
+    rows.append({'statement': statement, 'seconds': median(seconds),
+                 'loads z3': output[-1].decode() == 'True'})
+
+print(tabulate(rows, headers='keys'))
+with open(resultfile, 'w') as csvfile:
+    writer = csv.DictWriter(csvfile, fieldnames=['statement', 'seconds', 'loads z3'])
+    writer.writeheader()
+    writer.writerows(rows)
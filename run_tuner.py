@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Searches the configurations of level_3_with_contant_pure on a sample of each family.
+
+For each point of the search space and each family, the compile time and CX count are
+the sums, over the sampled circuits, of their medians over the seeds. The points on the
+Pareto front of time versus CX count are printed, all the points are dumped in
+``results/<name>.csv``, and the chosen point of each family (the fastest one of the front
+within the CX tolerance of the best) in ``results/<name>_<family>.yaml``, a benchmark
+configuration that compares it with level_3_with_contant_pure. The points that fail on a
+circuit of the sample have an infinite time and CX count, and are not on the front.
+"""
+
+import argparse
+import csv
+from importlib import import_module
+from os import path
+from statistics import median
+
+import yaml
+from tabulate import tabulate
+
+from benchmark.utils import Result, tuned_pass_manager
+from benchmark.utils.tuning import SEARCH_SPACE, points, point_name, pareto_front, choose
+from passmanager import CompilationCache
+
+parser = argparse.ArgumentParser(description='Tunes the RPO pass manager.')
+parser.add_argument('yamlfile', metavar='file.yaml', nargs=1, help='YAML configuration file')
+args = parser.parse_args()
+yamlfile = args.yamlfile[0]
+
+with open(yamlfile) as file:
+    configuration = yaml.load(file, Loader=yaml.FullLoader)
+
+families = configuration['families']
+be_line = configuration.get('backend', 'qiskit.test.mock:FakeMelbourne')
+be_module, be_func = be_line.split(':')
+backend = getattr(import_module(be_module), be_func)
+sample = configuration.get('sample', 3)
+times = configuration.get('times', 3)
+cx_tolerance = configuration.get('cx tolerance', 0.01)
+search_space = dict(SEARCH_SPACE, **configuration.get('search space', {}))
+cache_directory = configuration.get('cache')
+cache = None if cache_directory is None else CompilationCache(cache_directory)
+name = path.basename(yamlfile).split('.')[0]
+resultfile = path.join('results', '%s.csv' % name)
+
+candidates = [tuned_pass_manager(point, point_name(point)) for point in points(search_space)]
+
+print('families:', ', '.join(families))
+print('backend:', backend)
+print('points:', len(candidates))
+print('sample:', sample)
+print('times:', times)
+print('result file:', resultfile)
+
+knobs = list(search_space)
+rows = []
+for family, suite in families.items():
+    circuits = list(import_module(suite).circuits())
+    # spread the sample over the suite, which usually grows in size
+    step = max(1, len(circuits) // sample)
+    circuits = circuits[step - 1::step][:sample]
+    family_rows = {candidate.__name__: dict(candidate.point, family=family, time=0, cxs=0)
+                   for candidate in candidates}
+    for circuit in circuits:
+        result = Result(circuit, backend)
+        result.run_pms(candidates, times=times, cache=cache)
+        for pm_name, pm_result in result.pms_results.items():
+            if not pm_result['transpiled']:
+                # the point fails on this circuit, so it is not on the Pareto front
+                family_rows[pm_name]['time'] = float('inf')
+                family_rows[pm_name]['cxs'] = float('inf')
+                continue
+            family_rows[pm_name]['time'] += median(pm_result['times']['total'])
+            family_rows[pm_name]['cxs'] += median(transpiled.count_ops().get('cx', 0)
+                                                  for transpiled in pm_result['transpiled'])
+    family_rows = list(family_rows.values())
+    front = pareto_front(family_rows)
+    chosen = choose(front, cx_tolerance)
+    for row in family_rows:
+        row['pareto'] = any(row is front_row for front_row in front)
+        row['chosen'] = row is chosen
+    rows += family_rows
+
+    print('\n%s (%d circuits)' % (family, len(circuits)))
+    print(tabulate(front, headers='keys'))
+    if chosen is None:
+        print('no point compiled the sample of', family)
+        continue
+
+    benchmark = {'suite': suite,
+                 'backend': be_line,
+                 'pass managers': ['passmanager:level_3_with_contant_pure',
+                                   {'tuned': {knob: chosen[knob] for knob in knobs}}],
+                 'times': times,
+                 'fields': ['n_qubits', 'depth', 'we_cxs', 'tuned_cxs', 'we_time',
+                            'tuned_time', 'we_depth', 'tuned_depth']}
+    benchmarkfile = path.join('results', '%s_%s.yaml' % (name, family))
+    with open(benchmarkfile, 'w') as file:
+        yaml.dump(benchmark, file, sort_keys=False)
+    print('chosen:', point_name(chosen), '->', benchmarkfile)
+
+with open(resultfile, 'w') as csvfile:
+    writer = csv.DictWriter(csvfile, fieldnames=['family'] + knobs +
+                            ['time', 'cxs', 'pareto', 'chosen'])
+    writer.writeheader()
+    writer.writerows(rows)
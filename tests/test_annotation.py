@@ -140,6 +140,27 @@ class TestAnnotation(PureStateTestCase):
         self.assertEqual(expected, result)
 
 
+class TestAnnotationMatrix(PureStateTestCase):
+    def test_identity(self):
+        """An annotation acts as the identity"""
+        annotation = StateAnnotation(0.1, 0.2, 0.3)
+        self.assertTrue(np.allclose(annotation.to_matrix(), np.identity(2)))
+
+    def test_inverse_asserts_nothing(self):
+        """The inverse of an annotation is an identity that is not an annotation"""
+        qr = QuantumRegister(1, 'qr')
+        circuit = QuantumCircuit(qr)
+        circuit.u3(1.23, 2.34, 3.04, qr[0])
+        circuit.append(StateAnnotation(1.23, 2.34, 3.04), [qr[0]])
+        inverse = circuit.inverse()
+
+        self.assertNotIn('annotation', inverse.count_ops())
+        expected = QuantumCircuit(qr)
+        expected.u3(1.23, 2.34, 3.04, qr[0])
+        result = Unroller(['u3']).run(circuit_to_dag(inverse.inverse()))
+        self.assertEqual(circuit_to_dag(expected), result)
+
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -15,10 +15,11 @@
 import unittest
 
 from qiskit import QuantumRegister, QuantumCircuit
-from qiskit.transpiler.passes import Unroller
+from qiskit.transpiler.passes import Unroller, ConsolidateBlocks
 from qiskit.test import QiskitTestCase
-from qiskit.converters import circuit_to_dag
-from purestate import ASwapGate
+from qiskit.converters import circuit_to_dag, dag_to_circuit
+from qiskit.quantum_info import Operator
+from purestate import ASwapGate, ASwapDgGate, StateAnnotation
 
 
 class PureStateTestCase(QiskitTestCase):
@@ -63,5 +64,43 @@ class TestSWAPR(PureStateTestCase):
         self.assertEqualUnroll(['cx'], circuit, expected)
 
 
+class TestASwapMatrix(PureStateTestCase):
+    def test_matrix_matches_definition(self):
+        """The ASWAP matrix is the one of its CX definition"""
+        circuit = QuantumCircuit(2)
+        circuit.cx(1, 0)
+        circuit.cx(0, 1)
+        self.assertEqual(Operator(ASwapGate()), Operator(circuit))
+
+    def test_inverse(self):
+        """ASWAP^dagger undoes ASWAP"""
+        circuit = QuantumCircuit(2)
+        circuit.append(ASwapGate(), [0, 1])
+        circuit.append(ASwapGate().inverse(), [0, 1])
+        self.assertEqual(Operator(circuit), Operator(QuantumCircuit(2)))
+        self.assertIsInstance(ASwapDgGate().inverse(), ASwapGate)
+
+    def test_inverse_matrix_matches_definition(self):
+        """The ASWAP^dagger matrix is the one of its CX definition"""
+        circuit = QuantumCircuit(2)
+        circuit.cx(0, 1)
+        circuit.cx(1, 0)
+        self.assertEqual(Operator(ASwapDgGate()), Operator(circuit))
+        self.assertEqual(Operator(ASwapDgGate().to_matrix()), Operator(circuit))
+
+    def test_consolidate(self):
+        """ConsolidateBlocks takes a block with ASWAP and an annotation"""
+        circuit = QuantumCircuit(2)
+        circuit.append(StateAnnotation(0, 0, 0), [0])
+        circuit.append(ASwapGate(), [0, 1])
+        circuit.cx(1, 0)
+        dag = circuit_to_dag(circuit)
+        consolidate = ConsolidateBlocks()
+        consolidate.property_set['block_list'] = [list(dag.topological_op_nodes())]
+        result = dag_to_circuit(consolidate.run(dag))
+        self.assertEqual(list(result.count_ops()), ['unitary'])
+        self.assertEqual(Operator(result), Operator(circuit))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Test the unroller that skips DAGs already in its basis"""
+
+import unittest
+
+from qiskit import QuantumCircuit
+from qiskit.test import QiskitTestCase
+from qiskit.transpiler import PassManager, PassManagerConfig
+from qiskit.transpiler.coupling import CouplingMap
+from qiskit.transpiler.passes import ApplyLayout, CXCancellation, EnlargeWithAncilla, \
+    FullAncillaAllocation, TrivialLayout
+
+from passmanager import level_3_hoare_pass_manager
+from passmanager.basis_unroller import BasisUnroller, preserve_basis
+
+
+class TestBasisUnroller(QiskitTestCase):
+    basis = ['u1', 'u2', 'u3', 'cx', 'id']
+
+    def setUp(self):
+        super().setUp()
+        self.circuit = QuantumCircuit(3)
+        self.circuit.ccx(0, 1, 2)
+        self.circuit.h(0)
+
+    def unrolls(self, pass_manager):
+        """Runs of BasisUnroller, and the output circuit"""
+        calls = []
+        result = pass_manager.run(
+            self.circuit, callback=lambda **kwargs: calls.append(type(kwargs['pass_'])))
+        return calls.count(BasisUnroller), result
+
+    def test_skip_unrolled(self):
+        """An equal unroller right after another one does not run"""
+        runs, result = self.unrolls(PassManager([BasisUnroller(self.basis),
+                                                 BasisUnroller(self.basis)]))
+        self.assertEqual(runs, 1)
+        self.assertTrue(set(result.count_ops()) <= set(self.basis))
+
+    def test_other_basis(self):
+        """An unroller to another basis runs"""
+        runs, result = self.unrolls(PassManager([BasisUnroller(self.basis),
+                                                 BasisUnroller(['u3', 'cx'])]))
+        self.assertEqual(runs, 2)
+        self.assertEqual(set(result.count_ops()), {'u3', 'cx'})
+
+    def test_transformation_invalidates(self):
+        """A transformation pass in between makes the unroller run again"""
+        runs, _ = self.unrolls(PassManager([BasisUnroller(self.basis), CXCancellation(),
+                                            BasisUnroller(self.basis)]))
+        self.assertEqual(runs, 2)
+
+    def test_preserve_basis(self):
+        """Transformation passes can declare that they keep the DAG unrolled"""
+        coupling_map = CouplingMap([(0, 1), (1, 2), (2, 3)])
+        unroller = BasisUnroller(self.basis)
+        layout = [TrivialLayout(coupling_map), FullAncillaAllocation(coupling_map)]
+        runs, result = self.unrolls(PassManager(
+            [unroller] + layout + preserve_basis([EnlargeWithAncilla(), ApplyLayout()], unroller) +
+            [BasisUnroller(self.basis)]))
+        self.assertEqual(runs, 1)
+        self.assertEqual(len(result.qubits), 4)
+
+    def test_hoare_without_coupling_map(self):
+        """Without routing, the Hoare pass manager unrolls once before the optimizer"""
+        pm_conf = PassManagerConfig(basis_gates=self.basis)
+        calls = []
+        level_3_hoare_pass_manager(pm_conf).run(
+            self.circuit, callback=lambda **kwargs: calls.append(type(kwargs['pass_']).__name__))
+        self.assertEqual(calls[:2], ['BasisUnroller', 'HoareOptimizer'])
+
+
+if __name__ == '__main__':
+    unittest.main()
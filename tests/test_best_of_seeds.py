@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Test the best-of-seeds transpilation"""
+
+from copy import copy
+import tempfile
+import time
+import unittest
+
+from qiskit import QuantumCircuit
+from qiskit.test import QiskitTestCase
+from qiskit.test.mock import FakeAlmaden, FakeMelbourne
+from qiskit.circuit.random import random_circuit
+from qiskit.quantum_info import Operator
+from qiskit.transpiler import PassManager, PassManagerConfig, TranspilerError
+from qiskit.transpiler.basepasses import AnalysisPass
+from qiskit.transpiler.coupling import CouplingMap
+
+from passmanager import best_of_seeds, level_3_with_contant_pure, CompilationCache
+from passmanager.calibration import estimated_duration
+
+
+class Sleep(AnalysisPass):
+    """A pass that takes a minute"""
+
+    def run(self, dag):
+        time.sleep(60)
+
+
+def slow_pass_manager(pass_manager_config):  # pylint: disable=unused-argument
+    """A pass manager that takes a minute"""
+    return PassManager(Sleep())
+
+
+class TestBestOfSeeds(QiskitTestCase):
+    pm_conf = PassManagerConfig(
+        initial_layout=None,
+        basis_gates=['u1', 'u2', 'u3', 'cx', 'id'],
+        coupling_map=CouplingMap([(0, 1), (1, 2), (2, 3), (3, 4)]),
+        backend_properties=None,
+        seed_transpiler=1)
+
+    def setUp(self):
+        super().setUp()
+        self.circuit = random_circuit(5, 6, seed=3)
+
+    def test_best_by_cx(self):
+        """The best circuit has the fewest CX of the candidates, ties to the lowest seed"""
+        best, candidates = best_of_seeds(self.circuit, self.pm_conf, seeds=4, workers=2)
+        self.assertEqual([candidate['seed'] for candidate in candidates], [0, 1, 2, 3])
+        fewest = min(candidates, key=lambda candidate: (candidate['cx'], candidate['seed']))
+        self.assertEqual(best.count_ops().get('cx', 0), fewest['cx'])
+
+        pm_conf = copy(self.pm_conf)
+        pm_conf.seed_transpiler = fewest['seed']
+        self.assertEqual(Operator(best),
+                         Operator(level_3_with_contant_pure(pm_conf).run(self.circuit)))
+
+    def test_best_by_depth(self):
+        """The metric can be the depth"""
+        best, candidates = best_of_seeds(self.circuit, self.pm_conf, seeds=[5, 7],
+                                         metric='depth', workers=2)
+        self.assertEqual(best.depth(), min(candidate['depth'] for candidate in candidates))
+
+    def test_deadline(self):
+        """Nothing finishes before an expired deadline"""
+        best, candidates = best_of_seeds(self.circuit, self.pm_conf, seeds=4, deadline=0,
+                                         workers=2)
+        self.assertIsNone(best)
+        self.assertEqual(candidates, [])
+
+    def test_deadline_stops_running(self):
+        """The transpilations still running at the deadline are stopped"""
+        start = time.time()
+        best, candidates = best_of_seeds(self.circuit, self.pm_conf, seeds=2, deadline=1,
+                                         workers=2, pass_manager=slow_pass_manager)
+        self.assertLess(time.time() - start, 30)
+        self.assertIsNone(best)
+        self.assertEqual(candidates, [])
+
+    def test_best_by_duration(self):
+        """The metric can be the duration, with calibrated gate lengths"""
+        pm_conf = copy(self.pm_conf)
+        pm_conf.backend_properties = FakeAlmaden().properties()
+        best, candidates = best_of_seeds(self.circuit, pm_conf, seeds=2, metric='duration',
+                                         workers=2)
+        duration = estimated_duration(best, pm_conf.backend_properties)[0]
+        self.assertEqual(duration, min(candidate['duration'] for candidate in candidates))
+
+    def test_duration_unknown(self):
+        """Seeds without an estimated duration (a reset has no calibrated length on
+        FakeAlmaden) are not the best"""
+        pm_conf = copy(self.pm_conf)
+        pm_conf.backend_properties = FakeAlmaden().properties()
+        circuit = QuantumCircuit(2, 2)
+        circuit.h(0)
+        circuit.cx(0, 1)
+        circuit.measure(0, 0)
+        circuit.reset(0)
+        circuit.h(0)
+        circuit.cx(0, 1)
+        circuit.measure([0, 1], [0, 1])
+        best, candidates = best_of_seeds(circuit, pm_conf, seeds=2, metric='duration',
+                                         workers=2)
+        self.assertIsNone(best)
+        self.assertEqual([candidate['duration'] for candidate in candidates], [None, None])
+
+        # seed 1 is cached without the reset, so only its duration can be estimated
+        without_reset = level_3_with_contant_pure(pm_conf).run(self.circuit)
+        with tempfile.TemporaryDirectory() as directory:
+            cache = CompilationCache(directory)
+            pm_conf.seed_transpiler = 1
+            cache.put(cache.key(circuit, level_3_with_contant_pure, pm_conf), without_reset)
+            best, candidates = best_of_seeds(circuit, pm_conf, seeds=[0, 1],
+                                             metric='duration', workers=2, cache=cache)
+        self.assertEqual(best, without_reset)
+        self.assertIsNone(candidates[0]['duration'])
+        self.assertIsNotNone(candidates[1]['duration'])
+
+    def test_invalid_metric(self):
+        """Unknown metrics, and the duration without gate lengths, are errors"""
+        with self.assertRaises(TranspilerError):
+            best_of_seeds(self.circuit, self.pm_conf, metric='swaps')
+        with self.assertRaises(TranspilerError):
+            best_of_seeds(self.circuit, self.pm_conf, metric='duration')
+        pm_conf = copy(self.pm_conf)
+        pm_conf.backend_properties = FakeMelbourne().properties()
+        with self.assertRaises(TranspilerError):
+            best_of_seeds(self.circuit, pm_conf, metric='duration')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Test the estimates based on backend calibration data"""
+
+import unittest
+
+from qiskit import QuantumCircuit
+from qiskit.providers.models import BackendProperties
+from qiskit.test import QiskitTestCase
+from qiskit.test.mock import FakeAlmaden, FakeMelbourne
+
+from benchmark.utils import Result
+from passmanager.calibration import estimated_duration, estimated_success_probability, \
+    has_gate_lengths
+
+
+def _parameter(name, value):
+    return {'name': name, 'value': value, 'unit': '', 'date': '2020-01-01T00:00:00+00:00'}
+
+
+class FakeCalibrated:
+    """A 2-qubit backend with round error rates"""
+
+    @staticmethod
+    def properties():
+        return BackendProperties.from_dict({
+            'backend_name': 'fake_calibrated', 'backend_version': '0.0.0',
+            'last_update_date': '2020-01-01T00:00:00+00:00', 'general': [],
+            'qubits': [[_parameter('readout_error', 0.05)],
+                       [_parameter('readout_error', 0.02)]],
+            'gates': [{'gate': 'u2', 'qubits': [0],
+                       'parameters': [_parameter('gate_error', 0.01)]},
+                      {'gate': 'cx', 'qubits': [0, 1],
+                       'parameters': [_parameter('gate_error', 0.1)]}]})
+
+
+class TestEstimatedDuration(QiskitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.properties = FakeAlmaden().properties()
+        self.circuit = QuantumCircuit(3, 2)
+        self.circuit.u2(0, 3.14, 0)
+        self.circuit.cx(0, 1)
+        self.circuit.u3(1, 2, 3, 2)
+        self.circuit.measure(1, 0)
+
+    def length(self, name, qubits):
+        return self.properties.gate_length(name, qubits)
+
+    def test_duration(self):
+        """The gates of a qubit run one after the other, the qubits in parallel"""
+        duration, idle = estimated_duration(self.circuit, self.properties)
+        expected = self.length('u2', [0]) + self.length('cx', [0, 1])
+        self.assertAlmostEqual(duration, expected)
+        self.assertEqual(set(idle), {0, 1, 2})
+        self.assertAlmostEqual(idle[0], 0)
+        self.assertAlmostEqual(idle[1], self.length('u2', [0]))
+        self.assertAlmostEqual(idle[2], expected - self.length('u3', [2]))
+
+    def test_readout_length(self):
+        """Measurements take the given readout length when it is not calibrated"""
+        duration, _ = estimated_duration(self.circuit, self.properties, readout_length=1e-6)
+        self.assertAlmostEqual(duration, self.length('u2', [0]) + self.length('cx', [0, 1])
+                               + 1e-6)
+
+    def test_conditional(self):
+        """A conditional gate waits for the measurement of its condition"""
+        creg = self.circuit.cregs[0]
+        self.circuit.u3(1, 2, 3, 2).c_if(creg, 1)
+        duration, _ = estimated_duration(self.circuit, self.properties, readout_length=1e-6)
+        self.assertAlmostEqual(duration, self.length('u2', [0]) + self.length('cx', [0, 1])
+                               + 1e-6 + self.length('u3', [2]))
+
+    def test_no_gate_lengths(self):
+        """Without calibrated gate lengths, there is no estimate"""
+        self.assertFalse(has_gate_lengths(FakeMelbourne().properties()))
+        self.assertFalse(has_gate_lengths(None))
+        self.assertIsNone(estimated_duration(self.circuit, FakeMelbourne().properties()))
+        self.assertIsNone(estimated_duration(self.circuit, None))
+
+    def test_uncalibrated_gate(self):
+        """A gate without a calibrated length has no estimate"""
+        self.circuit.swap(0, 1)
+        self.assertIsNone(estimated_duration(self.circuit, self.properties))
+
+    def test_result_fields(self):
+        """The duration and idle fields of Result, with and without gate lengths"""
+        for backend, expected in [(FakeAlmaden, estimated_duration(self.circuit,
+                                                                   self.properties)),
+                                  (FakeMelbourne, (None, None))]:
+            with self.subTest(backend=backend.__name__):
+                result = Result(self.circuit, backend)
+                result.pms_results['level_3_with_contant_pure'] = {
+                    'transpiled': [self.circuit, self.circuit]}
+                result.pms_results['level_3_pass_manager'] = {'transpiled': [self.circuit]}
+                self.assertEqual(result.we_duration, [expected[0], expected[0]])
+                self.assertEqual(result.we_idle, [expected[1], expected[1]])
+                self.assertEqual(result.level3_duration, expected[0])
+                self.assertEqual(result.level3_idle, expected[1])
+
+
+class TestEstimatedSuccessProbability(QiskitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.circuit = QuantumCircuit(2, 2)
+        self.circuit.u2(0, 3.14, 0)
+        self.circuit.cx(0, 1)
+        self.circuit.barrier()
+        self.circuit.measure([0, 1], [0, 1])
+
+    def test_product(self):
+        """The probability is the product of 1 - error over the gates and readouts"""
+        self.assertAlmostEqual(estimated_success_probability(self.circuit,
+                                                             FakeCalibrated.properties()),
+                               0.99 * 0.9 * 0.95 * 0.98)
+
+    def test_uncalibrated_gate(self):
+        """Gates without a calibrated error (e.g. u1 here) do not fail"""
+        self.circuit.u1(1, 1)
+        self.assertAlmostEqual(estimated_success_probability(self.circuit,
+                                                             FakeCalibrated.properties()),
+                               0.99 * 0.9 * 0.95 * 0.98)
+
+    def test_result_fields(self):
+        """The esp fields of Result and their comparison"""
+        more_cx = self.circuit.copy()
+        more_cx.cx(0, 1)
+        result = Result(self.circuit, FakeCalibrated)
+        result.pms_results['level_3_with_contant_pure'] = {'transpiled': [self.circuit]}
+        result.pms_results['level_3_pass_manager'] = {'transpiled': [more_cx, self.circuit]}
+        self.assertAlmostEqual(result.we_esp, 0.99 * 0.9 * 0.95 * 0.98)
+        self.assertAlmostEqual(result.level3_esp[0], 0.99 * 0.9 * 0.9 * 0.95 * 0.98)
+        comparison = result.esp_comparison
+        self.assertEqual(set(comparison), {'level3', 'we', 'best'})
+        self.assertAlmostEqual(comparison['level3'],
+                               (0.99 * 0.9 * 0.9 * 0.95 * 0.98 + 0.99 * 0.9 * 0.95 * 0.98) / 2)
+        self.assertEqual(comparison['best'], 'we')
+
+
+if __name__ == '__main__':
+    unittest.main()
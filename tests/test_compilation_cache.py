@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Test the on-disk compilation cache"""
+
+from copy import copy
+from functools import partial
+import os
+import tempfile
+import time
+import unittest
+
+import numpy
+from qiskit import QuantumCircuit
+from qiskit.extensions import UnitaryGate
+from qiskit.quantum_info import random_unitary
+from qiskit.test import QiskitTestCase
+from qiskit.test.mock import FakeMelbourne
+from qiskit.transpiler import PassManagerConfig
+from qiskit.transpiler.coupling import CouplingMap
+
+from benchmark.utils.tuning import tuned_pass_manager
+from passmanager import CompilationCache, best_of_seeds, level_3_with_contant_pure
+
+
+class TestCompilationCache(QiskitTestCase):
+    pm_conf = PassManagerConfig(
+        initial_layout=None,
+        basis_gates=['u1', 'u2', 'u3', 'cx', 'id'],
+        coupling_map=CouplingMap([(0, 1), (1, 2), (2, 3), (3, 4)]),
+        backend_properties=None,
+        seed_transpiler=1)
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.cache = CompilationCache(self.directory.name)
+        self.circuit = QuantumCircuit(3, 3)
+        self.circuit.h(0)
+        self.circuit.cx(0, 2)
+        self.circuit.measure(range(3), range(3))
+
+    def key(self, circuit=None, pass_manager=level_3_with_contant_pure, **config):
+        pm_conf = copy(self.pm_conf)
+        for name, value in config.items():
+            setattr(pm_conf, name, value)
+        return self.cache.key(circuit or self.circuit, pass_manager, pm_conf)
+
+    def test_key(self):
+        """The key changes with the circuit, the pass manager and the configuration"""
+        renamed = self.circuit.copy()
+        renamed.name = 'other'
+        self.assertEqual(self.key(), self.key(renamed))
+
+        other_circuit = self.circuit.copy()
+        other_circuit.x(1)
+        keys = {self.key(), self.key(other_circuit), self.key(pass_manager='level_3'),
+                self.key(seed_transpiler=2), self.key(basis_gates=['u3', 'cx']),
+                self.key(coupling_map=CouplingMap([(1, 0), (1, 2), (2, 3), (3, 4)])),
+                self.key(backend_properties=FakeMelbourne().properties())}
+        self.assertEqual(len(keys), 7)
+
+    def test_key_wrappers(self):
+        """Builders that wrap another one with other arguments do not collide"""
+        keys = {self.key(pass_manager=partial(level_3_with_contant_pure, deadline=5)),
+                self.key(pass_manager=partial(level_3_with_contant_pure, deadline=6)),
+                self.key(pass_manager=lambda config: level_3_with_contant_pure(
+                    config, swap_trials=5)),
+                self.key(pass_manager=lambda config: level_3_with_contant_pure(
+                    config, swap_trials=6)),
+                self.key(pass_manager=tuned_pass_manager({'constants_in_loop': True})),
+                self.key()}
+        self.assertEqual(len(keys), 6)
+        self.assertEqual(self.key(pass_manager=partial(level_3_with_contant_pure, deadline=5)),
+                         self.key(pass_manager=partial(level_3_with_contant_pure, deadline=5)))
+        self.assertEqual(self.key(pass_manager=lambda config: level_3_with_contant_pure(config)),
+                         self.key())
+
+    def test_key_gates(self):
+        """Unitaries differ by any entry, and gates made from circuits by their gates"""
+        matrix = random_unitary(8, seed=1).data
+        close = matrix * numpy.exp(1e-12j)
+        keys = set()
+        for gate in [UnitaryGate(matrix), UnitaryGate(close)]:
+            circuit = QuantumCircuit(3)
+            circuit.append(gate, [0, 1, 2])
+            keys.add(self.key(circuit, pass_manager='level_3'))
+        for other_gate in ['x', 'z']:
+            definition = QuantumCircuit(1, name='custom')
+            getattr(definition, other_gate)(0)
+            circuit = QuantumCircuit(1)
+            circuit.append(definition.to_gate(), [0])
+            keys.add(self.key(circuit, pass_manager='level_3'))
+        self.assertEqual(len(keys), 4)
+
+    def test_run(self):
+        """A second run is a hit, with the same circuit"""
+        transpiled = self.cache.run(level_3_with_contant_pure, self.pm_conf, self.circuit)
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+        cached = self.cache.run(level_3_with_contant_pure, self.pm_conf, self.circuit)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertEqual(cached, transpiled)
+        self.assertEqual(cached.name, self.circuit.name)
+
+        # another process, same directory
+        other = CompilationCache(self.directory.name)
+        self.assertEqual(other.get(self.key()), transpiled)
+
+    def test_corrupt_entry(self):
+        """An entry that cannot be read is a miss"""
+        with open(os.path.join(self.directory.name, self.key() + '.pickle'), 'wb') as file:
+            file.write(b'not a pickle')
+        self.assertIsNone(self.cache.get(self.key()))
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_eviction(self):
+        """Over maxsize, the least recently used entries are removed"""
+        self.cache.put('a', bytes(1000))
+        self.cache.put('b', bytes(1000))
+        past = time.time() - 10
+        os.utime(os.path.join(self.directory.name, 'a.pickle'), (past, past))
+        os.utime(os.path.join(self.directory.name, 'b.pickle'), (past - 10, past - 10))
+        self.cache.get('b')  # b is now the most recently used
+
+        self.cache.maxsize = 2500
+        self.cache.put('c', bytes(1000))
+        self.assertIsNone(self.cache.get('a'))
+        self.assertIsNotNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('c'))
+
+    def test_best_of_seeds(self):
+        """best_of_seeds takes the seeds in the cache and adds the others"""
+        best, candidates = best_of_seeds(self.circuit, self.pm_conf, seeds=2, workers=1,
+                                         cache=self.cache)
+        self.assertEqual(self.cache.misses, 2)
+        cached_best, cached_candidates = best_of_seeds(self.circuit, self.pm_conf, seeds=2,
+                                                       workers=1, cache=self.cache)
+        self.assertEqual(self.cache.hits, 2)
+        self.assertEqual(cached_candidates, candidates)
+        self.assertEqual(cached_best, best)
+
+
+if __name__ == '__main__':
+    unittest.main()
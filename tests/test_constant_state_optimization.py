@@ -23,6 +23,7 @@ from qiskit.compiler import transpile
 from qiskit.test import QiskitTestCase
 from qiskit.test.mock import FakeRueschlikon
 from purestate import ConstantsStateOptimization, ASwapGate
+from purestate.state_timeline import ConstantStateTimeline, UNKNOWN, ZERO, ONE, PLUS
 
 
 class TestControlOnConstZero(QiskitTestCase):
@@ -1848,5 +1849,46 @@ class TestBugs(QiskitTestCase):
         self.assertEqual(pass_.wire_state._dict, {qr[0]: '0', qr[1]: '0', qr[2]: '0', qr[3]: '0'})
         self.assertEqual(expected, result)
 
+
+class TestTimeline(QiskitTestCase):
+    def test_timeline(self):
+        """State codes per layer and wire
+         |0> --H--.--
+                  |
+         |0> --X--X--
+         """
+        qr = QuantumRegister(2, 'qr')
+        circuit = QuantumCircuit(qr)
+        circuit.h(qr[0])
+        circuit.x(qr[1])
+        circuit.cx(qr[0], qr[1])
+
+        passmanager = PassManager()
+        passmanager.append([ConstantsStateOptimization(), ConstantStateTimeline()])
+        passmanager.run(circuit)
+        timeline = passmanager.property_set['constant_state_timeline']
+
+        self.assertEqual(timeline.shape, (2, 2))
+        self.assertEqual(timeline['code'].tolist(), [[PLUS, ONE], [UNKNOWN, UNKNOWN]])
+
+    def test_timeline_of_output(self):
+        """The layers are the ones of the optimized circuit
+         |0> --.-----       |0> -----
+               |       =>
+         |0> --X--H--       |0> --H--
+         """
+        qr = QuantumRegister(2, 'qr')
+        circuit = QuantumCircuit(qr)
+        circuit.cx(qr[0], qr[1])
+        circuit.h(qr[1])
+
+        passmanager = PassManager()
+        passmanager.append([ConstantsStateOptimization(), ConstantStateTimeline()])
+        result = passmanager.run(circuit)
+        timeline = passmanager.property_set['constant_state_timeline']
+
+        self.assertEqual(timeline.shape, (result.depth(), 2))
+        self.assertEqual(timeline['code'].tolist(), [[ZERO, PLUS]])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Test the compile deadline of the pass managers"""
+
+import time
+import unittest
+
+from ddt import ddt, data
+from qiskit import QuantumCircuit
+from qiskit.circuit.random import random_circuit
+from qiskit.test import QiskitTestCase
+from qiskit.transpiler import PassManager, PassManagerConfig
+from qiskit.transpiler.coupling import CouplingMap
+
+from passmanager import level_3_with_contant_pure, level_3_hoare_pass_manager
+from passmanager.deadline import SetDeadline, stage_budgets
+from passmanager.hoare_opt import HoareOptimizer
+
+
+class TestStageBudgets(QiskitTestCase):
+    def test_no_deadline(self):
+        """Without a deadline, the budgets are the full ones"""
+        self.assertEqual(stage_budgets(None),
+                         {'csp_time_limit': 60, 'csp_call_limit': 10000, 'swap_trials': 200,
+                          'hoare_deadline_share': None})
+
+    def test_scale_down(self):
+        """The budgets shrink with the deadline, and are full for long ones"""
+        tight, loose, long = stage_budgets(1), stage_budgets(20), stage_budgets(1000)
+        for name in ['csp_time_limit', 'csp_call_limit', 'swap_trials']:
+            with self.subTest(budget=name):
+                self.assertLess(tight[name], loose[name])
+        self.assertEqual(tight['swap_trials'], 20)
+        self.assertEqual(long['swap_trials'], 200)
+        self.assertEqual(long['csp_time_limit'], 60)
+        self.assertEqual(long['csp_call_limit'], 10000)
+        # a share of the time left when the Hoare optimizer starts, whatever the deadline
+        self.assertAlmostEqual(tight['hoare_deadline_share'], 0.4)
+        self.assertEqual(tight['hoare_deadline_share'], long['hoare_deadline_share'])
+
+
+@ddt
+class TestDeadline(QiskitTestCase):
+    pm_conf = PassManagerConfig(
+        initial_layout=None,
+        basis_gates=['u1', 'u2', 'u3', 'cx', 'id'],
+        coupling_map=CouplingMap([(0, 1), (1, 2), (2, 3), (3, 4)]),
+        backend_properties=None,
+        seed_transpiler=1)
+
+    def iterations(self, pass_manager, deadline):
+        """Iterations of the optimization loop (runs of Depth)"""
+        circuit = random_circuit(5, 8, seed=2)
+        calls = []
+        pass_manager(self.pm_conf, deadline=deadline).run(
+            circuit, callback=lambda **kwargs: calls.append(type(kwargs['pass_']).__name__))
+        return calls.count('Depth')
+
+    @data(level_3_with_contant_pure, level_3_hoare_pass_manager)
+    def test_expired_deadline(self, pass_manager):
+        """Past the deadline, the optimization loop stops after its first iteration"""
+        self.assertEqual(self.iterations(pass_manager, 0), 1)
+        self.assertGreater(self.iterations(pass_manager, None), 1)
+
+    @data(level_3_with_contant_pure, level_3_hoare_pass_manager)
+    def test_budgets(self, pass_manager):
+        """The deadline sets the budgets of the passes"""
+        passes = [pass_ for pass_set in pass_manager(self.pm_conf, deadline=4)._pass_sets
+                  for pass_ in pass_set['passes']]
+        trials = [pass_.trials for pass_ in passes if type(pass_).__name__ == 'StochasticSwap']
+        self.assertEqual(trials, [stage_budgets(4)['swap_trials']])
+        csp = [pass_ for pass_ in passes if type(pass_).__name__ == 'CSPLayout'][0]
+        self.assertEqual(csp.time_limit, stage_budgets(4)['csp_time_limit'])
+
+    def test_hoare_share(self):
+        """The Hoare optimizer gets its share of the time left when it starts"""
+        pass_manager = level_3_hoare_pass_manager(self.pm_conf, deadline=4)
+        hoare = [pass_ for pass_set in pass_manager._pass_sets for pass_ in pass_set['passes']
+                 if isinstance(pass_, HoareOptimizer)][0]
+        self.assertEqual(hoare.deadline_share, stage_budgets(4)['hoare_deadline_share'])
+        self.assertIsNone(hoare.time_limit)
+
+        # the CZ is trivial, but only the solver can tell
+        circuit = QuantumCircuit(2)
+        circuit.h(0)
+        circuit.cx(0, 1)
+        circuit.cz(0, 1)
+        for deadline, gates in [(0, 3), (60, 2)]:
+            with self.subTest(deadline=deadline):
+                pass_manager = PassManager([SetDeadline(deadline),
+                                            HoareOptimizer(size=0, deadline_share=0.5)])
+                start = time.time()
+                result = pass_manager.run(circuit)
+                self.assertEqual(len(result), gates)
+                self.assertLess(time.time() - start, 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
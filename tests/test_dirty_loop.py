@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Test the optimization loop that stops when no qubit changes"""
+
+import unittest
+
+from ddt import ddt, data
+from qiskit import QuantumCircuit
+from qiskit.circuit.random import random_circuit
+from qiskit.converters import circuit_to_dag
+from qiskit.test import QiskitTestCase
+from qiskit.transpiler import PassManager, PassManagerConfig
+from qiskit.transpiler.coupling import CouplingMap
+from qiskit.transpiler.passes import Optimize1qGates
+
+from passmanager import level_3_with_contant_pure, level_3_hoare_pass_manager
+from passmanager.dirty_loop import WireSignature
+
+
+class TestWireSignature(QiskitTestCase):
+    def test_dirty_qubits(self):
+        """The dirty qubits are the ones whose gates changed"""
+        circuit = QuantumCircuit(3)
+        circuit.u1(0.1, 0)
+        circuit.u1(0.2, 0)
+        circuit.cx(1, 2)
+        dag = circuit_to_dag(circuit)
+        pass_manager = PassManager([WireSignature()])
+
+        pass_manager.run(circuit)
+        self.assertEqual(pass_manager.property_set['dirty_qubits'], set(dag.qubits()))
+
+        signature = WireSignature()
+        signature.property_set = pass_manager.property_set
+        signature.run(dag)
+        self.assertEqual(signature.property_set['dirty_qubits'], set())
+
+        dag = Optimize1qGates().run(dag)
+        signature.run(dag)
+        self.assertEqual(signature.property_set['dirty_qubits'], {dag.qubits()[0]})
+
+
+@ddt
+class TestIncrementalLoop(QiskitTestCase):
+    pm_conf = PassManagerConfig(
+        initial_layout=None,
+        basis_gates=['u1', 'u2', 'u3', 'cx', 'id'],
+        coupling_map=CouplingMap([(0, 1), (1, 2), (2, 3), (3, 4)]),
+        backend_properties=None,
+        seed_transpiler=1)
+
+    def run_loop(self, pass_manager, circuit, incremental_loop):
+        """Transpiled circuit and iterations of the optimization loop"""
+        calls = []
+        result = pass_manager(self.pm_conf, incremental_loop=incremental_loop).run(
+            circuit, callback=lambda **kwargs: calls.append(type(kwargs['pass_']).__name__))
+        return result, calls.count('ConsolidateBlocks')
+
+    @data(level_3_with_contant_pure, level_3_hoare_pass_manager)
+    def test_same_result(self, pass_manager):
+        """The loop ends one iteration earlier, with the same circuit"""
+        circuit = random_circuit(5, 10, seed=4)
+        expected, iterations = self.run_loop(pass_manager, circuit, False)
+        result, incremental_iterations = self.run_loop(pass_manager, circuit, True)
+        self.assertEqual(result.count_ops(), expected.count_ops())
+        self.assertEqual(result.depth(), expected.depth())
+        self.assertEqual(incremental_iterations, iterations - 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
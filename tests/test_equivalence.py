@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Test the known-input equivalence checker"""
+
+import unittest
+
+from ddt import ddt, data
+from qiskit import QuantumCircuit
+from qiskit.compiler import transpile
+from qiskit.exceptions import QiskitError
+from qiskit.test import QiskitTestCase
+from qiskit.transpiler.coupling import CouplingMap
+
+from benchmark.utils import KnownInputChecker, equivalent_on_input
+from passmanager import level_3_with_contant_pure
+from purestate import StateAnnotation
+from qiskit.transpiler import PassManagerConfig
+
+
+def ghz(n_qubits, measure=True):
+    """A GHZ state preparation"""
+    circuit = QuantumCircuit(n_qubits, n_qubits) if measure else QuantumCircuit(n_qubits)
+    circuit.h(0)
+    for qubit in range(1, n_qubits):
+        circuit.cx(qubit - 1, qubit)
+    if measure:
+        circuit.measure(range(n_qubits), range(n_qubits))
+    return circuit
+
+
+@ddt
+class TestKnownInputChecker(QiskitTestCase):
+    line = CouplingMap([(0, 1), (1, 2), (2, 3), (3, 4)])
+
+    @data('stabilizer', 'statevector', None)
+    def test_equivalent(self, method):
+        """Another preparation of the same state is equivalent"""
+        expected = QuantumCircuit(3, 3)
+        expected.h(0)
+        expected.cx(0, 2)
+        expected.cx(0, 1)
+        expected.measure(range(3), range(3))
+        self.assertTrue(equivalent_on_input(ghz(3), expected, method=method))
+
+    @data('stabilizer', 'statevector', None)
+    def test_not_equivalent(self, method):
+        """A relative phase makes it another state"""
+        circuit = ghz(3, measure=False)
+        circuit.z(1)
+        circuit.measure_all()
+        reference = ghz(3, measure=False)
+        reference.measure_all()
+        self.assertFalse(equivalent_on_input(reference, circuit, method=method))
+
+    def test_known_input(self):
+        """A CX controlled by |0> is the identity on the |0...0> input only"""
+        circuit = QuantumCircuit(2)
+        circuit.cx(0, 1)
+        circuit.x(1)
+        expected = QuantumCircuit(2)
+        expected.x(1)
+        self.assertTrue(equivalent_on_input(circuit, expected))
+
+    def test_traced_out(self):
+        """Unmeasured qubits are traced out"""
+        reference = ghz(2)
+        candidate = QuantumCircuit(3)
+        candidate.add_register(reference.cregs[0])
+        candidate.h([0, 2])
+        candidate.cx(0, 1)
+        candidate.measure([0, 1], [0, 1])
+        self.assertTrue(equivalent_on_input(reference, candidate))
+        # entangled with the unmeasured qubit, the measured ones are in a mixed state
+        candidate = ghz(3, measure=False)
+        candidate.add_register(reference.cregs[0])
+        candidate.measure([0, 1], [0, 1])
+        self.assertFalse(equivalent_on_input(reference, candidate))
+        candidate = ghz(2, measure=False)
+        candidate.add_register(reference.cregs[0])
+        candidate.h(1)
+        candidate.measure([0, 1], [0, 1])
+        self.assertFalse(equivalent_on_input(reference, candidate))
+
+    def test_stabilizer_statevector(self):
+        """Both simulations agree on Clifford circuits with rotations by pi/2"""
+        reference = QuantumCircuit(3)
+        reference.u3(1.5707963267948966, 0, 3.141592653589793, 0)
+        reference.cx(0, 1)
+        reference.u1(1.5707963267948966, 1)
+        reference.swap(1, 2)
+        reference.cz(0, 2)
+        reference.measure_all()
+        for candidate, expected in [(reference, True), (ghz(3, measure=False), False)]:
+            candidate = candidate.copy()
+            if not candidate.cregs:
+                candidate.measure_all()
+            with self.subTest(expected=expected):
+                self.assertTrue(KnownInputChecker(reference).reference.is_clifford)
+                self.assertEqual(equivalent_on_input(reference, candidate, 'stabilizer'),
+                                 expected)
+                self.assertEqual(equivalent_on_input(reference, candidate, 'statevector'),
+                                 expected)
+
+    def test_routed_with_measurements(self):
+        """The measurements place the qubits of a routed circuit"""
+        circuit = ghz(4)
+        transpiled = transpile(circuit, coupling_map=self.line, initial_layout=[4, 0, 2, 1],
+                               basis_gates=['u1', 'u2', 'u3', 'cx'], seed_transpiler=0)
+        self.assertTrue(equivalent_on_input(circuit, transpiled))
+
+    def test_routed_without_measurements(self):
+        """The layout places the qubits of a routed circuit without measurements"""
+        circuit = ghz(3, measure=False)
+        circuit.x(2)
+        transpiled = transpile(circuit, coupling_map=self.line, initial_layout=[2, 1, 0],
+                               basis_gates=['u1', 'u2', 'u3', 'cx'], optimization_level=0)
+        self.assertTrue(equivalent_on_input(circuit, transpiled))
+
+    def test_routed_without_measurements_unknown(self):
+        """If the qubits of an unmeasured routed circuit differ, the check is inconclusive"""
+        circuit = ghz(3, measure=False)
+        transpiled = transpile(circuit, coupling_map=self.line, initial_layout=[0, 1, 2],
+                               basis_gates=['u1', 'u2', 'u3', 'cx'], optimization_level=0)
+        transpiled.x(0)
+        with self.assertRaises(QiskitError):
+            equivalent_on_input(circuit, transpiled)
+        self.assertEqual(KnownInputChecker(circuit).check_all([transpiled]), [None])
+
+    def test_input_annotation(self):
+        """An annotation before any gate is the input state of its qubit"""
+        circuit = QuantumCircuit(2)
+        circuit.append(StateAnnotation(3.141592653589793, 0, 0), [0])
+        circuit.cx(0, 1)
+        circuit.measure_all()
+        # the input of qubit 0 is |1>, in both circuits
+        expected = QuantumCircuit(2)
+        expected.x(1)
+        expected.measure_all()
+        self.assertTrue(equivalent_on_input(circuit, expected))
+        expected = QuantumCircuit(2)
+        expected.measure_all()
+        self.assertFalse(equivalent_on_input(circuit, expected))
+
+    def test_input_annotation_rpo(self):
+        """RPO relies on the annotated input, which the checker gives to both circuits"""
+        circuit = QuantumCircuit(3)
+        circuit.append(StateAnnotation(3.141592653589793, 0, 0), [0])
+        circuit.append(StateAnnotation(1.5707963267948966, 0, 3.141592653589793), [2])
+        circuit.cx(0, 1)
+        circuit.swap(1, 2)
+        circuit.measure_all()
+        pm_conf = PassManagerConfig(basis_gates=['u1', 'u2', 'u3', 'cx', 'id'],
+                                    coupling_map=self.line, seed_transpiler=0)
+        transpiled = level_3_with_contant_pure(pm_conf).run(circuit)
+        self.assertTrue(equivalent_on_input(circuit, transpiled))
+
+
+if __name__ == '__main__':
+    unittest.main()
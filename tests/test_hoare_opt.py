@@ -0,0 +1,535 @@
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Test the HoareOptimizer pass"""
+
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import z3
+
+from qiskit import QuantumRegister, QuantumCircuit
+from qiskit.test import QiskitTestCase
+from qiskit.transpiler import PassManager, PassManagerConfig, TranspilerError
+from qiskit.converters import circuit_to_dag
+from qiskit.circuit.random import random_circuit
+from passmanager import HoareOptimizer, HoareStatistics, TrivialityCache, \
+    TRIVIALITY_CACHE, level_3_hoare_pass_manager
+from purestate import StateAnnotation
+from passmanager.hoare_opt import _GateCache, _components, _fingerprint, _optimize_component
+
+
+class TestWindow(QiskitTestCase):
+    def circuit(self):
+        """ qr0 and qr1 keep a classical value while qr2 goes through many gates
+        qr0: -------------------------.----
+                                      |
+        qr1: -X-----------------------|--.-
+                                      |  |
+        qr2: -H-T-H-T-...-H-T-H-T-----X--X-
+        """
+        qr = QuantumRegister(3, 'qr')
+        circuit = QuantumCircuit(qr)
+        circuit.x(qr[1])
+        for _ in range(10):
+            circuit.h(qr[2])
+            circuit.t(qr[2])
+        circuit.cx(qr[0], qr[2])
+        circuit.cx(qr[1], qr[2])
+        return circuit
+
+    def test_no_window(self):
+        """Without window, a CX controlled by a |0> qubit is removed"""
+        expected = self.circuit()
+        expected.data.pop(-2)
+
+        result = HoareOptimizer(size=0).run(circuit_to_dag(self.circuit()))
+        self.assertEqual(circuit_to_dag(expected), result)
+
+    def test_window_keeps_classical_values(self):
+        """The classical value of a qubit survives the window sliding"""
+        expected = self.circuit()
+        expected.data.pop(-2)
+
+        result = HoareOptimizer(size=0, window=3).run(circuit_to_dag(self.circuit()))
+        self.assertEqual(circuit_to_dag(expected), result)
+
+    def test_window_drops_old_constraints(self):
+        """Constraints older than the window are not in the solver"""
+        pass_ = HoareOptimizer(size=0)
+        pass_.run(circuit_to_dag(self.circuit()))
+        pass_window = HoareOptimizer(size=0, window=3)
+        pass_window.run(circuit_to_dag(self.circuit()))
+
+        self.assertLess(len(pass_window.solver.assertions()),
+                        len(pass_.solver.assertions()) / 2)
+
+
+class TestPropagation(QiskitTestCase):
+    def test_classical_circuit_without_solver(self):
+        """A circuit on classical states is optimized without calling the solver
+        qr0: -X--.----.--          qr0: -X--.--
+                 |    |                     |
+        qr1: ----X----|--    =>    qr1: ----X--
+                      |
+        qr2: ---------X--          qr2: -------
+        """
+        qr = QuantumRegister(3, 'qr')
+        circuit = QuantumCircuit(qr)
+        circuit.x(qr[0])
+        circuit.cx(qr[0], qr[1])
+        circuit.ccx(qr[0], qr[2], qr[1])
+        circuit.swap(qr[0], qr[1])
+
+        expected = QuantumCircuit(qr)
+        expected.x(qr[0])
+        expected.cx(qr[0], qr[1])
+
+        pass_ = HoareOptimizer(size=0)
+        with patch.object(pass_.solver, 'check') as check:
+            result = pass_.run(circuit_to_dag(circuit))
+        check.assert_not_called()
+        self.assertEqual(circuit_to_dag(expected), result)
+
+    def test_same_as_solver(self):
+        """Propagation does not change the result of the pass"""
+        for seed in range(5):
+            with self.subTest(seed=seed):
+                circuit = random_circuit(5, 10, max_operands=3, seed=seed)
+                result = HoareOptimizer(size=0).run(circuit_to_dag(circuit))
+                expected = HoareOptimizer(size=0, propagation=False).run(
+                    circuit_to_dag(circuit))
+                self.assertEqual(expected, result)
+
+
+class TestCache(QiskitTestCase):
+    def circuit(self):
+        """ the CZ are trivial, as each qubit is a copy of the other
+        qr0: -H--.------.--.--
+                 |      |  |
+        qr1: ----X--.---.--.--
+                    |
+        qr2: -H-----.---------
+        """
+        qr = QuantumRegister(3, 'qr')
+        circuit = QuantumCircuit(qr)
+        circuit.h(qr[0])
+        circuit.cx(qr[0], qr[1])
+        circuit.h(qr[2])
+        circuit.cz(qr[1], qr[2])
+        circuit.cz(qr[0], qr[1])
+        circuit.cz(qr[0], qr[1])
+        return circuit
+
+    def test_shared_cache(self):
+        """A cache shared between runs answers the repeated queries"""
+        cache = TrivialityCache()
+        first = HoareOptimizer(size=0, propagation=False, cache=cache).run(
+            circuit_to_dag(self.circuit()))
+        misses = cache.misses
+        self.assertGreater(misses, 0)
+
+        second = HoareOptimizer(size=0, propagation=False, cache=cache).run(
+            circuit_to_dag(self.circuit()))
+        self.assertEqual(first, second)
+        self.assertEqual(cache.misses, misses)
+        self.assertGreater(cache.hits, 0)
+
+    def test_no_cache_by_default(self):
+        """Without a cache, every query goes to the solver of the pass"""
+        pass_ = HoareOptimizer(size=0, propagation=False)
+        pass_.run(circuit_to_dag(self.circuit()))
+        self.assertIsNone(pass_.cache)
+        self.assertEqual(pass_.stats['cache_hits'], 0)
+        self.assertGreater(pass_.indicators, 0)
+
+    def test_pass_manager_opt_in(self):
+        """The Hoare pass manager shares TRIVIALITY_CACHE only if asked to"""
+        pm_conf = PassManagerConfig(basis_gates=['u1', 'u2', 'u3', 'cx', 'id'])
+        TRIVIALITY_CACHE.answers.clear()
+        level_3_hoare_pass_manager(pm_conf).run(self.circuit())
+        self.assertEqual(len(TRIVIALITY_CACHE.answers), 0)
+        level_3_hoare_pass_manager(pm_conf, {'size': 10, 'propagation': False,
+                                             'cache': TRIVIALITY_CACHE}).run(self.circuit())
+        self.assertGreater(len(TRIVIALITY_CACHE.answers), 0)
+        TRIVIALITY_CACHE.answers.clear()
+
+    def test_same_as_solver(self):
+        """The cache does not change the result of the pass"""
+        cache = TrivialityCache()
+        for seed in range(5):
+            with self.subTest(seed=seed):
+                circuit = random_circuit(5, 10, max_operands=3, seed=seed)
+                result = HoareOptimizer(size=0, propagation=False, cache=cache).run(
+                    circuit_to_dag(circuit))
+                expected = HoareOptimizer(size=0, propagation=False, cache_cone=0).run(
+                    circuit_to_dag(circuit))
+                self.assertEqual(expected, result)
+
+    def test_save_load(self):
+        """A saved cache can be loaded back"""
+        cache = TrivialityCache()
+        HoareOptimizer(size=0, propagation=False, cache=cache).run(
+            circuit_to_dag(self.circuit()))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.pickle')
+            cache.save(path)
+            loaded = TrivialityCache.load(path)
+        self.assertEqual(cache.answers, loaded.answers)
+
+    def test_lru(self):
+        """The least recently used answer is evicted"""
+        cache = TrivialityCache(maxsize=2)
+        cache.put('a', True)
+        cache.put('b', False)
+        cache.get('a')
+        cache.put('c', True)
+        self.assertEqual(list(cache.answers), ['a', 'c'])
+
+
+class TestGateCache(QiskitTestCase):
+    def test_linked_list(self):
+        """Append, remove and successor on a gate cache"""
+        cache = _GateCache()
+        for node in 'abcd':
+            cache.append(node)
+        cache.remove('b')
+        cache.remove('d')
+        cache.remove('x')
+        self.assertEqual(list(cache), ['a', 'c'])
+        self.assertEqual(cache.successor('a'), 'c')
+        self.assertIsNone(cache.successor('c'))
+        self.assertEqual(len(cache), 2)
+        cache.append('e')
+        self.assertEqual(cache.tail, 'e')
+        self.assertEqual(cache.successor('c'), 'e')
+
+    def test_cascade(self):
+        """Removing an identity pair makes a new one, in the cache of another qubit
+        qr0: ---X----X----X----X---
+                |    |    |    |
+        qr1: -H-|----.----.----|---     =>   qr1: -H-
+                |              |
+        qr2: -H-.--------------.---          qr2: -H-
+        """
+        qr = QuantumRegister(3, 'qr')
+        circuit = QuantumCircuit(qr)
+        circuit.h(qr[1])
+        circuit.h(qr[2])
+        circuit.cx(qr[2], qr[0])
+        circuit.cx(qr[1], qr[0])
+        circuit.cx(qr[1], qr[0])
+        circuit.cx(qr[2], qr[0])
+
+        expected = QuantumCircuit(qr)
+        expected.h(qr[1])
+        expected.h(qr[2])
+
+        for size in [3, 100]:
+            with self.subTest(size=size):
+                result = HoareOptimizer(size=size).run(circuit_to_dag(circuit))
+                self.assertEqual(circuit_to_dag(expected), result)
+
+    def test_large_cache(self):
+        """A cache larger than the circuit keeps the result of a small one"""
+        for seed in range(5):
+            with self.subTest(seed=seed):
+                circuit = random_circuit(4, 20, max_operands=3, seed=seed)
+                small = HoareOptimizer(size=10).run(circuit_to_dag(circuit))
+                large = HoareOptimizer(size=200).run(circuit_to_dag(circuit))
+                self.assertLessEqual(large.size(), small.size())
+
+
+class TestBudget(QiskitTestCase):
+    def circuit(self):
+        """ the CZ is trivial, but only the solver can tell
+        qr0: -H--.--.--
+                 |  |
+        qr1: ----X--.--
+        """
+        qr = QuantumRegister(2, 'qr')
+        circuit = QuantumCircuit(qr)
+        circuit.h(qr[0])
+        circuit.cx(qr[0], qr[1])
+        circuit.cz(qr[0], qr[1])
+        return circuit
+
+    def test_stats_in_property_set(self):
+        """The solver statistics are published in the property set"""
+        pass_ = HoareOptimizer(size=0, propagation=False)
+        pass_manager = PassManager([pass_, HoareStatistics(pass_)])
+        result = pass_manager.run(self.circuit())
+        stats = pass_manager.property_set['hoare_stats']
+
+        self.assertEqual(len(result.data), 2)
+        self.assertGreater(stats['queries'], 0)
+        self.assertEqual(stats['queries'], stats['sat'] + stats['unsat'] + stats['unknown'])
+        self.assertEqual(stats['unknown'], 0)
+        self.assertIn('cz q0,q1', [gate for _, gate in stats['slowest']])
+
+    def test_exhausted_budget(self):
+        """Once the budget runs out, the gates are treated as non-trivial"""
+        pass_ = HoareOptimizer(size=0, propagation=False, time_budget=0)
+        with patch.object(pass_.solver, 'check') as check:
+            result = pass_.run(circuit_to_dag(self.circuit()))
+        check.assert_not_called()
+        self.assertEqual(circuit_to_dag(self.circuit()), result)
+        self.assertEqual(pass_.stats['queries'], 0)
+        self.assertGreater(pass_.stats['unknown'], 0)
+
+    def test_query_limit(self):
+        """A per-query conflict limit does not change the result on easy queries"""
+        for seed in range(5):
+            with self.subTest(seed=seed):
+                circuit = random_circuit(5, 10, max_operands=3, seed=seed)
+                result = HoareOptimizer(size=0, query_conflicts=1000,
+                                        query_timeout=10000).run(circuit_to_dag(circuit))
+                expected = HoareOptimizer(size=0).run(circuit_to_dag(circuit))
+                self.assertEqual(expected, result)
+
+    def test_time_limit(self):
+        """Once the time limit passes, the remaining gates are kept"""
+        pass_ = HoareOptimizer(size=0, time_limit=0)
+        result = pass_.run(circuit_to_dag(self.circuit()))
+        self.assertEqual(circuit_to_dag(self.circuit()), result)
+        self.assertEqual(pass_.stats['skipped'], 3)
+
+        pass_ = HoareOptimizer(size=0, time_limit=60)
+        self.assertEqual(len(pass_.run(circuit_to_dag(self.circuit())).op_nodes()), 2)
+        self.assertEqual(pass_.stats['skipped'], 0)
+
+
+class TestComponents(QiskitTestCase):
+    def circuit(self, seed):
+        """ two random circuits, on qubits 0-3 and 4-6 """
+        circuit = QuantumCircuit(7)
+        circuit.append(random_circuit(4, 10, max_operands=3, seed=seed).to_instruction(),
+                       range(4))
+        circuit.append(random_circuit(3, 10, max_operands=3, seed=seed + 1).to_instruction(),
+                       range(4, 7))
+        return circuit.decompose()
+
+    def test_components(self):
+        """Gates are split by the connected components of their qubits"""
+        qr = QuantumRegister(4, 'qr')
+        circuit = QuantumCircuit(qr)
+        circuit.h(qr[0])
+        circuit.cx(qr[0], qr[2])
+        circuit.x(qr[1])
+        circuit.cx(qr[1], qr[3])
+        circuit.z(qr[2])
+
+        components = _components(circuit_to_dag(circuit))
+        self.assertEqual([[node.name for node in nodes] for nodes in components],
+                         [['h', 'cx', 'z'], ['x', 'cx']])
+
+    def test_same_as_serial(self):
+        """Optimizing the components in worker processes gives the serial result"""
+        for seed in range(3):
+            with self.subTest(seed=seed):
+                circuit = self.circuit(seed)
+                pass_ = HoareOptimizer(size=10, workers=2)
+                result = pass_.run(circuit_to_dag(circuit))
+                expected = HoareOptimizer(size=10).run(circuit_to_dag(circuit))
+                self.assertEqual(expected, result)
+                self.assertGreater(pass_.stats['classical'], 0)
+
+    def test_deadline(self):
+        """The workers stop at the deadline of the pass, whenever they start"""
+        circuit = self.circuit(0)
+        removed, stats, _ = _optimize_component(circuit, {'size': 10}, time.time() - 1)
+        self.assertEqual(removed, [])
+        self.assertEqual(stats['skipped'], circuit.size())
+        removed, stats, _ = _optimize_component(circuit, {'size': 10}, time.time() + 60)
+        self.assertGreater(len(removed), 0)
+        self.assertEqual(stats['skipped'], 0)
+
+
+class TestIncremental(QiskitTestCase):
+    def test_same_as_pushpop(self):
+        """Checking under assumptions gives the push/pop result"""
+        for seed in range(5):
+            with self.subTest(seed=seed):
+                circuit = random_circuit(5, 20, max_operands=3, seed=seed)
+                pass_ = HoareOptimizer(size=10, propagation=False, cache_cone=0)
+                result = pass_.run(circuit_to_dag(circuit))
+                expected = HoareOptimizer(size=10, propagation=False, cache_cone=0,
+                                          incremental='pushpop').run(circuit_to_dag(circuit))
+                self.assertEqual(expected, result)
+                self.assertEqual(pass_.indicators, pass_.stats['queries'])
+
+    def test_retired_guards(self):
+        """The solver restarts without the retired guards when they outnumber the
+        constraints, and keeps answering the same"""
+        pass_ = HoareOptimizer(propagation=False)
+        pass_._initialize(circuit_to_dag(QuantumCircuit(1)))
+        qubit = pass_.variables[0][-1]
+        for _ in range(5):
+            self.assertTrue(pass_._is_unsat(qubit))
+            self.assertFalse(pass_._is_unsat(z3.Not(qubit)))
+            self.assertLessEqual(pass_.retired, len(pass_.constraints))
+            self.assertEqual(len(pass_.solver.assertions()),
+                             len(pass_.constraints) + 2 * pass_.retired)
+        self.assertEqual(pass_.indicators, 10)
+
+    def test_invalid(self):
+        """An unknown strategy is rejected"""
+        with self.assertRaises(TranspilerError):
+            HoareOptimizer(incremental='restart')
+
+
+class TestLongerSequences(QiskitTestCase):
+    def test_four_gates(self):
+        """T S T Z is the identity, without any inverse pair
+        qr0: -H-T-S-T-Z-    =>    qr0: -H-
+        """
+        qr = QuantumRegister(1, 'qr')
+        circuit = QuantumCircuit(qr)
+        circuit.h(qr[0])
+        circuit.t(qr[0])
+        circuit.s(qr[0])
+        circuit.t(qr[0])
+        circuit.z(qr[0])
+
+        expected = QuantumCircuit(qr)
+        expected.h(qr[0])
+
+        result = HoareOptimizer(size=10, seq_len=3).run(circuit_to_dag(circuit))
+        self.assertEqual(circuit_to_dag(circuit), result)
+        result = HoareOptimizer(size=10, seq_len=4).run(circuit_to_dag(circuit))
+        self.assertEqual(circuit_to_dag(expected), result)
+
+    def test_global_phase(self):
+        """Y Z X is the identity up to global phase, which controls would make relative
+        qr0: -H-Y-Z-X-    =>    qr0: -H-
+
+        qr0: -H-.-.-.-
+                | | |
+        qr1: -H-Y-Z-X-
+        """
+        qr = QuantumRegister(2, 'qr')
+        circuit = QuantumCircuit(qr)
+        circuit.h(qr[0])
+        circuit.y(qr[0])
+        circuit.z(qr[0])
+        circuit.x(qr[0])
+
+        expected = QuantumCircuit(qr)
+        expected.h(qr[0])
+
+        result = HoareOptimizer(size=10, seq_len=3).run(circuit_to_dag(circuit))
+        self.assertEqual(circuit_to_dag(expected), result)
+
+        controlled = QuantumCircuit(qr)
+        controlled.h(qr[0])
+        controlled.h(qr[1])
+        controlled.cy(qr[0], qr[1])
+        controlled.cz(qr[0], qr[1])
+        controlled.cx(qr[0], qr[1])
+
+        result = HoareOptimizer(size=10, seq_len=3).run(circuit_to_dag(controlled))
+        self.assertEqual(circuit_to_dag(controlled), result)
+
+    def test_fingerprint_cache(self):
+        """The fingerprint of a sequence of gates is computed once"""
+        qr = QuantumRegister(1, 'qr')
+        circuit = QuantumCircuit(qr)
+        circuit.h(qr[0])
+        for _ in range(3):
+            circuit.t(qr[0])
+            circuit.h(qr[0])
+
+        pass_ = HoareOptimizer(size=10, seq_len=2)
+        with patch('passmanager.hoare_opt._fingerprint',
+                   wraps=_fingerprint) as fingerprint:
+            pass_.run(circuit_to_dag(circuit))
+        self.assertEqual(fingerprint.call_count, 2 * len(pass_.fingerprints))
+
+
+class TestKnownStates(QiskitTestCase):
+    def test_annotation(self):
+        """An annotated |0> state makes the CX trivial
+        qr0: -H-H-[0]-.--          qr0: -H-H-[0]-
+                      |     =>
+        qr1: ---------X--          qr1: ---------
+        """
+        qr = QuantumRegister(2, 'qr')
+        circuit = QuantumCircuit(qr)
+        circuit.h(qr[0])
+        circuit.h(qr[0])
+        circuit.cx(qr[0], qr[1])
+        result = HoareOptimizer(size=0).run(circuit_to_dag(circuit))
+        self.assertEqual(circuit_to_dag(circuit), result)
+
+        annotated = QuantumCircuit(qr)
+        annotated.h(qr[0])
+        annotated.h(qr[0])
+        annotated.append(StateAnnotation(0, 0, 0), [qr[0]])
+        expected = annotated.copy()
+        annotated.cx(qr[0], qr[1])
+        result = HoareOptimizer(size=0).run(circuit_to_dag(annotated))
+        self.assertEqual(circuit_to_dag(expected), result)
+
+    def test_reset(self):
+        """A reset qubit is in |0>, and a pair of resets is not an identity pair
+        qr0: -H-|0>-|0>-.--          qr0: -H-|0>-|0>-
+                        |     =>
+        qr1: -----------X--          qr1: -----------
+        """
+        qr = QuantumRegister(2, 'qr')
+        circuit = QuantumCircuit(qr)
+        circuit.h(qr[0])
+        circuit.reset(qr[0])
+        circuit.reset(qr[0])
+        expected = circuit.copy()
+        circuit.cx(qr[0], qr[1])
+
+        result = HoareOptimizer(size=10).run(circuit_to_dag(circuit))
+        self.assertEqual(circuit_to_dag(expected), result)
+
+
+class TestRegression(QiskitTestCase):
+    """The gates removed from random circuits, as computed before the per-gate
+    control/target metadata (_NodeInfo) was introduced"""
+    removed = {
+        (0, 0): [1, 8], (0, 10): [1, 8],
+        (1, 0): [0, 2, 5, 6], (1, 10): [0, 2, 5, 6, 7, 13],
+        (2, 0): [0, 1, 2, 4, 6, 10, 14], (2, 10): [0, 1, 2, 4, 6, 10, 14],
+        (3, 0): [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 14, 15, 16, 18, 19, 21, 22, 23,
+                 24, 27, 30],
+        (3, 10): [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 14, 15, 16, 18, 19, 21, 22, 23,
+                  24, 27, 30],
+        (4, 0): [0, 4, 5], (4, 10): [0, 4, 5],
+        (5, 0): [0, 2, 4, 5, 6, 7, 9, 10, 11, 14, 15],
+        (5, 10): [0, 1, 2, 4, 5, 6, 7, 9, 10, 11, 14, 15, 18],
+        (6, 0): [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 15, 16, 17, 19, 20, 21, 22, 23],
+        (6, 10): [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 15, 16, 17, 19, 20, 21, 22,
+                  23],
+        (7, 0): [0], (7, 10): [0]}
+
+    def test_removed_gates(self):
+        """The optimized outputs are unchanged"""
+        for (seed, size), expected in self.removed.items():
+            with self.subTest(seed=seed, size=size):
+                dag = circuit_to_dag(random_circuit(5, 10, max_operands=3, seed=seed))
+                nodes = sorted(dag.op_nodes(), key=lambda node: node._node_id)
+                HoareOptimizer(size=size).run(dag)
+                remaining = set(dag.op_nodes())
+                self.assertEqual([index for index, node in enumerate(nodes)
+                                  if node not in remaining], expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
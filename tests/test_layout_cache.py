@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Test the cache of layouts keyed by interaction graph"""
+
+import os
+import tempfile
+import unittest
+
+from qiskit import QuantumCircuit
+from qiskit.converters import circuit_to_dag
+from qiskit.test import QiskitTestCase
+from qiskit.transpiler import PassManagerConfig
+from qiskit.transpiler.coupling import CouplingMap
+
+from passmanager import level_3_with_contant_pure, LayoutCache
+from passmanager.layout_cache import graph_invariant, interaction_graph, layout_target
+
+
+def chain(n_qubits, order):
+    """A circuit with CX gates along the qubits in ``order``"""
+    circuit = QuantumCircuit(n_qubits)
+    for control, target in zip(order, order[1:]):
+        circuit.cx(control, target)
+    return circuit
+
+
+class TestLayoutCache(QiskitTestCase):
+    coupling_map = CouplingMap([(0, 1), (1, 2), (2, 3), (3, 4), (1, 5)])
+
+    def setUp(self):
+        super().setUp()
+        self.target = layout_target(self.coupling_map)
+
+    def graph(self, circuit):
+        return interaction_graph(circuit_to_dag(circuit))
+
+    def test_isomorphic(self):
+        """A graph with relabeled qubits gets the layout through the isomorphism"""
+        cache = LayoutCache()
+        cache.put(self.target, self.graph(chain(3, [0, 1, 2])), [0, 1, 2], True)
+        physical, perfect = cache.get(self.target, self.graph(chain(3, [2, 0, 1])))
+        self.assertTrue(perfect)
+        self.assertEqual(physical[0], 1)
+        self.assertIn(physical[2], [0, 2])
+        self.assertEqual(cache.hits, 1)
+
+    def test_miss(self):
+        """Another graph or another target is a miss"""
+        cache = LayoutCache()
+        cache.put(self.target, self.graph(chain(3, [0, 1, 2])), [0, 1, 2], True)
+        self.assertIsNone(cache.get(self.target, self.graph(chain(3, [0, 1]))))
+        self.assertIsNone(cache.get(layout_target(CouplingMap([(0, 1), (1, 2)])),
+                                    self.graph(chain(3, [0, 1, 2]))))
+        self.assertEqual(cache.misses, 2)
+
+    def test_containing(self):
+        """A perfect layout of a larger graph is perfect for its subgraphs"""
+        cache = LayoutCache(warm_start=True)
+        cache.put(self.target, self.graph(chain(5, [0, 1, 2, 3, 4])), [0, 1, 2, 3, 4], True)
+        physical = cache.get_containing(self.target, self.graph(chain(3, [1, 0, 2])))
+        edges = set(self.coupling_map.get_edges())
+        self.assertIn((physical[1], physical[0]), edges | {(b, a) for a, b in edges})
+        self.assertIn((physical[0], physical[2]), edges | {(b, a) for a, b in edges})
+
+    def test_save_load(self):
+        """The layouts can be saved and loaded"""
+        cache = LayoutCache()
+        cache.put(self.target, self.graph(chain(3, [0, 1, 2])), [0, 1, 2], False)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'layouts.pickle')
+            cache.save(path)
+            loaded = LayoutCache.load(path)
+        self.assertEqual(loaded.get(self.target, self.graph(chain(3, [0, 1, 2])))[1], False)
+
+    def test_maxsize(self):
+        """Over maxsize, the least recently used layouts are removed, one by one"""
+        cache = LayoutCache(maxsize=2)
+        graphs = [self.graph(chain(3, [0, 1, 2])), self.graph(chain(3, [0, 1])),
+                  self.graph(chain(3, [1, 2]))]
+        # graphs 1 and 2 are isomorphic, but each put adds a layout
+        for index, graph in enumerate(graphs):
+            cache.put(self.target, graph, [index] * 3, False)
+        self.assertEqual(len(cache.entries), 2)
+        self.assertIsNone(cache.get(self.target, graphs[0]))
+        self.assertEqual(cache.get(self.target, graphs[1]), ([1, 1, 1], False))
+
+        # the layout just stored is kept, even if its graph has many layouts already
+        cache = LayoutCache(maxsize=1)
+        for index in range(3):
+            cache.put(self.target, graphs[1], [index] * 3, False)
+            self.assertEqual(cache.get(self.target, graphs[1]), ([index] * 3, False))
+        self.assertEqual(len(cache.entries), 1)
+        self.assertEqual(cache.buckets, {(self.target, graph_invariant(graphs[1])): [2]})
+
+    def test_pass_manager(self):
+        """The second run of an isomorphic circuit skips the layout search"""
+        pm_conf = PassManagerConfig(basis_gates=['u1', 'u2', 'u3', 'cx', 'id'],
+                                    coupling_map=self.coupling_map, seed_transpiler=1)
+        cache = LayoutCache()
+        for order, expected in [([0, 1, 2, 3], 'CSPLayout'), ([3, 1, 0, 2], 'CachedLayout')]:
+            calls = []
+            pass_manager = level_3_with_contant_pure(pm_conf, layout_cache=cache)
+            pass_manager.run(chain(4, order), callback=lambda **kwargs: calls.append(
+                type(kwargs['pass_']).__name__))
+            self.assertIn(expected, calls)
+        self.assertNotIn('CSPLayout', calls)
+        self.assertEqual(pass_manager.property_set['layout_cache'], 'hit')
+        self.assertTrue(pass_manager.property_set['is_swap_mapped'])
+
+
+if __name__ == '__main__':
+    unittest.main()
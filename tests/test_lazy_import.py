@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Test the lazy namespaces of the packages"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+from qiskit.test import QiskitTestCase
+
+
+def loaded_modules(statement):
+    """Modules of the packages loaded by ``statement``, in a fresh interpreter."""
+    program = ("import sys\n%s\n"
+               "print(' '.join(name for name in sys.modules "
+               "if name.startswith(('passmanager', 'purestate'))))" % statement)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', program], stdout=subprocess.PIPE,
+                            cwd=root, check=True).stdout
+    return set(output.decode().split())
+
+
+class TestLazyImport(QiskitTestCase):
+    def test_import_packages(self):
+        """Importing the packages does not import their modules"""
+        self.assertEqual(loaded_modules('import passmanager, purestate'),
+                         {'passmanager', 'purestate'})
+
+    def test_cons_pure_without_hoare(self):
+        """The RPO pass manager does not need the Hoare optimizer"""
+        modules = loaded_modules('from passmanager import level_3_with_contant_pure')
+        self.assertIn('passmanager.cons_pure_pm', modules)
+        self.assertNotIn('passmanager.hoare_opt', modules)
+
+    def test_gate_extension_on_build(self):
+        """The gate classes are extended when the first HoareOptimizer is built"""
+        self.assertNotIn('passmanager._gate_extension',
+                         loaded_modules('from passmanager import HoareOptimizer'))
+        self.assertIn('passmanager._gate_extension',
+                      loaded_modules('from passmanager import HoareOptimizer\n'
+                                     'HoareOptimizer()'))
+
+    def test_names(self):
+        """The lazy names are the ones of the modules"""
+        import passmanager
+        import purestate
+        from passmanager.hoare_opt import HoareOptimizer
+        from purestate.aswap_gate import ASwapGate
+        self.assertIs(passmanager.HoareOptimizer, HoareOptimizer)
+        self.assertIs(purestate.ASwapGate, ASwapGate)
+        self.assertIn('HoareOptimizer', dir(passmanager))
+        with self.assertRaises(AttributeError):
+            getattr(passmanager, 'level_4_pass_manager')
+
+
+if __name__ == '__main__':
+    unittest.main()
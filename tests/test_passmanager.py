@@ -15,7 +15,8 @@ from qiskit.compiler import transpile
 from qiskit import execute, Aer, QuantumCircuit
 from qiskit.circuit.random import random_circuit
 
-from passmanager import level_3_with_contant_pure
+from passmanager import level_3_with_contant_pure, level_1_with_contant_pure, \
+    level_2_with_contant_pure
 from qiskit.transpiler import PassManagerConfig
 from qiskit.transpiler.coupling import CouplingMap
 from qiskit.extensions import RYGate
@@ -63,6 +64,47 @@ class TestExecutePassManager(ExecutePassManager):
         self.assertEqualCounts(result, expected)
 
 
+@ddt
+class TestExecuteLightPassManagers(ExecutePassManager):
+    @data(*product([level_1_with_contant_pure, level_2_with_contant_pure], range(2, 6), [5, 10]))
+    @unpack
+    def test_execute(self, pass_manager, n_qubits, depth):
+        circuit = random_circuit(n_qubits, depth, reset=True, measure=True, seed=0)
+
+        transpiled = transpile(circuit, pass_manager=pass_manager(self.pm_conf))
+
+        expected = self.execute(circuit).result()
+        result = self.execute(transpiled).result()
+
+        self.assertEqualCounts(result, expected)
+
+    @data(level_1_with_contant_pure, level_2_with_contant_pure)
+    def test_no_csp_layout(self, pass_manager):
+        """The light pass managers do not search for a perfect layout"""
+        calls = []
+        pass_manager(self.pm_conf).run(
+            random_circuit(4, 5, seed=0),
+            callback=lambda **kwargs: calls.append(type(kwargs['pass_']).__name__))
+        self.assertIn('PureStateOnU', calls)
+        self.assertNotIn('CSPLayout', calls)
+
+
+@ddt
+class TestExecuteKnobs(ExecutePassManager):
+    @data(*product([{'constants_in_loop': True}, {'swap_trials': 5}], range(2, 6)))
+    @unpack
+    def test_execute(self, options, n_qubits):
+        circuit = random_circuit(n_qubits, 10, reset=True, measure=True, seed=0)
+
+        transpiled = transpile(circuit,
+                               pass_manager=level_3_with_contant_pure(self.pm_conf, **options))
+
+        expected = self.execute(circuit).result()
+        result = self.execute(transpiled).result()
+
+        self.assertEqualCounts(result, expected)
+
+
 class TestExecuteSpecialCases(ExecutePassManager):
     def test_case_01(self):
         """
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Test running the seed-independent prefix of pass managers once"""
+
+import unittest
+from copy import copy
+
+from ddt import ddt, data
+from qiskit import QuantumCircuit
+from qiskit.test import QiskitTestCase
+from qiskit.test.mock import FakeMelbourne
+from qiskit.transpiler.passes import CSPLayout
+
+from benchmark.utils import Result
+from benchmark.utils.prefix import shared_prefix_length
+from passmanager import level_3_with_contant_pure, level_3_hoare_pass_manager
+
+
+@ddt
+class TestSharedPrefix(QiskitTestCase):
+    def setUp(self):
+        super().setUp()
+        self.circuit = QuantumCircuit(5, 5)
+        self.circuit.h(0)
+        for qubit in range(1, 5):
+            self.circuit.cx(0, qubit)
+        self.circuit.cx(1, 3)
+        self.circuit.measure(range(5), range(5))
+        self.result = Result(self.circuit, FakeMelbourne)
+
+    @data(level_3_with_contant_pure, level_3_hoare_pass_manager)
+    def test_prefix_ends_at_seeded_pass(self, pass_manager):
+        """The prefix ends before CSPLayout, which takes the seed"""
+        # as in Result.run_pm_shared_prefix, with the same coupling map and properties
+        config = Result.pm_config(None, FakeMelbourne)
+        pms = []
+        for seed in range(3):
+            config = copy(config)
+            config.seed_transpiler = seed
+            pms.append(pass_manager(config))
+        length = shared_prefix_length(pms)
+        self.assertGreater(length, 0)
+        self.assertIsInstance(pms[0]._pass_sets[length]['passes'][0], CSPLayout)
+
+    @data(level_3_with_contant_pure, level_3_hoare_pass_manager)
+    def test_same_as_separate_runs(self, pass_manager):
+        """Sharing the prefix gives the circuits of the separate runs"""
+        shared = self.result.run_pm_shared_prefix(pass_manager, range(3))
+        for seed, (transpiled, times, _, hoare_stats) in enumerate(shared):
+            with self.subTest(seed=seed):
+                expected = self.result.run_pm_with_time(pass_manager, seed)
+                self.assertEqual(transpiled, expected[0])
+                self.assertEqual(transpiled.name, self.circuit.name)
+                self.assertEqual(transpiled._layout.get_virtual_bits(),
+                                 expected[0]._layout.get_virtual_bits())
+                self.assertEqual(set(times), set(expected[1]))
+                self.assertEqual(hoare_stats is None, expected[3] is None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -25,6 +25,7 @@ from qiskit.transpiler.passes import Optimize1qGates
 from qiskit.converters import circuit_to_dag
 from qiskit.transpiler.passes import Unroller
 from purestate import ASwapGate
+from purestate.state_timeline import PureStateTimeline, ZERO, PURE
 
 import numpy as np
 
@@ -304,5 +305,48 @@ class TestASWAPGates(PureStateTestCase):
 
         self.assertEqual(expected, result)
 
+
+class TestTimeline(PureStateTestCase):
+    def test_timeline(self):
+        """State codes and angles per layer and wire
+         |0> --U3--X--
+                   |
+         |0> ------X--
+         """
+        qr = QuantumRegister(2, 'qr')
+        circuit = QuantumCircuit(qr)
+        circuit.u3(1.23, 2.34, 3.04, qr[0])
+        circuit.swap(qr[0], qr[1])
+
+        passmanager = PassManager()
+        passmanager.append(PureStateTimeline())
+        passmanager.run(circuit)
+        timeline = passmanager.property_set['pure_state_timeline']
+
+        self.assertEqual(timeline.shape, (2, 2))
+        self.assertEqual(timeline['code'].tolist(), [[PURE, ZERO], [ZERO, PURE]])
+        self.assertAlmostEqual(timeline['theta'][1, 1], 1.23, places=5)
+
+    def test_timeline_of_output(self):
+        """The layers are the ones of the optimized circuit
+         |0> --U3--X--       |0> ------
+                   |    =>
+         |0> ------X--       |0> --U3--
+         """
+        qr = QuantumRegister(2, 'qr')
+        circuit = QuantumCircuit(qr)
+        circuit.u3(1.23, 2.34, 3.04, qr[0])
+        circuit.swap(qr[0], qr[1])
+
+        passmanager = PassManager()
+        passmanager.append([PureStateOnU(), PureStateTimeline()])
+        result = passmanager.run(circuit)
+        timeline = passmanager.property_set['pure_state_timeline']
+
+        self.assertEqual(timeline.shape, (result.depth(), 2))
+        self.assertEqual(timeline['code'].tolist(), [[ZERO, PURE]])
+        self.assertAlmostEqual(timeline['theta'][0, 1], 1.23, places=5)
+
+
 if __name__ == '__main__':
     unittest.main()
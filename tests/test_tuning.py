@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+# (C) Copyright Ji Liu and Luciano Bello 2020.
+#
+# This code is licensed under the Apache License, Version 2.0. You may
+# obtain a copy of this license in the LICENSE.txt file in the root directory
+# of this source tree or at http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Any modifications or derivative works of this code must retain this
+# copyright notice, and modified files need to carry a notice indicating
+# that they have been altered from the originals.
+
+"""Test the configuration points and the Pareto front of the tuner"""
+
+import unittest
+
+from qiskit.test import QiskitTestCase
+
+from benchmark.utils.tuning import points, point_name, pareto_front, choose
+
+INF = float('inf')
+
+
+def row(name, time, cxs):
+    """A measured point"""
+    return {'name': name, 'time': time, 'cxs': cxs}
+
+
+class TestPoints(QiskitTestCase):
+    def test_swap_trials_only_stochastic(self):
+        """The swap trials only vary with the stochastic routing"""
+        result = points({'routing_method': ['stochastic', 'basic'], 'swap_trials': [20, 200]})
+        self.assertEqual(result, [{'routing_method': 'stochastic', 'swap_trials': 20},
+                                  {'routing_method': 'stochastic', 'swap_trials': 200},
+                                  {'routing_method': 'basic', 'swap_trials': None}])
+
+    def test_point_name(self):
+        """The name has the values of the knobs that are set"""
+        self.assertEqual(point_name({'layout_method': 'dense', 'routing_method': 'basic',
+                                     'swap_trials': None, 'constants_in_loop': True}),
+                         'dense-basic-cil')
+        self.assertEqual(point_name({'layout_method': 'dense', 'routing_method': 'stochastic',
+                                     'swap_trials': 20, 'constants_in_loop': False}),
+                         'dense-stochastic-20')
+
+
+class TestParetoFront(QiskitTestCase):
+    def test_dominated(self):
+        """A row beaten in both, or as fast with more CX, is not on the front"""
+        rows = [row('slow_few', 3, 10), row('dominated', 4, 12), row('fast', 1, 20),
+                row('fast_more', 1, 25), row('middle', 2, 15)]
+        front = pareto_front(rows)
+        self.assertEqual([front_row['name'] for front_row in front],
+                         ['fast', 'middle', 'slow_few'])
+
+    def test_choose_tolerance(self):
+        """The fastest row within the CX tolerance of the best one is chosen"""
+        front = pareto_front([row('fast', 1, 105), row('middle', 2, 101), row('slow', 3, 100)])
+        self.assertEqual(choose(front, cx_tolerance=0.01)['name'], 'middle')
+        self.assertEqual(choose(front, cx_tolerance=0.1)['name'], 'fast')
+        self.assertEqual(choose(front, cx_tolerance=0)['name'], 'slow')
+
+    def test_failed(self):
+        """Failed rows are not on the front, and are never chosen"""
+        rows = [row('failed', 0.5, INF), row('failed_both', INF, INF), row('ok', 2, 30)]
+        front = pareto_front(rows)
+        self.assertEqual([front_row['name'] for front_row in front], ['ok'])
+        self.assertEqual(choose(front)['name'], 'ok')
+
+        front = pareto_front([row('failed', 0.5, INF), row('failed_both', INF, INF)])
+        self.assertEqual(front, [])
+        self.assertIsNone(choose(front))
+
+
+if __name__ == '__main__':
+    unittest.main()